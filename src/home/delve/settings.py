@@ -44,6 +44,36 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 # DELVE_ENABLE_EXTRACTIONS_ON_UPDATE: Boolean flag to enable/disable extractions on update. Default: 'True'.
 # DELVE_ENABLE_PROCESSORSS_ON_UPDATE: Boolean flag to enable/disable processors on update. Default: 'True'.
 # DELVE_STRICT_VALIDATION: Boolean flag to enable/disable strict validation. Default: 'False'.
+# DELVE_STREAMING_CHUNK_SIZE: Number of rows fetched at a time when streaming events from a QuerySet. Default: 2000.
+# DELVE_QUERY_PLAN_CACHE_SIZE: Number of compiled query plans to keep in memory. Default: 256.
+# DELVE_HLL_PRECISION: Precision of the HyperLogLogs used by stats dc, between 4 and 18. Default: 14.
+# DELVE_TDIGEST_COMPRESSION: Compression of the t-digests used by stats percentile. Default: 100.
+# DELVE_COUNT_MIN_EPSILON: Error of the count-min sketches used by stats freq, as a fraction of the number of events. Default: 0.001.
+# DELVE_COUNT_MIN_DELTA: Probability of a count-min sketch estimate exceeding its error. Default: 0.01.
+# DELVE_BLOOM_CAPACITY: Number of distinct events dedup --bloom is sized for. Default: 1000000.
+# DELVE_BLOOM_ERROR_RATE: Probability of dedup --bloom dropping an event which is not a duplicate. Default: 0.001.
+# DELVE_TOP_CAPACITY: Minimum number of distinct values top keeps counters for, per group. Default: 1000.
+# DELVE_TIMECHART_MAX_POINTS: Maximum number of points of each timechart series before it is downsampled. Default: 1000.
+# DELVE_SORT_BUFFER_SIZE: Number of events sort holds in memory before spilling a sorted run to a temporary file. Default: 100000.
+# DELVE_COLUMNAR: Boolean flag to enable/disable running stats, sort, filter and timechart on columns with NumPy, when it is installed. Default: 'True'.
+# DELVE_COLUMNAR_MAX_EVENTS: Maximum number of events converted to columns for a search command. Default: 1000000.
+# DELVE_INGEST_BATCH_SIZE: Number of events written per INSERT when events are created in bulk. Default: 1000.
+# DELVE_INGEST_COPY: Boolean flag to enable/disable writing events posted to /api/events/bulk/ with COPY on PostgreSQL. Default: 'True'.
+# DELVE_INGEST_QUEUE: Boolean flag to enable/disable queueing events posted to /api/events/ and /api/events/bulk/ for a single writer thread, which is meant for SQLite. Requires DELVE_INGEST_SPOOL. Default: 'False'.
+# DELVE_INGEST_QUEUE_INTERVAL: Seconds between the writes of the ingest queue. Default: 0.5.
+# DELVE_INGEST_SPOOL: Directory the ingest queue appends events to before answering, so they survive a restart or a failed write. Default: '' (none).
+# DELVE_INGEST_SPOOL_DRAIN: Boolean flag to enable/disable only appending events posted to /api/events/ and /api/events/bulk/ to the spool, and writing them with a django_q task. Default: 'False'.
+# DELVE_INGEST_SPOOL_SEGMENT_SIZE: Size in bytes past which a new file of the spool is started. Default: 16777216.
+# DELVE_INGEST_PARALLEL_THRESHOLD: Minimum number of events of a sourcetype for their fields to be extracted by the worker processes. Default: 5000.
+# DELVE_INGEST_WORKERS: Number of worker processes extracting fields of large batches of events, 0 to extract them in the request. Default: 0.
+# DELVE_JOIN_CHUNK_SIZE: Number of join keys pushed into each query for the right side of a join. Default: 500.
+# DELVE_RESULT_CACHE_TIMEOUT: Number of seconds to cache query results for, 0 disables the result cache. Default: 0.
+# DELVE_RESULT_CACHE_ALIAS: The cache from CACHES used to store query results. Default: 'default'.
+# DELVE_RESULT_CACHE_MAX_EVENTS: Maximum number of events in a cached query result. Default: 10000.
+# DELVE_SINGLE_FLIGHT: Boolean flag to enable/disable sharing one run of a query between concurrent identical requests. Default: 'False'.
+# DELVE_CHECKPOINT_TIMEOUT: Number of seconds to keep the per-stage checkpoints of Explore queries for, 0 disables checkpoints. Default: 300.
+# DELVE_CHECKPOINT_MAX_EVENTS: Maximum number of events in a checkpoint. Default: 10000.
+# DELVE_CHECKPOINT_MAX_PER_SESSION: Maximum number of checkpoints kept for each session. Default: 10.
 # DELVE_DOCUMENTATION_DIRECTORY: Directory for storing documentation. Default: 'doc'.
 # DELVE_Q_CLUSTER_NAME: Name of the Django Q cluster. Default: 'DjangORM'.
 # DELVE_Q_CLUSTER_CATCH_UP: Boolean flag to enable/disable catch-up for the Q cluster. Default: 'False'.
@@ -333,6 +363,36 @@ DELVE_ENABLE_PROCESSORSS_ON_CREATE = os.getenv('DELVE_ENABLE_PROCESSORSS_ON_CREA
 DELVE_ENABLE_EXTRACTIONS_ON_UPDATE = os.getenv('DELVE_ENABLE_EXTRACTIONS_ON_UPDATE', 'True') == 'True'
 DELVE_ENABLE_PROCESSORSS_ON_UPDATE = os.getenv('DELVE_ENABLE_PROCESSORSS_ON_UPDATE', 'True') == 'True'
 DELVE_STRICT_VALIDATION = os.getenv('DELVE_STRICT_VALIDATION', 'False') == 'True'
+DELVE_STREAMING_CHUNK_SIZE = int(os.getenv('DELVE_STREAMING_CHUNK_SIZE', 2000))
+DELVE_QUERY_PLAN_CACHE_SIZE = int(os.getenv('DELVE_QUERY_PLAN_CACHE_SIZE', 256))
+DELVE_HLL_PRECISION = int(os.getenv('DELVE_HLL_PRECISION', 14))
+DELVE_TDIGEST_COMPRESSION = int(os.getenv('DELVE_TDIGEST_COMPRESSION', 100))
+DELVE_COUNT_MIN_EPSILON = float(os.getenv('DELVE_COUNT_MIN_EPSILON', 0.001))
+DELVE_COUNT_MIN_DELTA = float(os.getenv('DELVE_COUNT_MIN_DELTA', 0.01))
+DELVE_BLOOM_CAPACITY = int(os.getenv('DELVE_BLOOM_CAPACITY', 1000000))
+DELVE_BLOOM_ERROR_RATE = float(os.getenv('DELVE_BLOOM_ERROR_RATE', 0.001))
+DELVE_TOP_CAPACITY = int(os.getenv('DELVE_TOP_CAPACITY', 1000))
+DELVE_TIMECHART_MAX_POINTS = int(os.getenv('DELVE_TIMECHART_MAX_POINTS', 1000))
+DELVE_SORT_BUFFER_SIZE = int(os.getenv('DELVE_SORT_BUFFER_SIZE', 100000))
+DELVE_COLUMNAR = os.getenv('DELVE_COLUMNAR', 'True') == 'True'
+DELVE_COLUMNAR_MAX_EVENTS = int(os.getenv('DELVE_COLUMNAR_MAX_EVENTS', 1000000))
+DELVE_INGEST_BATCH_SIZE = int(os.getenv('DELVE_INGEST_BATCH_SIZE', 1000))
+DELVE_INGEST_COPY = os.getenv('DELVE_INGEST_COPY', 'True') == 'True'
+DELVE_INGEST_QUEUE = os.getenv('DELVE_INGEST_QUEUE', 'False') == 'True'
+DELVE_INGEST_QUEUE_INTERVAL = float(os.getenv('DELVE_INGEST_QUEUE_INTERVAL', 0.5))
+DELVE_INGEST_SPOOL = os.getenv('DELVE_INGEST_SPOOL', '')
+DELVE_INGEST_SPOOL_DRAIN = os.getenv('DELVE_INGEST_SPOOL_DRAIN', 'False') == 'True'
+DELVE_INGEST_SPOOL_SEGMENT_SIZE = int(os.getenv('DELVE_INGEST_SPOOL_SEGMENT_SIZE', 16 * 1024 * 1024))
+DELVE_INGEST_PARALLEL_THRESHOLD = int(os.getenv('DELVE_INGEST_PARALLEL_THRESHOLD', 5000))
+DELVE_INGEST_WORKERS = int(os.getenv('DELVE_INGEST_WORKERS', 0))
+DELVE_JOIN_CHUNK_SIZE = int(os.getenv('DELVE_JOIN_CHUNK_SIZE', 500))
+DELVE_RESULT_CACHE_TIMEOUT = int(os.getenv('DELVE_RESULT_CACHE_TIMEOUT', 0))
+DELVE_RESULT_CACHE_ALIAS = os.getenv('DELVE_RESULT_CACHE_ALIAS', 'default')
+DELVE_RESULT_CACHE_MAX_EVENTS = int(os.getenv('DELVE_RESULT_CACHE_MAX_EVENTS', 10000))
+DELVE_SINGLE_FLIGHT = os.getenv('DELVE_SINGLE_FLIGHT', 'False') == 'True'
+DELVE_CHECKPOINT_TIMEOUT = int(os.getenv('DELVE_CHECKPOINT_TIMEOUT', 300))
+DELVE_CHECKPOINT_MAX_EVENTS = int(os.getenv('DELVE_CHECKPOINT_MAX_EVENTS', 10000))
+DELVE_CHECKPOINT_MAX_PER_SESSION = int(os.getenv('DELVE_CHECKPOINT_MAX_PER_SESSION', 10))
 
 DELVE_DOCUMENTATION_DIRECTORY = BASE_DIR.joinpath(os.getenv('DELVE_DOCUMENTATION_DIRECTORY', 'doc'))
 
@@ -372,6 +432,7 @@ DELVE_SEARCH_COMMANDS = {
     'make_events': 'events.search_commands.make_events',
     'mark_timestamp': 'events.search_commands.mark_timestamp',
     'merge': 'events.search_commands.merge',
+    'rare': 'events.search_commands.rare',
     'read_file': 'events.search_commands.read_file',
     'rename': 'events.search_commands.rename',
     'replace': 'events.search_commands.replace',
@@ -386,6 +447,8 @@ DELVE_SEARCH_COMMANDS = {
     'sql_query': 'events.search_commands.sql_query',
     'stats': 'events.search_commands.stats',
     'table': 'events.search_commands.table',
+    'timechart': 'events.search_commands.timechart',
+    'top': 'events.search_commands.top',
     'transpose': 'events.search_commands.transpose',
     'value_list': 'events.search_commands.value_list',
 
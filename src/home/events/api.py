@@ -13,6 +13,7 @@ from django.utils.text import Truncator
 from rest_framework.views import APIView
 from rest_framework import viewsets
 from rest_framework import status
+from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from .serializers import (
@@ -31,6 +32,9 @@ from .models import (
     FileUpload,
 )
 from .util import resolve
+from .profiling import QueryProfiler
+from . import ingest
+from . import ingest_queue
 
 log = logging.getLogger(__name__)
 
@@ -192,11 +196,43 @@ class EventViewSet(viewsets.ModelViewSet):
         return serializer
     
     def create(self, request, *args, **kwargs):
+        if settings.DELVE_INGEST_QUEUE or settings.DELVE_INGEST_SPOOL_DRAIN:
+            return self.queue(request)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
         headers = self.get_success_headers(serializer.data)
         return Response(status=status.HTTP_201_CREATED, headers=headers)
+
+    def queue(self, request):
+        """
+        Hand the events of request to the writer thread or the spool, see
+        events.ingest_queue.
+        """
+        try:
+            events = ingest.parse(Event, request.body, request.user)
+        except ValueError as exception:
+            return Response({"detail": str(exception)}, status=status.HTTP_400_BAD_REQUEST)
+        ingest_queue.get_queue(Event).put(events)
+        log.debug(f"Queued {len(events)} events")
+        return Response({"queued": len(events)}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """
+        Create the events of a JSON array in one transaction, without
+        running a serializer per event, see events.ingest. Queued for
+        the writer thread or the spool instead with DELVE_INGEST_QUEUE or
+        DELVE_INGEST_SPOOL_DRAIN, see events.ingest_queue.
+        """
+        if settings.DELVE_INGEST_QUEUE or settings.DELVE_INGEST_SPOOL_DRAIN:
+            return self.queue(request)
+        try:
+            events = ingest.ingest(Event, request.body, request.user)
+        except ValueError as exception:
+            return Response({"detail": str(exception)}, status=status.HTTP_400_BAD_REQUEST)
+        log.debug(f"Ingested {len(events)} events")
+        return Response({"created": len(events)}, status=status.HTTP_201_CREATED)
         
 class QueryView(viewsets.ModelViewSet):
     """
@@ -250,6 +286,15 @@ class ResolveQueryView(APIView):
             log.debug(f"No local_context")
             local_context = {}
 
+        # Profiling is opt-in, when requested the response becomes
+        # {"results": [...], "profile": [...]} instead of just the results.
+        profile = str(request.data.get("profile", "")).lower() in ("1", "true", "on")
+        log.debug(f"Found {profile=}")
+        profiler = QueryProfiler() if profile else None
+        # The Explore page resumes from the unchanged stages of the query
+        checkpoints = str(request.data.get("checkpoints", "")).lower() in ("1", "true", "on")
+        log.debug(f"Found {checkpoints=}")
+
         if query_serialized.is_valid():
             log.debug(f"Found data: {query_serialized.validated_data}")
             # Overwriting name with the validated data
@@ -273,7 +318,12 @@ class ResolveQueryView(APIView):
                 log.debug(f"Save completed")
 
             try:
-                events = query.resolve(request, context=local_context)
+                events = query.resolve(
+                    request,
+                    context=local_context,
+                    profiler=profiler,
+                    checkpoints=checkpoints,
+                )
             except Exception as exception:
                 str_exception = str(exception)
                 if len(str_exception) > 4096:
@@ -287,6 +337,13 @@ class ResolveQueryView(APIView):
                         }
                     ]
                 )
+            if profiler is not None:
+                return Response(
+                    {
+                        "results": resolve(events),
+                        "profile": profiler.report(),
+                    }
+                )
             return Response(resolve(events))
         else:
             log.debug(f"Found query_serialized.errors: {query_serialized.errors}")
@@ -3,6 +3,8 @@
 # See the LICENSE file in the root of this repository for details.
 
 from django.apps import AppConfig
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
 
 
 class EventsConfig(AppConfig):
@@ -13,4 +15,12 @@ class EventsConfig(AppConfig):
         from .signals import (
             validate_global_context,
             create_global_context,
-        )
\ No newline at end of file
+            clear_query_plan_cache,
+            clear_ingest_dispatch_tables,
+        )
+        from .ingest import load_dispatch_tables
+        load_dispatch_tables()
+        # Queued events are only written after the response, see
+        # events.ingest_queue
+        if settings.DELVE_INGEST_QUEUE and not settings.DELVE_INGEST_SPOOL:
+            raise ImproperlyConfigured("DELVE_INGEST_QUEUE requires DELVE_INGEST_SPOOL")
\ No newline at end of file
@@ -0,0 +1,87 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+Capture of the output written to sys.stdout and sys.stderr while search
+commands run.
+
+Swapping sys.stdout and sys.stderr is process-wide, so with concurrent
+queries each would capture (and restore) the others' streams. Instead,
+sys.stdout and sys.stderr are replaced once by proxies which write to the
+buffers of the innermost capture_output in the current context (thread or
+task), or to the original stream outside of one.
+"""
+
+import sys
+import threading
+from io import StringIO
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+CapturedOutput = namedtuple("CapturedOutput", ["stdout", "stderr"])
+
+_targets = {
+    "stdout": ContextVar("stdout", default=None),
+    "stderr": ContextVar("stderr", default=None),
+}
+_install_lock = threading.Lock()
+
+
+class StreamProxy:
+    """
+    A stand-in for sys.stdout or sys.stderr which writes to the buffer
+    of the current capture_output, or to stream if there is none.
+    """
+    def __init__(self, name, stream):
+        self._name = name
+        self._stream = stream
+
+    def _target(self):
+        target = _targets[self._name].get()
+        return self._stream if target is None else target
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def writelines(self, lines):
+        return self._target().writelines(lines)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._target(), name)
+
+
+def install():
+    """
+    Replace sys.stdout and sys.stderr with proxies, unless they already
+    are (something else, ie. a test runner, may have replaced them since).
+    """
+    with _install_lock:
+        for name in _targets:
+            stream = getattr(sys, name)
+            if not isinstance(stream, StreamProxy):
+                setattr(sys, name, StreamProxy(name, stream))
+
+
+@contextmanager
+def capture_output():
+    """
+    Capture everything written to sys.stdout and sys.stderr in the current
+    context while the with statement runs, yielding a CapturedOutput of
+    the StringIO buffers it is written to.
+    """
+    install()
+    output = CapturedOutput(StringIO(), StringIO())
+    tokens = [
+        _targets["stdout"].set(output.stdout),
+        _targets["stderr"].set(output.stderr),
+    ]
+    try:
+        yield output
+    finally:
+        _targets["stderr"].reset(tokens[1])
+        _targets["stdout"].reset(tokens[0])
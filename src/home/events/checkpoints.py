@@ -0,0 +1,222 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+Checkpoints of the intermediate results of a query, used to resume a
+query from the longest prefix of its pipeline which ran before in the
+same session.
+
+The checkpoint of a stage is keyed by a hash chained over the session,
+user, globals, context and rendered arguments of every stage up to it,
+so changing a stage invalidates its checkpoint and every later one. Like
+the keys of events.result_cache, the hash also covers the generations of
+the indexes each stage reads events from and the time buckets of its
+relative windows, so new events or the passing of time invalidate them
+too. Only stages of cacheable commands are checkpointed, nothing after
+a stage which isn't (ie. request, read_file) is ever restored.
+
+Each checkpoint stores the context as left by the stage and, when the
+stage's output was materialized, its events. QuerySets are never
+materialized, so they can still be pushed down into.
+"""
+
+import copy
+import json
+import time
+import hashlib
+import logging
+from collections.abc import Iterator
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.query import QuerySet
+
+from events import result_cache
+from events.columnar import ColumnBatch
+
+# Distinguishes a missing checkpoint from a stage which returned None
+MISSING = object()
+
+def get_cache():
+    return caches[settings.DELVE_RESULT_CACHE_ALIAS]
+
+def has_side_effects(operation, argv):
+    side_effects = getattr(operation, "side_effects", False)
+    if callable(side_effects):
+        try:
+            return bool(side_effects(argv))
+        except (Exception, SystemExit):
+            return True
+    return bool(side_effects)
+
+
+class QueryCheckpoints:
+    """
+    The checkpoints of one run of a query, see Query.resolve(..., checkpoints=True).
+
+    restore is called once before the first stage runs, save after each
+    stage which runs.
+    """
+    def __init__(self, request, context, environment_globals):
+        self.cache = get_cache()
+        self.session_key = request.session.session_key
+        material = json.dumps(
+            [
+                self.session_key,
+                getattr(request.user, "pk", None),
+                environment_globals,
+                context,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        self.key = hashlib.sha256(material.encode()).hexdigest()
+        self.enabled = True
+
+    @classmethod
+    def for_request(cls, request, context, environment_globals):
+        """
+        Return the checkpoints for request, or None if request has no session.
+        """
+        session = getattr(request, "session", None)
+        if session is None or not session.session_key:
+            return None
+        return cls(request, context, environment_globals)
+
+    def _chain(self, key, stage, argv):
+        """
+        Return the key of the checkpoint of stage run with argv after the
+        checkpoint of key, or None if stage must not be checkpointed.
+        """
+        log = logging.getLogger(__name__)
+        if not getattr(stage.operation, "cacheable", False) or has_side_effects(stage.operation, argv):
+            return None
+        try:
+            state = result_cache.get_stage_state(result_cache.get_cache(), stage, argv, time.time())
+        except (Exception, SystemExit):
+            # ie. an argument error, which the stage will report
+            log.debug("Unable to checkpoint stage", exc_info=True)
+            return None
+        if state is None:
+            return None
+        material = json.dumps([key, argv, state], default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def _context_key(self, key):
+        return f"delve:checkpoint:{key}:context"
+
+    def _events_key(self, key):
+        return f"delve:checkpoint:{key}:events"
+
+    def _session_key(self):
+        return f"delve:checkpoint:session:{self.session_key}"
+
+    def restore(self, query_plan, context, render):
+        """
+        Find the longest prefix of query_plan with a checkpoint. render
+        takes a stage and a context and returns the stage's argv.
+
+        Returns (position, events, context) where position is the index
+        of the first stage to run, or None if there is no checkpoint.
+        """
+        log = logging.getLogger(__name__)
+        found = []
+        key = self.key
+        for position, stage in enumerate(query_plan):
+            argv = render(stage, context)
+            key = self._chain(key, stage, argv)
+            if key is None:
+                break
+            checkpoint = self.cache.get(self._context_key(key))
+            if checkpoint is None:
+                break
+            context = checkpoint["context"]
+            found.append((position, key, checkpoint))
+        for position, key, checkpoint in reversed(found):
+            if not checkpoint["materialized"]:
+                continue
+            events = self.cache.get(self._events_key(key), MISSING)
+            if events is MISSING:
+                # Evicted, try a shorter prefix
+                continue
+            log.debug(f"Resuming from the checkpoint of stage {position}")
+            self.key = key
+            return position + 1, events, checkpoint["context"]
+        return None
+
+    def save(self, stage, argv, events, context):
+        """
+        Save the checkpoint of the stage which was run with argv and
+        returned events. Returns events, which must be used in place
+        of the original.
+        """
+        if not self.enabled:
+            return events
+        key = self._chain(self.key, stage, argv)
+        if key is None:
+            # Never skip a side effect or an uncacheable stage, so nothing
+            # after it is saved
+            self.enabled = False
+            return events
+        self.key = key
+        if isinstance(events, QuerySet):
+            self._store(self.key, context)
+            return events
+        elif isinstance(events, Iterator):
+            self._store(self.key, context)
+            return self._recorded(self.key, events, copy.deepcopy(context))
+        elif isinstance(events, (list, tuple, ColumnBatch)) and len(events) > settings.DELVE_CHECKPOINT_MAX_EVENTS:
+            self._store(self.key, context)
+            return events
+        self._store(self.key, context, events)
+        return events
+
+    def _recorded(self, key, events, context):
+        """
+        Yield events, saving a copy of them as the checkpoint of key once
+        they are exhausted. Nothing is saved if the next stage stops early.
+        """
+        recorded = []
+        for event in events:
+            if recorded is not None:
+                if len(recorded) < settings.DELVE_CHECKPOINT_MAX_EVENTS:
+                    # Later stages may change the event in place
+                    recorded.append(copy.deepcopy(event))
+                else:
+                    recorded = None
+            yield event
+        if recorded is not None:
+            self._store(key, context, recorded)
+
+    def _store(self, key, context, events=MISSING):
+        log = logging.getLogger(__name__)
+        timeout = settings.DELVE_CHECKPOINT_TIMEOUT
+        try:
+            if events is not MISSING:
+                self.cache.set(self._events_key(key), events, timeout=timeout)
+                self._track(key)
+            self.cache.set(
+                self._context_key(key),
+                {"context": context, "materialized": events is not MISSING},
+                timeout=timeout,
+            )
+        except Exception:
+            # ie. events which can't be pickled
+            log.debug("Unable to save checkpoint", exc_info=True)
+            self.cache.delete(self._events_key(key))
+
+    def _track(self, key):
+        """
+        Keep at most DELVE_CHECKPOINT_MAX_PER_SESSION checkpoints of
+        events for the session, deleting the oldest.
+        """
+        keys = [k for k in self.cache.get(self._session_key(), []) if k != key]
+        keys.append(key)
+        expired = keys[:-settings.DELVE_CHECKPOINT_MAX_PER_SESSION]
+        keys = keys[-settings.DELVE_CHECKPOINT_MAX_PER_SESSION:]
+        if expired:
+            self.cache.delete_many(
+                [self._events_key(k) for k in expired] + [self._context_key(k) for k in expired]
+            )
+        self.cache.set(self._session_key(), keys, timeout=settings.DELVE_CHECKPOINT_TIMEOUT)
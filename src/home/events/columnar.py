@@ -0,0 +1,235 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+An optional columnar representation of result sets, for search commands
+doing numeric work on many events.
+
+A ColumnBatch holds the events of a result set as one list per field,
+and converts a field to a NumPy array the first time a command asks for
+it as numbers. Commands opt in by passing a columnar function to
+search_command, Query.resolve then hands them a ColumnBatch instead of
+events, and converts back to events only for a stage which can't take
+one, so a chain of columnar stages (ie. stats followed by sort) never
+builds the dicts in between.
+
+NumPy is not a requirement of Delve. Without it (or with
+DELVE_COLUMNAR set to False) every command runs on events as usual.
+"""
+
+import operator
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from events.util import hashable
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Integers beyond this can't be represented exactly as floats
+MAX_EXACT_INTEGER = 2 ** 53
+
+
+def is_enabled() -> bool:
+    return numpy is not None and settings.DELVE_COLUMNAR
+
+
+class _Missing:
+    """
+    The value of a field an event doesn't have, which is different from
+    a field holding None.
+    """
+    def __repr__(self):
+        return "MISSING"
+
+    def __bool__(self):
+        return False
+
+    def __reduce__(self):
+        # Unpickles as the MISSING of this module, so "is" still works
+        return "MISSING"
+
+
+MISSING = _Missing()
+
+
+class ColumnBatch:
+    """
+    The events of a result set stored by field. Each column holds one
+    value per event, MISSING where the event doesn't have the field.
+    Iterating a ColumnBatch yields the events as dicts.
+    """
+    def __init__(self, columns: Dict[str, List[Any]], length: int):
+        self.columns = columns
+        self.length = length
+        self._numeric = {}
+
+    @classmethod
+    def from_events(cls, events: List[Any]) -> Optional["ColumnBatch"]:
+        """
+        Return a ColumnBatch of events, a list of dicts, or None if any
+        of them is not a dict.
+        """
+        columns = {}
+        length = 0
+        for event in events:
+            if type(event) is not dict:
+                return None
+            for key, value in event.items():
+                column = columns.get(key)
+                if column is None:
+                    column = columns[key] = [MISSING] * length
+                column.append(value)
+            length += 1
+            if len(event) != len(columns):
+                for column in columns.values():
+                    if len(column) < length:
+                        column.append(MISSING)
+        return cls(columns, length)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.to_events()
+
+    def to_events(self) -> Iterator[Dict[str, Any]]:
+        names = list(self.columns)
+        for row in zip(*self.columns.values()):
+            yield {name: value for name, value in zip(names, row) if value is not MISSING}
+
+    def column(self, name: str) -> List[Any]:
+        column = self.columns.get(name)
+        if column is None:
+            return [MISSING] * self.length
+        return column
+
+    def numeric(self, name: str) -> Optional[Tuple[Any, Any, bool]]:
+        """
+        Return the field as a (values, valid, integer) tuple, where values
+        is a float64 array (NaN where valid is False), valid a boolean
+        array which is False where the field is None or missing, and
+        integer whether every value is an int.
+
+        Returns None if any value is not an int or float (booleans
+        included), or is an int too large to be exact as a float, in
+        which case the command should work on events instead.
+        """
+        if name in self._numeric:
+            return self._numeric[name]
+        column = self.column(name)
+        types = set(map(type, column))
+        ret = None
+        if types <= {int, float}:
+            values = numpy.array(column, dtype=numpy.float64)
+            valid = numpy.ones(self.length, dtype=bool)
+            ret = (values, valid, float not in types)
+        elif types <= {int, float, type(None), _Missing}:
+            valid = numpy.array([value is not None and value is not MISSING for value in column], dtype=bool)
+            values = numpy.array(
+                [value if value is not None and value is not MISSING else numpy.nan for value in column],
+                dtype=numpy.float64,
+            )
+            ret = (values, valid, float not in types)
+        if ret is not None and ret[2] and ret[1].any():
+            if numpy.abs(ret[0][ret[1]]).max() > MAX_EXACT_INTEGER:
+                ret = None
+        self._numeric[name] = ret
+        return ret
+
+    def take(self, indices: List[int]) -> "ColumnBatch":
+        """
+        Return a new ColumnBatch of the events at indices, in that order.
+        """
+        if not indices:
+            return ColumnBatch({name: [] for name in self.columns}, 0)
+        if len(indices) == 1:
+            index = indices[0]
+            return ColumnBatch({name: [column[index]] for name, column in self.columns.items()}, 1)
+        get = operator.itemgetter(*indices)
+        return ColumnBatch({name: list(get(column)) for name, column in self.columns.items()}, len(indices))
+
+    def with_column(self, name: str, values: List[Any]) -> "ColumnBatch":
+        """
+        Return a new ColumnBatch with values as its first column, like
+        {name: value, **event} for each event: events which already have
+        the field keep their own value.
+        """
+        existing = self.columns.get(name)
+        if existing is not None:
+            values = [value if own is MISSING else own for value, own in zip(values, existing)]
+        columns = {name: values}
+        columns.update((key, column) for key, column in self.columns.items() if key != name)
+        return ColumnBatch(columns, self.length)
+
+    def factorize(self, fields: List[str]) -> Tuple[Any, List[List[Any]]]:
+        """
+        Number the groups of events with the same values of fields, in
+        the order they are first seen. Returns (codes, keys) where codes
+        is an int64 array holding the group number of each event and keys
+        the values of fields for each group. Missing fields are None.
+        """
+        if not fields:
+            keys = [[]] if self.length else []
+            return numpy.zeros(self.length, dtype=numpy.int64), keys
+        columns = [self.column(field) for field in fields]
+        index = {}
+        keys = []
+        codes = numpy.empty(self.length, dtype=numpy.int64)
+        for position, row in enumerate(zip(*columns)):
+            row = [None if value is MISSING else value for value in row]
+            key = tuple(hashable(value) for value in row)
+            code = index.get(key)
+            if code is None:
+                code = index[key] = len(keys)
+                keys.append(row)
+            codes[position] = code
+        return codes, keys
+
+
+def group_aggregate(function: str, codes, groups: int, values, valid, integer: bool) -> List[Any]:
+    """
+    Compute the aggregate function (count, sum, avg, min, max or stdev)
+    of the valid values of each of groups groups, codes holding the group
+    of each value. Returns one result per group, with the same types and
+    empty-group results as the aggregates of stats._aggregate.
+    """
+    codes = codes[valid]
+    values = values[valid]
+    count = numpy.bincount(codes, minlength=groups)
+    if function == "count":
+        return count.tolist()
+    counts = count.tolist()
+    if function == "sum" and integer:
+        totals = numpy.zeros(groups, dtype=numpy.int64)
+        numpy.add.at(totals, codes, values.astype(numpy.int64))
+        return totals.tolist()
+    if function in ("sum", "avg", "stdev"):
+        totals = numpy.bincount(codes, weights=values, minlength=groups)
+    if function == "sum":
+        return [total if n else 0 for total, n in zip(totals.tolist(), counts)]
+    if function == "avg":
+        return [total / n if n else None for total, n in zip(totals.tolist(), counts)]
+    if function in ("min", "max"):
+        if function == "min":
+            # NaN sorts after every number (see events.sorting.sort_key),
+            # so it is only the minimum of a group holding nothing else
+            results = numpy.full(groups, numpy.inf)
+            numpy.fmin.at(results, codes, values)
+            nans = numpy.bincount(codes, weights=numpy.isnan(values), minlength=groups)
+            results[nans == count] = numpy.nan
+        else:
+            results = numpy.full(groups, -numpy.inf)
+            numpy.maximum.at(results, codes, values)
+        cast = int if integer else float
+        return [cast(result) if n else None for result, n in zip(results.tolist(), counts)]
+    if function == "stdev":
+        means = totals / numpy.maximum(count, 1)
+        deviations = values - means[codes]
+        m2 = numpy.bincount(codes, weights=deviations * deviations, minlength=groups)
+        return [float(numpy.sqrt(m / (n - 1))) if n >= 2 else None for m, n in zip(m2.tolist(), counts)]
+    raise ValueError(f"Unsupported columnar aggregate: {function}")
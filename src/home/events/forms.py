@@ -51,6 +51,10 @@ class QueryForm(forms.ModelForm):
     _save = forms.BooleanField(
         required=False,
     )
+    profile = forms.BooleanField(
+        required=False,
+        help_text="Report the time, rows, memory and SQL of each search command.",
+    )
 
     class Meta:
         model = Query
@@ -0,0 +1,382 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+The ingest pipeline: extraction and processing of new and updated
+events, and bulk ingestion for forwarders posting large batches to
+/api/events/bulk/.
+
+The extractions and processors of each sourcetype (from
+DELVE_EXTRACTION_MAP and DELVE_PROCESSOR_MAP) are imported once per
+process, see get_extractors and get_processors, and process_events runs
+them on a list of events one sourcetype at a time. An extraction or
+processor with a batch attribute is called once per batch instead of
+once per event: extraction.batch takes a list of texts and returns a
+list of results, processor.batch takes a list of events.
+
+Extraction is pure CPU, so with DELVE_INGEST_WORKERS set a batch of at
+least DELVE_INGEST_PARALLEL_THRESHOLD events is extracted in chunks by a
+pool of worker processes, kept for the life of the process, and the
+fields are merged back before the events are written.
+
+Events saved one at a time are extracted and processed by the pre_save
+signal of events.signals, events created in bulk by whoever creates
+them, so each event is processed exactly once.
+
+The request body is parsed once (with orjson when it is installed) and
+each event is checked against FIELDS, a plain dict of field names to
+types, instead of going through a serializer per event. Ids are
+generated up front, the events are processed in one batch, and written
+in one transaction, with COPY on PostgreSQL or bulk_create in batches of
+DELVE_INGEST_BATCH_SIZE rows otherwise.
+"""
+
+import csv
+import io
+import json
+import logging
+import math
+import pickle
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from itertools import repeat
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from uuid_utils.compat import uuid7
+
+from events import result_cache
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The fields an ingested event may set, with their type and maximum
+# length. Other keys are ignored, as by EventSerializer.
+FIELDS = {
+    "index": (str, 255),
+    "source": (str, 255),
+    "sourcetype": (str, 255),
+    "host": (str, 255),
+    "text": (str, None),
+    "extracted_fields": (dict, None),
+}
+
+# The columns written by COPY, in order
+COPY_COLUMNS = ("id", "created", "index", "source", "sourcetype", "host", "text", "extracted_fields", "user_id")
+
+
+def compile_functions(functions: Any) -> Tuple[Callable, ...]:
+    """
+    Return the functions configured for a sourcetype (a function, a dotted
+    path, or a list of either) as a tuple of functions.
+    """
+    if functions is None:
+        return ()
+    if not isinstance(functions, (tuple, list)):
+        functions = [functions]
+    return tuple(
+        import_string(function) if isinstance(function, str) else function
+        for function in functions
+    )
+
+
+@lru_cache(maxsize=None)
+def get_extractors(sourcetype: str) -> Tuple[Callable, ...]:
+    return compile_functions(settings.DELVE_EXTRACTION_MAP.get(sourcetype))
+
+
+@lru_cache(maxsize=None)
+def get_processors(sourcetype: str) -> Tuple[Callable, ...]:
+    return compile_functions(settings.DELVE_PROCESSOR_MAP.get(sourcetype))
+
+
+def clear_dispatch_tables() -> None:
+    get_extractors.cache_clear()
+    get_processors.cache_clear()
+
+
+def load_dispatch_tables() -> None:
+    """
+    Import the extractions and processors of every configured sourcetype,
+    so the first events ingested don't pay for it. A function which can't
+    be imported is logged, and fails the events of its sourcetype only.
+    """
+    log = logging.getLogger(__name__)
+    for mapping, get in ((settings.DELVE_EXTRACTION_MAP, get_extractors), (settings.DELVE_PROCESSOR_MAP, get_processors)):
+        for sourcetype in mapping:
+            try:
+                get(sourcetype)
+            except ImportError:
+                log.exception(f"Unable to import the functions of sourcetype: {sourcetype}")
+
+
+def extract(event: Any) -> Dict[str, Any]:
+    """
+    Run the extractions of the event's sourcetype on its text, adding the
+    fields to extracted_fields. Returns the fields extracted.
+    """
+    ret = {}
+    for extraction in get_extractors(event.sourcetype):
+        value = extraction(event.text)
+        ret.update(value if isinstance(value, dict) else {"value": value})
+    event.extracted_fields.update(ret)
+    return ret
+
+
+def extract_texts(extractions: Tuple[Callable, ...], texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Run extractions on each of texts, returns the fields extracted from
+    each text. Runs in the worker processes too, so it must not touch the
+    database or settings.
+    """
+    ret = [{} for text in texts]
+    for extraction in extractions:
+        batch = getattr(extraction, "batch", None)
+        if batch is not None:
+            values = batch(texts)
+        else:
+            values = [extraction(text) for text in texts]
+        for fields, value in zip(ret, values):
+            fields.update(value if isinstance(value, dict) else {"value": value})
+    return ret
+
+
+_pool = None
+
+
+def init_worker() -> None:
+    # Worker processes which are spawned rather than forked start with a
+    # fresh interpreter, and extractions may import models
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.DELVE_INGEST_WORKERS, initializer=init_worker)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def extract_parallel(extractions: Tuple[Callable, ...], texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Like extract_texts, but in the worker processes when there are
+    enough texts to be worth it. Falls back to extracting in this process
+    if the extractions can't be sent to the workers or a worker dies.
+    """
+    workers = settings.DELVE_INGEST_WORKERS
+    if workers < 1 or len(texts) < settings.DELVE_INGEST_PARALLEL_THRESHOLD:
+        return extract_texts(extractions, texts)
+    log = logging.getLogger(__name__)
+    try:
+        # Functions are pickled by name, so they must be importable
+        pickle.dumps(extractions)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        log.warning("Extractions can't be sent to the worker processes, extracting fields here")
+        return extract_texts(extractions, texts)
+    # A few chunks per worker, so a slow chunk doesn't hold up the rest
+    size = math.ceil(len(texts) / (workers * 4))
+    chunks = [texts[start:start + size] for start in range(0, len(texts), size)]
+    log.debug(f"Extracting fields of {len(texts)} events in {len(chunks)} chunks")
+    try:
+        results = get_pool().map(extract_texts, repeat(extractions), chunks)
+        return [fields for chunk in results for fields in chunk]
+    except BrokenProcessPool:
+        log.exception("A worker process died, extracting fields here")
+        shutdown_pool()
+    return extract_texts(extractions, texts)
+
+
+def process(event: Any) -> List[Any]:
+    """
+    Run the processors of the event's sourcetype on it. Returns their
+    results.
+    """
+    return [processor(event) for processor in get_processors(event.sourcetype)]
+
+
+def process_events(events: List[Any], created: bool = True) -> None:
+    """
+    Extract the fields of and process events, which are being created
+    (or updated if created is False), as configured by the
+    DELVE_ENABLE_EXTRACTIONS_ON_* and DELVE_ENABLE_PROCESSORSS_ON_*
+    settings.
+    """
+    if created:
+        extract_enabled = settings.DELVE_ENABLE_EXTRACTIONS_ON_CREATE
+        process_enabled = settings.DELVE_ENABLE_PROCESSORSS_ON_CREATE
+    else:
+        extract_enabled = settings.DELVE_ENABLE_EXTRACTIONS_ON_UPDATE
+        process_enabled = settings.DELVE_ENABLE_PROCESSORSS_ON_UPDATE
+    if not (extract_enabled or process_enabled):
+        return
+    groups = defaultdict(list)
+    for event in events:
+        groups[event.sourcetype].append(event)
+    for sourcetype, group in groups.items():
+        if extract_enabled:
+            extractions = get_extractors(sourcetype)
+            if extractions:
+                texts = [event.text for event in group]
+                for event, fields in zip(group, extract_parallel(extractions, texts)):
+                    event.extracted_fields.update(fields)
+        if process_enabled:
+            for processor in get_processors(sourcetype):
+                batch = getattr(processor, "batch", None)
+                if batch is not None:
+                    batch(group)
+                else:
+                    for event in group:
+                        processor(event)
+
+
+def loads(body: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+def dumps(value: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value)
+
+
+def validate(rows: Any) -> List[Dict[str, Any]]:
+    """
+    Return the known fields of each event of rows, a list of dicts.
+    Raises ValueError naming the first invalid event.
+    """
+    if isinstance(rows, dict):
+        rows = [rows]
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of events")
+    ret = []
+    for position, row in enumerate(rows):
+        if not isinstance(row, dict):
+            raise ValueError(f"Event {position}: expected a JSON object")
+        event = {}
+        for name, (kind, max_length) in FIELDS.items():
+            value = row.get(name)
+            if value is None:
+                continue
+            if not isinstance(value, kind):
+                raise ValueError(f"Event {position}: {name} must be a {kind.__name__}")
+            if max_length is not None and len(value) > max_length:
+                raise ValueError(f"Event {position}: {name} must be at most {max_length} characters")
+            event[name] = value
+        if "text" not in event:
+            raise ValueError(f"Event {position}: text is required")
+        if not event["text"].strip():
+            raise ValueError(f"Event {position}: text may not be blank")
+        ret.append(event)
+    return ret
+
+
+def build_events(model, rows: List[Dict[str, Any]], user) -> List[Any]:
+    """
+    Return unsaved instances of model for rows, with their ids and
+    created set to when they were received and their fields extracted and
+    processed as on create.
+    """
+    created = timezone.now()
+    events = [model(id=uuid7(), created=created, user=user, **row) for row in rows]
+    process_events(events)
+    return events
+
+
+def copy_events(connection, model, events: List[Any]) -> None:
+    """
+    Write events with PostgreSQL's COPY FROM STDIN, in CSV format.
+    """
+    buffer = io.StringIO()
+    # COPY reads an unquoted empty value as NULL, a quoted one as ''
+    writer = csv.writer(buffer, quoting=csv.QUOTE_ALL)
+    for event in events:
+        writer.writerow(
+            (
+                event.id,
+                event.created.isoformat(),
+                event.index,
+                event.source,
+                event.sourcetype,
+                event.host,
+                event.text,
+                dumps(event.extracted_fields),
+                event.user_id,
+            )
+        )
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        quote(model._meta.db_table),
+        ", ".join(quote(column) for column in COPY_COLUMNS),
+    )
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, "copy_expert"):
+            # psycopg2
+            raw.copy_expert(sql, buffer)
+        else:
+            # psycopg 3
+            with raw.copy(sql) as copy:
+                copy.write(buffer.getvalue())
+
+
+def write_events(model, events: List[Any]) -> None:
+    """
+    Write events in a single transaction and invalidate the cached
+    results of their indexes.
+    """
+    log = logging.getLogger(__name__)
+    alias = router.db_for_write(model)
+    connection = connections[alias]
+    with transaction.atomic(using=alias):
+        if connection.vendor == "postgresql" and settings.DELVE_INGEST_COPY:
+            log.debug(f"Copying {len(events)} events")
+            copy_events(connection, model, events)
+        else:
+            log.debug(f"Bulk creating {len(events)} events")
+            model.objects.using(alias).bulk_create(events, batch_size=settings.DELVE_INGEST_BATCH_SIZE)
+    result_cache.invalidate(model, {event.index for event in events})
+
+
+def parse(model, body: bytes, user) -> List[Any]:
+    """
+    Parse and validate the events of body, a JSON array of events (or a
+    single event), for user. Returns them as unsaved instances of model,
+    see build_events.
+    """
+    try:
+        rows = loads(body)
+    except ValueError as exception:
+        raise ValueError(f"Invalid JSON: {exception}")
+    return build_events(model, validate(rows), user)
+
+
+def ingest(model, body: bytes, user) -> List[Any]:
+    """
+    Parse, validate and write the events of body for user. Returns the
+    events written.
+    """
+    events = parse(model, body, user)
+    if events:
+        write_events(model, events)
+    return events
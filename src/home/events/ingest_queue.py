@@ -0,0 +1,193 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+A single writer for ingested events, for SQLite deployments.
+
+SQLite allows one writer at a time, so concurrent ingest requests wait
+for its lock (up to the timeout of DATABASES) and throughput falls as
+forwarders are added. With DELVE_INGEST_QUEUE set, /api/events/ and
+/api/events/bulk/ validate and process the events in the request, hand
+them to the IngestQueue of the process and return 202 Accepted. The
+ingress view still writes in the request. One writer thread
+commits everything pending in a single transaction every
+DELVE_INGEST_QUEUE_INTERVAL seconds, so the number of write transactions
+doesn't grow with the number of requests.
+
+The response is sent before the events are written, so the queue
+requires DELVE_INGEST_SPOOL: each batch is appended to the spool (see
+events.spool) before the request returns, what is left in it is written
+when the queue starts again, and a batch which can't be written is set
+aside in it rather than lost.
+
+With DELVE_INGEST_SPOOL_DRAIN set too, the queue holds nothing in
+memory: requests only append to the spool, and the writer thread seals
+the open segment every DELVE_INGEST_QUEUE_INTERVAL seconds and leaves
+writing it to the drain task, so ingest doesn't wait on the database at
+all.
+"""
+
+import atexit
+import logging
+import threading
+from typing import Any, List, Optional
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError, connections
+
+from events import ingest
+from events import spool as spools
+
+
+class IngestQueue:
+    """
+    Events waiting to be written by the writer thread. put is called
+    from the request threads, flush from the writer thread (or directly,
+    ie. in tests).
+    """
+    def __init__(self, model, interval: float, spool: Optional[spools.Spool], drain: bool = False):
+        if spool is None:
+            raise ImproperlyConfigured("DELVE_INGEST_QUEUE requires DELVE_INGEST_SPOOL")
+        self.model = model
+        self.interval = interval
+        self.spool = spool
+        self.drain = drain
+        self.pending = []
+        # The segments of the spool holding the pending events, the other
+        # segments were left by a previous run
+        self.segments = []
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def start(self) -> None:
+        """
+        Seal what a previous run left open in the spool and start the
+        writer thread, unless it is running. The writer thread (or the
+        scheduled drain) writes what was left.
+        """
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.spool.recover()
+            self.thread = threading.Thread(target=self.run, name="delve-ingest-writer", daemon=True)
+            self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stop the writer thread after it has written what is pending.
+        """
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def put(self, events: List[Any]) -> None:
+        """
+        Queue unsaved events (with their ids set) to be written. Returns
+        once they are in the spool, without touching the database.
+        """
+        self.start()
+        if self.drain:
+            self.spool.append([spools.event_to_row(event) for event in events])
+            return
+        with self.lock:
+            # In the spool and pending together, so a flush can't seal
+            # them without writing them
+            ticket = self.spool.write([spools.event_to_row(event) for event in events])
+            self.pending.extend(events)
+        self.spool.sync(ticket)
+
+    def run(self) -> None:
+        log = logging.getLogger(__name__)
+        try:
+            if self.drain:
+                # Here rather than in a request, which must not wait on
+                # the database
+                try:
+                    spools.schedule_drain()
+                except Exception:
+                    log.exception("Unable to schedule the drain of the ingest spool")
+            while not self.stopping.wait(self.interval):
+                try:
+                    self.flush()
+                except Exception:
+                    log.exception("Unable to write queued events")
+            self.flush()
+        finally:
+            connections.close_all()
+
+    def flush(self) -> int:
+        """
+        Write every pending event in one transaction, after what a
+        previous run left in the spool. Returns the number of pending
+        events written.
+        """
+        log = logging.getLogger(__name__)
+        if self.drain:
+            self.spool.seal()
+            if self.spool.take_sealed():
+                spools.queue_drain()
+            return 0
+        with self.lock:
+            events, self.pending = self.pending, []
+            self.spool.seal()
+            self.segments.extend(self.spool.take_sealed())
+            leftovers = [path for path in self.spool.segments() if path not in self.segments]
+            segments, self.segments = self.segments, []
+        if leftovers:
+            # Until they are written, the next flush tries again
+            spools.write_segments(self.model, self.spool, leftovers)
+        if not events:
+            return 0
+        try:
+            ingest.write_events(self.model, events)
+        except OperationalError:
+            # ie. the database is locked, they are written next time
+            with self.lock:
+                self.pending[:0] = events
+                self.segments[:0] = segments
+            raise
+        except Exception:
+            log.exception(f"Unable to write {len(events)} queued events, setting their spool segments aside")
+            for segment in segments:
+                self.spool.fail(segment)
+            return 0
+        for segment in segments:
+            self.spool.remove(segment)
+        log.debug(f"Wrote {len(events)} queued events")
+        return len(events)
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue(model) -> IngestQueue:
+    """
+    Return the IngestQueue of the process, created the first time.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = IngestQueue(
+                model,
+                settings.DELVE_INGEST_QUEUE_INTERVAL,
+                spools.get_spool(),
+                settings.DELVE_INGEST_SPOOL_DRAIN,
+            )
+        return _queue
+
+
+def reset_queue() -> None:
+    """
+    Stop the IngestQueue of the process, if any, after it has written
+    what is pending. The next get_queue creates a new one.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            _queue.stop()
+            _queue = None
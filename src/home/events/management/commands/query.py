@@ -68,6 +68,11 @@ class Command(BaseCommand):
             default="table",
             help="The output format (default pprint)",
         )
+        parser.add_argument(
+            "--profile",
+            action="store_true",
+            help="Profile each stage of the query and print the report after the results",
+        )
 
     def handle(self, *args, **options):
         log = logging.getLogger(__name__)
@@ -97,6 +102,9 @@ class Command(BaseCommand):
         format = options["format"]
         log.info(f"Found format: {format}")
 
+        profile = options["profile"]
+        log.info(f"Found profile: {profile}")
+
         if input_file.isatty():
             print("Please provide query. Use EOF (windows ctrl+Z Enter, Linux ctrl+D)")
         text = input_file.read()
@@ -113,11 +121,16 @@ class Command(BaseCommand):
             data={
                 "text": text,
                 "name": name,
+                "profile": "true" if profile else "",
             }
         )
         log.info(f"Received response: {response}")
         response_json = response.json()
         log.info(f"Found response json: {response_json}")
+        profile_json = []
+        if profile and format == "table" and isinstance(response_json, dict) and "profile" in response_json:
+            profile_json = response_json["profile"]
+            response_json = response_json["results"]
         if format == "table":
             column_names = set()
             if isinstance(response_json, list):
@@ -141,6 +154,30 @@ class Command(BaseCommand):
                 table.add_row(*[json.dumps(value) for value in event.values()])
             console = Console()
             console.print(table)
+            if profile_json:
+                profile_table = Table(
+                    "stage",
+                    "wall time (s)",
+                    "cpu time (s)",
+                    "rows in",
+                    "rows out",
+                    "peak memory (bytes)",
+                    "queries",
+                    "sql time (s)",
+                    title="Profile",
+                )
+                for stage in profile_json:
+                    profile_table.add_row(
+                        stage["stage"].strip(),
+                        f"{stage['wall_time']:.6f}",
+                        f"{stage['cpu_time']:.6f}",
+                        str(stage["rows_in"]),
+                        str(stage["rows_out"]),
+                        str(stage["peak_memory"]),
+                        str(len(stage["queries"])),
+                        f"{stage['sql_time']:.6f}",
+                    )
+                console.print(profile_table)
             # print(json.dumps(response_json, indent=4))
         elif format == "json":
             print(json.dumps(response_json, indent=4))
@@ -3,12 +3,14 @@
 # See the LICENSE file in the root of this repository for details.
 
 import re
-import sys
 import shlex
 import logging
+from collections import namedtuple
+from itertools import chain, islice
+from contextlib import nullcontext
+from functools import lru_cache
 from uuid import uuid4
 from uuid import UUID as UUID
-from io import StringIO
 
 from django.db import models
 from django.conf import settings
@@ -16,13 +18,21 @@ from django.db.models.query import QuerySet
 from django.db.models.manager import Manager
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from django.utils.module_loading import import_string
 
 from jinja2 import Environment
 from uuid_utils import uuid7
 
 from .validators import JsonObjectValidator
-from events.util import resolve
+from events.util import apply_row_functions, iter_events, resolve
+from events.capture import capture_output
+from events import result_cache
+from events import single_flight
+from events import ingest
+from events.checkpoints import QueryCheckpoints
+from events import columnar
+from events.columnar import ColumnBatch
 
 
 class FileUpload(models.Model):
@@ -117,6 +127,54 @@ class LocalContext(models.Model):
         if not isinstance(self.context, dict):
             raise ValidationError('Context must be a mapping (dict, object)')
 
+TEMPLATE_MARKERS = ("{{", "{%", "{#")
+
+template_environment = Environment()
+template_environment.trim_blocks = True
+template_environment.lstrip_blocks = True
+template_environment.strip_trailing_newlines = True
+
+QueryStage = namedtuple("QueryStage", ["text", "operation", "template", "argv"])
+
+@lru_cache(maxsize=settings.DELVE_QUERY_PLAN_CACHE_SIZE)
+def compile_query_plan(text):
+    """
+    Split the text of a query into its stages, resolve the search command
+    for each stage and compile any Jinja2 templates.
+
+    Stages which contain no template markers skip Jinja2 entirely and
+    carry their pre-split argv, stages which do carry the compiled
+    template and are rendered and split at execution time. The result is
+    cached in a bounded LRU keyed by the query text (see
+    DELVE_QUERY_PLAN_CACHE_SIZE).
+    """
+    log = logging.getLogger(__name__)
+    log.debug(f"Compiling query plan for: {text}")
+    search_commands = re.split(r'(?<!\|)\|(?!\|)', text)
+    search_commands = [search_command.replace('||', '|') for search_command in search_commands]
+    log.debug(f"Found search_commands: {search_commands}")
+    ret = []
+    for search_command in search_commands:
+        log.debug(f"Found search_command: {search_command}")
+        argv = shlex.split(search_command, comments=True)
+        log.debug(f"Found argv: {argv}")
+        funcname = argv[0]
+        log.debug(f"Found funcname: {funcname}")
+        if funcname not in settings.DELVE_SEARCH_COMMANDS:
+            raise ValueError(f"{funcname} is not a recognized search command.")
+        funcpath = settings.DELVE_SEARCH_COMMANDS[funcname]
+        log.debug(f"Found funcpath: {funcpath}")
+        func = import_string(funcpath)
+        log.debug(f"Found func: {func}")
+        if any(marker in search_command for marker in TEMPLATE_MARKERS):
+            template = template_environment.from_string(search_command)
+            argv = None
+        else:
+            template = None
+            argv = tuple(argv)
+        ret.append(QueryStage(search_command, func, template, argv))
+    return tuple(ret)
+
 class Query(models.Model):
     id = models.UUIDField(
         default=uuid4,
@@ -148,42 +206,25 @@ class Query(models.Model):
         blank=True,
     )
 
+    def get_query_plan(self):
+        """
+        Return the compiled stages for this query's text. Plans are
+        cached by compile_query_plan, so resolving the same text again
+        skips parsing, importing and template compilation.
+        """
+        return compile_query_plan(self.text)
+
     def get_search_commands(self):
+        return [(stage.text, stage.operation) for stage in self.get_query_plan()]
+
+    def get_environment(self, request, context=None):
+        """
+        Return the globals and context used to render this query's
+        templates. context may be a dict, the name of one of the
+        user's LocalContexts or None.
+        """
         log = logging.getLogger(__name__)
-        log.debug(f"Found self.text: {self.text}")
-        search_commands = re.split(r'(?<!\|)\|(?!\|)', self.text)
-        search_commands = [search_command.replace('||', '|') for search_command in search_commands]
-        log.debug(f"Found search_commands: {search_commands}")
-        ret = []
-        for search_command in search_commands:
-            log.debug(f"Found search_command: {search_command}")
-            argv = shlex.split(search_command, comments=True)
-            log.debug(f"Found argv: {argv}")
-            funcname = argv[0]
-            log.debug(f"Found funcname: {funcname}")
-            if funcname not in settings.DELVE_SEARCH_COMMANDS:
-                raise ValueError(f"{funcname} is not a recognized search command.")
-            funcpath = settings.DELVE_SEARCH_COMMANDS[funcname]
-            log.debug(f"Found funcpath: {funcpath}")
-            func = import_string(funcpath)
-            log.debug(f"Found func: {func}")
-            ret.append((search_command, func))
-        return ret
-    
-    def resolve(self, request, context=None, events=None):
-        log = logging.getLogger(__name__)
-        # I need this so the import for events.models.Event happens after initialization
-        search_commands = self.get_search_commands()
-        log.debug(f"Found search_commands: {search_commands}")
-        if events is not None:
-            matching_events = events
-        else:
-            matching_events = []
         log.debug(f"Provisioning jinja2 context")
-        environment = Environment()
-        environment.trim_blocks = True
-        environment.lstrip_blocks = True
-        environment.strip_trailing_newlines = True
         try:
             environment_globals = request.user.global_context.context
         except AttributeError:
@@ -201,54 +242,235 @@ class Query(models.Model):
             log.debug(f"Found context to be dict, using as-is.")
         else:
             raise ValueError(f"Unsupported type for context")
+        return environment_globals, context
+
+    def render_argv(self, stage, environment_globals, context):
+        if stage.template is None:
+            return list(stage.argv)
+        # Context takes precedence over globals, the same as passing
+        # globals to Environment.from_string
+        search_command = stage.template.render({**(environment_globals or {}), **context})
+        logging.getLogger(__name__).debug(f"Rendered search_command: {search_command}")
+        return shlex.split(search_command, comments=True)
+
+    def get_limit(self, query_plan, position):
+        """
+        Return the maximum number of events the stage after position
+        reads, if it declares one (see search_command's limit) which is
+        known without rendering the stage, otherwise None.
+        """
+        if position + 1 >= len(query_plan):
+            return None
+        next_stage = query_plan[position + 1]
+        limit = getattr(next_stage.operation, "limit", None)
+        if limit is None or next_stage.argv is None:
+            return None
+        try:
+            return limit(list(next_stage.argv))
+        except (Exception, SystemExit):
+            return None
+
+    def apply_columnar(self, request, operation, events, argv, context):
+        """
+        Call the columnar function of operation (see search_command) with
+        events as a ColumnBatch, converting them unless the previous stage
+        returned one. Returns the result, or None if the command has to
+        run on events as usual, along with the events to run it on, since
+        converting reads them.
+        """
+        function = getattr(operation, "columnar", None)
+        if function is None or not columnar.is_enabled():
+            return None, events
+        if isinstance(events, ColumnBatch):
+            batch = events
+        elif not getattr(operation, "columnar_input", True):
+            return None, events
+        else:
+            # Larger result sets are left to the command, which may
+            # stream them in bounded memory.
+            limit = settings.DELVE_COLUMNAR_MAX_EVENTS
+            rows = iter_events(events)
+            head = list(islice(rows, limit + 1))
+            if len(head) > limit:
+                return None, chain(head, rows)
+            batch = ColumnBatch.from_events(head)
+            if batch is None:
+                return None, head
+        # argv is copied because commands pop their own name from it
+        return function(request, batch, list(argv), context), batch
+
+    def resolve(self, request, context=None, events=None, profiler=None, checkpoints=False):
+        """
+        Run the query and return the resulting events.
 
-        # We have to patch sys.stdout and sys.stderr, to 
+        If profiler (an events.profiling.QueryProfiler) is given, the
+        time, rows, memory and SQL of each stage are recorded on it.
+
+        If settings.DELVE_RESULT_CACHE_TIMEOUT is set, the results of
+        queries which read their events from the database are cached,
+        see events.result_cache.
+
+        If settings.DELVE_SINGLE_FLIGHT is set, concurrent requests for
+        the same query share one run of it, see events.single_flight.
+
+        If checkpoints is True and settings.DELVE_CHECKPOINT_TIMEOUT is
+        set, the results of each stage are saved for the request's session
+        and the query resumes from the longest prefix of its pipeline which
+        ran before, see events.checkpoints.
+        """
+        log = logging.getLogger(__name__)
+        environment_globals, context = self.get_environment(request, context)
+        if profiler is not None:
+            with profiler:
+                return self._resolve(request, context, environment_globals, events, profiler)
+        cache_key = None
+        if settings.DELVE_RESULT_CACHE_TIMEOUT and events is None:
+            cache_key = result_cache.get_key(self, request, context, environment_globals)
+        if cache_key is not None:
+            cached = result_cache.lookup(cache_key)
+            if cached is not None:
+                log.debug(f"Found cached results: {cache_key}")
+                return cached
+        query_checkpoints = None
+        if checkpoints and settings.DELVE_CHECKPOINT_TIMEOUT and events is None:
+            query_checkpoints = QueryCheckpoints.for_request(request, context, environment_globals)
+        flight_key = None
+        if settings.DELVE_SINGLE_FLIGHT and events is None:
+            flight_key = single_flight.get_key(self, context, environment_globals)
+        if flight_key is not None:
+            matching_events = single_flight.queries.do(
+                flight_key,
+                request,
+                lambda: self._resolve(request, context, environment_globals, events, profiler, query_checkpoints),
+            )
+        else:
+            matching_events = self._resolve(request, context, environment_globals, events, profiler, query_checkpoints)
+        if cache_key is not None:
+            result_cache.store(cache_key, matching_events)
+        return matching_events
+
+    def _resolve(self, request, context, environment_globals, events, profiler, checkpoints=None):
+        log = logging.getLogger(__name__)
+        # I need this so the import for events.models.Event happens after initialization
+        query_plan = self.get_query_plan()
+        log.debug(f"Found query_plan: {query_plan}")
+        if events is not None:
+            matching_events = events
+        else:
+            matching_events = []
+        start = 0
+        if checkpoints is not None:
+            restored = checkpoints.restore(
+                query_plan,
+                context,
+                lambda stage, context: self.render_argv(stage, environment_globals, context),
+            )
+            if restored is not None:
+                start, matching_events, context = restored
+                log.debug(f"Restored checkpoint, resuming at stage {start}")
+
+        # The row functions of the current chain of row-wise stages and
+        # the events the chain started from
+        row_functions = []
+        fused_events = None
+        # We have to capture sys.stdout and sys.stderr, to
         # catch any output from exceptions
-        for search_command, operation in search_commands:
-            log.debug(f"Found search_command: {search_command}")
-            search_command = environment.from_string(search_command, globals=environment_globals).render(context)
-            log.debug(f"Rendered search_command: {search_command}")
-            argv = shlex.split(search_command, comments=True)
-            log.debug("swapping stdout and stderr")
-            orig_stderr = sys.stderr
-            orig_stdout = sys.stdout
-            sys.stderr = StringIO()
-            sys.stdout = StringIO()
-            log.debug(f"Checking for search_command validators")
-            if settings.DELVE_STRICT_VALIDATION:
-                if operation.input_validators is not None:
-                    log.debug(f"Found Input validators: {operation.input_validators}")
-                    for validator in operation.input_validators:
-                        log.debug(f"Verifying validator {validator} against events.")
-                        validator(events=matching_events)
-                        log.debug(f"Successfully validated against: {validator}")
-                    log.debug(f"Successfully tested all validators for {operation}")
-            try:
-                log.debug(f"Attempting to apply operation: {operation}")
-                matching_events = operation(request, matching_events, argv, context)
-                log.debug(f"Successfully called operation: {operation}")
-            except (Exception, SystemExit) as exception:
-                logging.exception("An unhandled exception occurred.")
+        for position, stage in enumerate(query_plan[start:], start):
+            operation = stage.operation
+            log.debug(f"Found search_command: {stage.text}")
+            argv = self.render_argv(stage, environment_globals, context)
+            # Commands pop their own name from argv
+            rendered_argv = list(argv)
+            log.debug("capturing stdout and stderr")
+            with capture_output() as output:
+                log.debug(f"Checking for search_command validators")
+                if settings.DELVE_STRICT_VALIDATION:
+                    if operation.input_validators is not None:
+                        log.debug(f"Found Input validators: {operation.input_validators}")
+                        for validator in operation.input_validators:
+                            log.debug(f"Verifying validator {validator} against events.")
+                            validator(events=matching_events)
+                            log.debug(f"Successfully validated against: {validator}")
+                        log.debug(f"Successfully tested all validators for {operation}")
                 try:
-                    sys.stderr.seek(0)
-                    sys.stdout.seek(0)
-                except:
-                    log.exception("An Unhandled exception occurred.")
-                return [
-                    {
-                        "stdout": sys.stdout.read(),
-                        "stderr": sys.stderr.read(),
-                        "exception": str(exception),
-                        "matching_events": events,
-                    },
-                ]
-            finally:
-                log.debug("replacing original stdout and stderr")
-                sys.stderr = orig_stderr
-                sys.stdout = orig_stdout
+                    measure = profiler.measure(stage.text) if profiler is not None else nullcontext()
+                    with measure as stage_profile:
+                        fused = False
+                        pushed_down = None
+                        pushdown = getattr(operation, "pushdown", None)
+                        if pushdown is not None and isinstance(matching_events, QuerySet):
+                            # Give the command a chance to run in the database, argv
+                            # is copied because commands pop their own name from it.
+                            log.debug(f"Attempting to push down operation: {operation}")
+                            pushed_down = pushdown(request, matching_events, list(argv), context)
+                        if pushed_down is not None:
+                            log.debug(f"Successfully pushed down operation: {operation}")
+                            matching_events = pushed_down
+                            if stage_profile is not None:
+                                stage_profile.pushed_down = True
+                        else:
+                            number = None
+                            if getattr(operation, "top", None) is not None:
+                                number = self.get_limit(query_plan, position)
+                            columnar_result = None
+                            if number is None:
+                                columnar_result, matching_events = self.apply_columnar(
+                                    request, operation, matching_events, argv, context
+                                )
+                            if columnar_result is None and isinstance(matching_events, ColumnBatch):
+                                # Back to events for a command which can't take a batch
+                                matching_events = matching_events.to_events()
+                            row_function = getattr(operation, "row_function", None)
+                            if columnar_result is not None:
+                                log.debug(f"Applied operation: {operation} to a ColumnBatch")
+                                matching_events = columnar_result
+                            elif row_function is not None and number is None and profiler is None:
+                                # Fuse consecutive row-wise stages: the events the chain
+                                # started from are passed through every stage's function
+                                # in a single pass. The generator of the previous stage
+                                # was never started, so it is simply replaced.
+                                if not row_functions:
+                                    fused_events = matching_events
+                                row_functions.append(row_function(request, argv, context))
+                                log.debug(f"Fusing operation: {operation} with {len(row_functions) - 1} previous stages")
+                                matching_events = apply_row_functions(fused_events, tuple(row_functions))
+                                fused = True
+                            elif number is not None:
+                                log.debug(f"Attempting to apply operation: {operation} to the top {number} events")
+                                matching_events = operation.top(request, matching_events, argv, context, number)
+                                # Only the top events were produced, so this checkpoint
+                                # must not be resumed from by a query reading more.
+                                rendered_argv.append(f"--top={number}")
+                            else:
+                                log.debug(f"Attempting to apply operation: {operation}")
+                                matching_events = operation(request, matching_events, argv, context)
+                            log.debug(f"Successfully called operation: {operation}")
+                    if not fused:
+                        row_functions = []
+                    if profiler is not None:
+                        matching_events = profiler.wrap(stage_profile, matching_events)
+                    if checkpoints is not None:
+                        matching_events = checkpoints.save(stage, rendered_argv, matching_events, context)
+                except (Exception, SystemExit) as exception:
+                    logging.exception("An unhandled exception occurred.")
+                    return [
+                        {
+                            "stdout": output.stdout.getvalue(),
+                            "stderr": output.stderr.getvalue(),
+                            "exception": str(exception),
+                            "matching_events": events,
+                        },
+                    ]
+        if isinstance(matching_events, ColumnBatch):
+            matching_events = matching_events.to_events()
         # Resolve any QuerySets, generators, etc.
         log.debug(f"Attempting to resolve QuerySets, generators, etc.")
-        matching_events = resolve(matching_events)
+        if profiler is not None:
+            with profiler.measure("resolve") as stage_profile:
+                matching_events = resolve(matching_events, fill=True)
+            profiler.wrap(stage_profile, matching_events)
+        else:
+            matching_events = resolve(matching_events, fill=True)
         log.debug(f"Finished resolution")
         return matching_events
 
@@ -265,8 +487,11 @@ class BaseEvent(models.Model):
     # id = models.BigAutoField(
     #     primary_key=True,
     # )
+    # Not auto_now_add, which bulk_create would overwrite: ingest sets
+    # it when an event is received, see events.ingest.build_events
     created = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         db_index=True,
     )
     # modified = models.DateTimeField(
@@ -313,52 +538,17 @@ class BaseEvent(models.Model):
         # )
     
     def extract_fields(self):
-        log = logging.getLogger(__name__)
-        log.debug("Inside extract_fields")
-        extraction_map = settings.DELVE_EXTRACTION_MAP
-        log.debug(f"Found {extraction_map=}")
-        ret = {}
-        for sourcetype, extractions in extraction_map.items():
-            log.debug(f"Found {sourcetype=}, {extractions=}")
-            if sourcetype == self.sourcetype:
-                log.debug(f"Found {sourcetype=} matches {self.sourcetype=}")
-                if not isinstance(extractions, (tuple, list)):
-                    extractions = [extractions]
-                for extraction in extractions:
-                    log.debug(f"Performing {extraction=}")
-                    if isinstance(extraction, str):
-                        log.debug(f"Importing {extraction=}")
-                        update_value = import_string(extraction)(self.text)
-                    else:
-                        log.debug(f"Using {extraction=} as is.")
-                        update_value = extraction(self.text)
-                    
-                    if not isinstance(update_value, dict):
-                        update_value = {"value": update_value}
-                    ret.update(update_value)
-        self.extracted_fields.update(ret)
-        return ret
+        """
+        Run the extractions of the event's sourcetype, see events.ingest.
+        """
+        return ingest.extract(self)
 
     def process(self):
-        log = logging.getLogger(__name__)
-        log.debug("Inside process")
-        processor_map = settings.DELVE_PROCESSOR_MAP
-        log.debug(f"Found {processor_map=}")
-        ret = []
-        for sourcetype, processors in processor_map.items():
-            log.debug(f"Found {sourcetype=}, {processors=}")
-            if sourcetype == self.sourcetype:
-                log.debug(f"Found {sourcetype=} matches {self.sourcetype=}")
-                if not isinstance(processors, (tuple, list)):
-                    processors = [processors]
-                for processor in processors:
-                    if isinstance(processor, str):
-                        log.debug(f"Importing {processor}")
-                        ret.append(import_string(processor)(self))
-                    else:
-                        ret.append(processor(self))
-        return ret
-            
+        """
+        Run the processors of the event's sourcetype, see events.ingest.
+        """
+        return ingest.process(self)
+
 class Event(BaseEvent):
     user = models.ForeignKey(
         get_user_model(),
@@ -5,7 +5,7 @@
 """Module for parsing Apache HTTP server access logs."""
 
 import re
-from typing import Dict
+from typing import Dict, List
 
 HOST = r'^(?P<host>.*?)'
 SPACE = r'\s'
@@ -16,11 +16,13 @@ REQUEST = r'\"(?P<request>.*?)\"'
 STATUS = r'(?P<status>\d{3})'
 SIZE = r'(?P<size>\S+)'
 REGEX = HOST + SPACE + IDENTITY + SPACE + USER + SPACE + TIME + SPACE + REQUEST + SPACE + STATUS + SPACE + SIZE + SPACE
+PATTERN = re.compile(REGEX)
+FIELDS = ("host", "time", "request", "status", "size")
 
 def apache(log_line: str) -> Dict[str, str]:
     """Parse a single Apache log line and return relevant attributes."""
     # Use regex to extract fields from the provided log line
-    match = re.search(REGEX, log_line)
+    match = PATTERN.search(log_line)
     return {
         "host": match.group('host'),
         "time": match.group('time'), 
@@ -28,3 +30,10 @@ def apache(log_line: str) -> Dict[str, str]:
         "status": match.group('status'),
         "size": match.group('size'),
     }
+
+def apache_batch(log_lines: List[str]) -> List[Dict[str, str]]:
+    """Parse a batch of Apache log lines, see events.ingest."""
+    search = PATTERN.search
+    return [dict(zip(FIELDS, search(log_line).group(*FIELDS))) for log_line in log_lines]
+
+apache.batch = apache_batch
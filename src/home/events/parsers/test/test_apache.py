@@ -3,7 +3,7 @@
 # See the LICENSE file in the root of this repository for details.
 
 import unittest
-from src.home.events.parsers.apache import apache
+from src.home.events.parsers.apache import apache, apache_batch
 
 class TestApacheParser(unittest.TestCase):
     def test_apache_parser_valid_line(self):
@@ -15,5 +15,13 @@ class TestApacheParser(unittest.TestCase):
         self.assertEqual(result["status"], "200")
         self.assertEqual(result["size"], "2326")
 
+    def test_apache_parser_batch(self):
+        sample_lines = [
+            '127.0.0.1 - frank [10/Oct/2000:13:55:36 -0700] "GET /apache_pb.gif HTTP/1.0" 200 2326 ',
+            '10.0.0.1 - - [10/Oct/2000:13:55:37 -0700] "POST /login HTTP/1.1" 302 - ',
+        ]
+        self.assertIs(apache.batch, apache_batch)
+        self.assertEqual(apache_batch(sample_lines), [apache(line) for line in sample_lines])
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,208 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+import time
+import threading
+import tracemalloc
+from contextlib import ExitStack, contextmanager
+from collections.abc import Iterator
+
+from django.db import connections
+from django.db.models.query import QuerySet
+
+from events.columnar import ColumnBatch
+
+
+# tracemalloc traces the whole process, so it is started by the first
+# active QueryProfiler and stopped by the last one
+_tracing_lock = threading.Lock()
+_tracing_profilers = 0
+_started_tracing = False
+
+def _start_tracing():
+    global _tracing_profilers, _started_tracing
+    with _tracing_lock:
+        if _tracing_profilers == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_profilers += 1
+
+def _stop_tracing():
+    global _tracing_profilers, _started_tracing
+    with _tracing_lock:
+        _tracing_profilers -= 1
+        if _tracing_profilers == 0 and _started_tracing:
+            # Not if it was started by someone else (ie. PYTHONTRACEMALLOC)
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class StageProfile:
+    """
+    The measurements collected for one stage of a pipeline.
+
+    wall_time and cpu_time only include the time spent in the stage itself.
+    Search commands are lazy, so a stage usually does its work while the
+    next stage pulls events from it, the time spent pulling events from
+    the previous stage is subtracted.
+    """
+    def __init__(self, text):
+        self.text = text
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.rows_in = None
+        self.rows_out = None
+        self.output_type = None
+        self.peak_memory = 0
+        self.pushed_down = False
+        self.queries = []
+
+    def as_dict(self):
+        return {
+            "stage": self.text,
+            "wall_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "output_type": self.output_type,
+            "peak_memory": self.peak_memory,
+            "pushed_down": self.pushed_down,
+            "sql_time": sum(query["duration"] for query in self.queries),
+            "queries": self.queries,
+        }
+
+
+class _Frame:
+    def __init__(self, stage, traced_memory):
+        self.stage = stage
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.memory_start = traced_memory
+        self.memory_peak = traced_memory
+
+
+class QueryProfiler:
+    """
+    Collect a StageProfile for each stage of a pipeline resolved by
+    Query.resolve(..., profiler=QueryProfiler()).
+
+    While active, every SQL statement executed on any database connection
+    of the current thread is attributed to the innermost stage doing work.
+    Peak memory is measured with tracemalloc, which traces allocations
+    from every thread, so it is approximate on a busy server. Tracing
+    slows every thread down, it is on while any query is being profiled.
+    """
+    def __init__(self):
+        self.stages = []
+        self._frames = []
+        self._exit_stack = None
+
+    def __enter__(self):
+        self._exit_stack = ExitStack()
+        for connection in connections.all():
+            self._exit_stack.enter_context(connection.execute_wrapper(self._execute_wrapper))
+        _start_tracing()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._exit_stack.close()
+        _stop_tracing()
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if self._frames:
+                self._frames[-1].stage.queries.append(
+                    {
+                        "sql": sql,
+                        "duration": time.perf_counter() - start,
+                    }
+                )
+
+    def _traced_memory(self):
+        if tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()
+        return 0, 0
+
+    def _push(self, stage):
+        current, peak = self._traced_memory()
+        if self._frames:
+            parent = self._frames[-1]
+            parent.memory_peak = max(parent.memory_peak, peak)
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self._frames.append(_Frame(stage, current))
+
+    def _pop(self):
+        frame = self._frames.pop()
+        wall = time.perf_counter() - frame.wall_start
+        cpu = time.thread_time() - frame.cpu_start
+        frame.stage.wall_time += wall - frame.child_wall
+        frame.stage.cpu_time += cpu - frame.child_cpu
+        _, peak = self._traced_memory()
+        frame.memory_peak = max(frame.memory_peak, peak)
+        frame.stage.peak_memory = max(frame.stage.peak_memory, frame.memory_peak - frame.memory_start)
+        if self._frames:
+            parent = self._frames[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+            parent.memory_peak = max(parent.memory_peak, frame.memory_peak)
+
+    @contextmanager
+    def measure(self, text):
+        """
+        Add a stage to the profile and attribute the work done in the
+        body of the with statement to it.
+        """
+        stage = StageProfile(text)
+        if self.stages:
+            stage.rows_in = self.stages[-1].rows_out
+        self.stages.append(stage)
+        self._push(stage)
+        try:
+            yield stage
+        finally:
+            self._pop()
+
+    def wrap(self, stage, events):
+        """
+        Record the output of stage, returning events wrapped so the work
+        done lazily by stage is still attributed to it.
+        """
+        stage.output_type = type(events).__name__
+        if isinstance(events, QuerySet):
+            # Counting would run the query, the SQL is attributed to
+            # whichever stage eventually runs it.
+            return events
+        elif isinstance(events, Iterator):
+            return self._profiled(stage, events)
+        elif isinstance(events, (list, tuple, ColumnBatch)):
+            stage.rows_out = len(events)
+        elif events is not None:
+            stage.rows_out = 1
+        return events
+
+    def _profiled(self, stage, events):
+        stage.rows_out = 0
+        index = self.stages.index(stage)
+        while True:
+            self._push(stage)
+            try:
+                event = next(events)
+            except StopIteration:
+                return
+            finally:
+                self._pop()
+            stage.rows_out += 1
+            # The next stage has pulled everything we have yielded so far
+            if index + 1 < len(self.stages):
+                self.stages[index + 1].rows_in = stage.rows_out
+            yield event
+
+    def report(self):
+        return [stage.as_dict() for stage in self.stages]
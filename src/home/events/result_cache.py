@@ -0,0 +1,199 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+A cache of resolved query results, backed by Django's cache framework.
+
+Results are keyed by the normalized query, the rendered arguments, the
+context, the user and, for queries searching a relative window such as
+--last-hour, a time bucket. The key also contains a generation counter for
+each index the query reads from, which is bumped whenever events are
+written to that index, so new events invalidate every cached result which
+could contain them.
+"""
+
+import json
+import time
+import shlex
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from events.util import cast
+from events.capture import capture_output
+
+WINDOWS = {
+    "last_15_minutes": timedelta(minutes=15),
+    "last_hour": timedelta(hours=1),
+    "last_day": timedelta(days=1),
+    "last_week": timedelta(weeks=1),
+    "last_month": timedelta(weeks=4),
+}
+
+# The number of buckets a relative window is split into, ie. results of
+# a --last-hour search are reused for at most one minute.
+WINDOW_BUCKETS = 60
+
+# The shape of the result Query.resolve returns when a stage fails
+ERROR_KEYS = {"stdout", "stderr", "exception", "matching_events"}
+
+def get_cache():
+    return caches[settings.DELVE_RESULT_CACHE_ALIAS]
+
+def generation_key(label, index=None):
+    if index is None:
+        return f"delve:result-cache:generation:{label}"
+    return f"delve:result-cache:generation:{label}:{index}"
+
+def get_generation(cache, key):
+    generation = cache.get(key)
+    if generation is None:
+        # Start from the clock rather than zero, so a counter which was
+        # evicted can never come back with a value used by older entries.
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+def invalidate(model, indexes=None):
+    """
+    Invalidate the cached results which could contain events of model
+    in any of indexes. If indexes is None, the events written are not
+    known (ie. QuerySet.update) and all results for model are invalidated.
+    """
+    # The generations key checkpoints too, see events.checkpoints
+    if not settings.DELVE_RESULT_CACHE_TIMEOUT and not settings.DELVE_CHECKPOINT_TIMEOUT:
+        return
+    log = logging.getLogger(__name__)
+    cache = get_cache()
+    label = model._meta.label_lower
+    if indexes is None:
+        keys = [generation_key(label)]
+    else:
+        keys = [generation_key(label, "*")]
+        keys.extend(generation_key(label, index) for index in set(indexes))
+    log.debug(f"Invalidating result cache generations: {keys}")
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+def get_indexes(terms):
+    """
+    Return the indexes searched by terms, or None if they can't be
+    narrowed down to a fixed set.
+    """
+    indexes = None
+    for term in terms or []:
+        key, _, value = term.partition("=")
+        if key in ("index", "index__exact"):
+            found = {str(cast(value))}
+        elif key == "index__in":
+            value = cast(value)
+            if not isinstance(value, (list, tuple, set)):
+                return None
+            found = {str(index) for index in value}
+        elif key.lstrip("!").startswith("index"):
+            return None
+        else:
+            continue
+        indexes = found if indexes is None else indexes & found
+    return indexes
+
+def render_argv(stage, environment):
+    if stage.template is None:
+        return list(stage.argv)
+    return shlex.split(stage.template.render(environment), comments=True)
+
+def get_stage_state(cache, stage, argv, now):
+    """
+    Return (generations, buckets) for stage run with argv: the generations
+    of the indexes it reads events from and the time buckets of its
+    relative windows, which change whenever its result could. Both are
+    empty if stage doesn't read events, None is returned if the events it
+    reads can't be invalidated.
+    """
+    from events.models import BaseEvent
+    parser = getattr(stage.operation, "parser", None)
+    if parser is None or not any(action.dest == "model" for action in parser._actions):
+        return [], []
+    # This stage reads events from the database (ie. search, join)
+    with capture_output():
+        args, _ = parser.parse_known_args(argv[1:])
+    model = import_string(args.model)
+    if not issubclass(model, BaseEvent):
+        return None
+    label = model._meta.label_lower
+    generations = [get_generation(cache, generation_key(label))]
+    indexes = get_indexes(args.terms)
+    for index in sorted(indexes) if indexes is not None else ["*"]:
+        generations.append(get_generation(cache, generation_key(label, index)))
+    buckets = []
+    for dest, window in WINDOWS.items():
+        if getattr(args, dest, False):
+            buckets.append(int(now // (window.total_seconds() / WINDOW_BUCKETS)))
+    return generations, buckets
+
+def get_key(query, request, context, environment_globals):
+    """
+    Return the cache key for resolving query, or None if the result
+    must not be cached.
+    """
+    log = logging.getLogger(__name__)
+    cache = get_cache()
+    now = time.time()
+    rendered = []
+    buckets = []
+    generations = []
+    try:
+        for stage in query.get_query_plan():
+            if not getattr(stage.operation, "cacheable", False):
+                log.debug(f"Not caching, {stage.text} is not cacheable")
+                return None
+            argv = render_argv(stage, {**(environment_globals or {}), **context})
+            rendered.append(argv)
+            state = get_stage_state(cache, stage, argv, now)
+            if state is None:
+                log.debug(f"Not caching, unable to invalidate {stage.text}")
+                return None
+            generations.extend(state[0])
+            buckets.extend(state[1])
+        material = json.dumps(
+            [
+                getattr(request.user, "pk", None),
+                rendered,
+                context,
+                buckets,
+                generations,
+            ],
+            sort_keys=True,
+            default=str,
+        )
+    except (Exception, SystemExit):
+        # ie. a template or argument error, which resolve will report
+        log.debug("Not caching, unable to build key", exc_info=True)
+        return None
+    return f"delve:result-cache:{hashlib.sha256(material.encode()).hexdigest()}"
+
+def is_error(events):
+    return (
+        isinstance(events, list)
+        and len(events) == 1
+        and isinstance(events[0], dict)
+        and events[0].keys() == ERROR_KEYS
+    )
+
+def lookup(key):
+    return get_cache().get(key)
+
+def store(key, events):
+    if is_error(events):
+        return
+    if isinstance(events, list) and len(events) > settings.DELVE_RESULT_CACHE_MAX_EVENTS:
+        return
+    get_cache().set(key, events, timeout=settings.DELVE_RESULT_CACHE_TIMEOUT)
@@ -37,3 +37,5 @@ from .events_to_context import events_to_context
 from .resolve import resolve
 from .sql_query import sql_query
 from .replace import replace
+from .top import top, rare
+from .timechart import timechart
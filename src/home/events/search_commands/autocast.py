@@ -4,7 +4,7 @@
 
 import logging
 import argparse
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
@@ -12,7 +12,7 @@ from django.http import HttpRequest
 from .util import cast
 from .decorators import search_command
 from events.validators import QuerySetOrListOfDicts
-from events.util import resolve
+from events.util import apply_row_functions
 
 parser = argparse.ArgumentParser(
     prog="autocast",
@@ -24,13 +24,27 @@ parser.add_argument(
     help="Provide one or more fields to autocast",
 )
 
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    if "autocast" in argv:
+        argv.pop(argv.index("autocast"))
+    args = parser.parse_args(argv)
+    fields = args.fields
+
+    def row(event):
+        for field in fields:
+            event[field] = cast(event.get(field))
+        return event
+    return row
+
 @search_command(
     parser,
     input_validators=[
         QuerySetOrListOfDicts,
     ],
+    row_function=row_function,
+    cacheable=True,
 )
-def autocast(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def autocast(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Attempt to cast fields to types based on their values.
 
@@ -43,20 +57,4 @@ def autocast(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]]
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with fields cast to appropriate types.
     """
-    log = logging.getLogger(__name__)
-    log.info("In search_command autocast")
-    events = resolve(events)
-    log.debug(f"Received argv: {argv}")
-    if "autocast" in argv:
-        argv.pop(argv.index("autocast"))
-    args = autocast.parser.parse_args(argv)
-
-    ret = []
-    for event in events:
-        log.debug(f"Found event: {event}")
-        for field in args.fields:
-            # lhs = left-hand side, rhs right-hand side
-            log.debug(f"Found field: {type(field)}({field})")
-            event[field] = cast(event[field])
-            log.debug(f"New type of field: {type(field)}({field})")
-        yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
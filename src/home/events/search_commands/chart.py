@@ -49,6 +49,7 @@ parser.add_argument(
 @search_command(
     parser,
     input_validators=[ListOfDicts],
+    cacheable=True,
 )
 def chart(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
     """
@@ -72,9 +73,9 @@ def chart(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], a
         log.debug(f"Found by_field: {args.by_field}")
         datasets = []
         log.debug(f"sorting events by by_field")
-        events.sort(key=lambda x: x[args.by_field])
+        events.sort(key=lambda x: x.get(args.by_field))
         log.debug(f"Grouping by: {args.by_field}")
-        for label, data_list in groupby(events, lambda x: x[args.by_field]):
+        for label, data_list in groupby(events, lambda x: x.get(args.by_field)):
             log.debug(f"Appending data for {label}")
             datasets.append(
                 {
@@ -92,7 +93,7 @@ def chart(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], a
     else:
         log.debug("args.by_field is None")
         data = {
-            "labels": [event[args.x_field] for event in events],
+            "labels": [event.get(args.x_field) for event in events],
             "datasets": [
                 {
                     "label": args.y_field,
@@ -5,20 +5,60 @@
 import logging
 import argparse
 from functools import wraps
-from typing import Optional, List, Callable, Any
+from typing import Optional, List, Callable, Any, Union
 
 import pydantic
 
-def search_command(parser: argparse.ArgumentParser, input_validators: Optional[List[pydantic.BaseModel]] = None) -> Callable:
+def search_command(parser: argparse.ArgumentParser, input_validators: Optional[List[pydantic.BaseModel]] = None, pushdown: Optional[Callable] = None, cacheable: bool = False, side_effects: Union[bool, Callable] = False, top: Optional[Callable] = None, limit: Optional[Callable] = None, row_function: Optional[Callable] = None, columnar: Optional[Callable] = None, columnar_input: bool = True) -> Callable:
     """
     Decorator to register a search command.
 
     This decorator attaches an ArgumentParser instance and optional Pydantic input validators to the decorated function.
     The ArgumentParser is used to create help text in the web UI.
 
+    If pushdown is provided, Query.resolve will call it instead of the command when the
+    result set is still a QuerySet. It takes the same arguments as the command and must
+    return the command's result computed in the database (usually a new QuerySet), or
+    None if the arguments can't be translated, in which case the command runs as usual.
+
+    If the next stage of a query declares a limit on the number of events it reads and
+    the command provides top, Query.resolve calls top instead of the command, with that
+    number as an extra argument, so only as many events as are read have to be produced.
+
+    If row_function is provided, the command works on one event at a time. It takes the
+    request, argv and environment, parses argv once and returns a function which takes
+    an event and returns it (changed in place or replaced), or None to drop it. The
+    row functions of consecutive stages are fused by Query.resolve into a single pass
+    over the events.
+
+    If columnar is provided and NumPy is installed, Query.resolve may call it instead of
+    the command with an events.columnar.ColumnBatch in place of the events. It returns
+    the command's result (a ColumnBatch, a list of events or a visualization), or None
+    if it can't handle the arguments or the data, in which case the command runs as
+    usual. Unless columnar_input is False, the events are converted to a ColumnBatch for
+    the command, otherwise columnar is only called when the previous stage returned one.
+
     Args:
         parser (argparse.ArgumentParser): The argument parser for the command.
         input_validators (Optional[List[pydantic.BaseModel]]): List of input validators.
+        pushdown (Optional[Callable]): Function applying the command to a QuerySet.
+        cacheable (bool): True if the command's result depends only on its input,
+            arguments and the events in the database, and it has no side effects (ie.
+            it doesn't write to the environment). Only queries made entirely of
+            cacheable commands are served from the result cache or share a run with
+            an identical query.
+        side_effects (Union[bool, Callable]): True if running the command changes
+            something outside of the query (ie. writes to the database or sends a
+            message), or a function taking argv and returning whether that invocation
+            does. Query checkpoints never skip a command with side effects.
+        top (Optional[Callable]): Function returning the first n events of the
+            command's result.
+        limit (Optional[Callable]): Function taking argv and returning the maximum
+            number of events that invocation reads from its input, or None.
+        row_function (Optional[Callable]): Function returning the function applying the
+            command to a single event.
+        columnar (Optional[Callable]): Function applying the command to a ColumnBatch.
+        columnar_input (bool): Whether events are converted to a ColumnBatch for columnar.
 
     Returns:
         Callable: The decorated function.
@@ -32,6 +72,14 @@ def search_command(parser: argparse.ArgumentParser, input_validators: Optional[L
             return result
         inner.parser = parser
         inner.input_validators = input_validators
+        inner.pushdown = pushdown
+        inner.cacheable = cacheable
+        inner.side_effects = side_effects
+        inner.top = top
+        inner.limit = limit
+        inner.row_function = row_function
+        inner.columnar = columnar
+        inner.columnar_input = columnar_input
         return inner
     return _decorator
 
@@ -2,31 +2,200 @@
 # This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
 # See the LICENSE file in the root of this repository for details.
 
+import json
+import hashlib
 import argparse
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, Iterator, List, Optional, Union
 
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.sketches import BloomFilter
+from events.util import hashable, iter_events
+from events.search_commands.util import is_pushdown_column
 from events.search_commands.decorators import search_command
 
 parser = argparse.ArgumentParser(
     prog="dedup",
-    description="Deduplicate the result set based on the optional fields. First matching item is kept. (events should be sorted prior to calling this)",
+    description="Deduplicate the result set based on the optional fields. First matching item is kept. "
+                "Without --global only consecutive duplicates are removed, so events should be sorted prior to calling this.",
 )
 parser.add_argument(
     nargs="*",
     dest="fields",
-    help="The fields to use for deduplication",
+    help="The fields to use for deduplication, if none are specified whole events are compared",
 )
+parser.add_argument(
+    "--global",
+    action="store_true",
+    dest="global_",
+    help="If specified, remove every duplicate, not only consecutive ones. Events are streamed "
+         "through and memory is proportional to the number of distinct events",
+)
+parser.add_argument(
+    "--bloom",
+    action="store_true",
+    help="Like --global, but remember the events seen in a Bloom filter of fixed size. "
+         "Uses far less memory for large inputs, but a unique event is dropped with probability --error-rate",
+)
+parser.add_argument(
+    "--capacity",
+    type=int,
+    help="The number of distinct events the Bloom filter is sized for. (Default: DELVE_BLOOM_CAPACITY)",
+)
+parser.add_argument(
+    "--error-rate",
+    type=float,
+    help="The probability of the Bloom filter dropping an event which is not a duplicate. "
+         "(Default: DELVE_BLOOM_ERROR_RATE)",
+)
+parser.add_argument(
+    "--keep-last",
+    action="store_true",
+    help="If specified, keep the last event of each set of duplicates instead of the first",
+)
+parser.add_argument(
+    "--count-field",
+    help="If specified, store the number of duplicates of each kept event (including itself) in this field",
+)
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    args = parser.parse_args(argv[1:])
+    if args.bloom and (args.keep_last or args.count_field):
+        raise ValueError("--bloom can't be combined with --keep-last or --count-field, a Bloom filter only remembers whether an event was seen")
+    return args
+
+def event_digest(event: Dict[str, Any]) -> bytes:
+    """
+    Return a 16 byte digest of event, equal for equal events whatever
+    the order of their keys.
+    """
+    return hashlib.blake2b(
+        json.dumps(event, sort_keys=True, default=str).encode("utf-8"),
+        digest_size=16,
+    ).digest()
 
-@search_command(parser)
-def dedup(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def global_dedup(events, key, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    """
+    Remove every duplicate of events by key(event). The first event of
+    each key is streamed through as soon as it is read, unless the last
+    event or the counts are needed, in which case the kept events are
+    yielded once every event was read, in the order they were read.
+    """
+    if args.bloom:
+        seen = BloomFilter(args.capacity, args.error_rate)
+        for event in events:
+            if not seen.add(key(event)):
+                yield event
+    elif not (args.keep_last or args.count_field):
+        seen = set()
+        for event in events:
+            event_key = key(event)
+            if event_key not in seen:
+                seen.add(event_key)
+                yield event
+    else:
+        # key -> [position, event, count]
+        kept = {}
+        for position, event in enumerate(events):
+            event_key = key(event)
+            entry = kept.get(event_key)
+            if entry is None:
+                kept[event_key] = [position, event, 1]
+            else:
+                entry[2] += 1
+                if args.keep_last:
+                    entry[0], entry[1] = position, event
+        entries = kept.values()
+        if args.keep_last:
+            entries = sorted(entries, key=lambda entry: entry[0])
+        for _, event, count in entries:
+            yield {**event, args.count_field: count} if args.count_field else event
+
+def consecutive_dedup(events, key, args: argparse.Namespace) -> Iterator[Dict[str, Any]]:
+    """
+    Remove the duplicates by key(event) following each other. The kept
+    event of a run is yielded as soon as the run ends, or immediately if
+    it is the first and no count is needed.
+    """
+    stream = not (args.keep_last or args.count_field)
+    sentinel = object()
+    last_key, kept, count = sentinel, None, 0
+    for event in events:
+        event_key = key(event)
+        if last_key is not sentinel and event_key == last_key:
+            count += 1
+            if args.keep_last:
+                kept = event
+            continue
+        if not stream and last_key is not sentinel:
+            yield {**kept, args.count_field: count} if args.count_field else kept
+        last_key, kept, count = event_key, event, 1
+        if stream:
+            yield event
+    if not stream and last_key is not sentinel:
+        yield {**kept, args.count_field: count} if args.count_field else kept
+
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[QuerySet]:
+    """
+    Keep the first (or with --keep-last, last) event of each set of
+    duplicates in the database.
+
+    With --global (or --bloom, which is exact in the database) the events
+    are partitioned by the dedup fields and the event numbered 1 by
+    ROW_NUMBER() in the order of the QuerySet is kept. Without it this is
+    only possible when events is ordered by the dedup fields first, then
+    every run of duplicates is a whole partition.
+    """
+    log = logging.getLogger(__name__)
+    args = parse_args(argv)
+    if events.query.is_sliced or events.query.combinator or args.count_field:
+        return None
+    is_global = args.global_ or args.bloom
+    pk_name = events.model._meta.pk.name
+    if not args.fields:
+        if not events._fields or pk_name in events._fields:
+            # Events containing the primary key are never equal
+            return events
+        return None
+    if not all(is_pushdown_column(events, field) for field in args.fields):
+        return None
+    ordering = list(events.query.order_by)
+    if not ordering and events.query.default_ordering:
+        ordering = list(events.model._meta.ordering)
+    if not all(isinstance(field, str) and field != "?" for field in ordering):
+        return None
+    fields = set(args.fields)
+    leading = ordering[:len(fields)]
+    if not is_global and {field.lstrip("-") for field in leading} != fields:
+        log.debug(f"Unable to push down dedup, ordering {ordering} does not start with {args.fields}")
+        return None
+    ordering.append(pk_name)
+    within = ordering if is_global else ordering[len(fields):]
+    if args.keep_last:
+        within = [field[1:] if field.startswith("-") else f"-{field}" for field in within]
+    first_events = events.values(pk_name).alias(
+        _dedup_row_number=Window(
+            RowNumber(),
+            partition_by=[F(field) for field in args.fields],
+            order_by=within,
+        )
+    ).filter(_dedup_row_number=1)
+    return events.filter(pk__in=first_events).order_by(*ordering)
+
+@search_command(parser, pushdown=pushdown, cacheable=True)
+def dedup(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Deduplicate the result set based on the optional fields. First matching item is kept.
 
+    Without --global only consecutive duplicates are removed. With --global
+    the key of every distinct event (the values of the fields, or a digest
+    of the whole event) is kept in a set, or with --bloom in a Bloom filter
+    of fixed size, so the events don't need to be sorted first.
+
     Args:
         request (HttpRequest): The HTTP request object.
         events (Union[QuerySet, List[Dict[str, Any]]]): The result set to operate on.
@@ -34,35 +203,23 @@ def dedup(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], a
         environment (Dict[str, Any]): Dictionary used as a jinja2 environment (context) for rendering the arguments of a command.
 
     Returns:
-        List[Dict[str, Any]]: A list of dictionaries with duplicate records removed.
+        Iterator[Dict[str, Any]]: A generator of the events with duplicate records removed.
     """
     log = logging.getLogger(__name__)
-    log.debug(f"Found events: {events}")
-    args = dedup.parser.parse_args(argv[1:])
+    args = parse_args(argv)
     log.debug(f"Found args: {args}")
 
-    events = resolve(events=events)
-
-    if not args.fields:
-        log.info("No fields specified, using default comparison")
-        ret = []
-        last_event = None
-        for event in events:
-            if event == last_event:
-                pass
-            else:
-                ret.append(event)
-                last_event = event
+    events = iter_events(events)
+    fields = args.fields
+    if args.global_ or args.bloom:
+        if fields:
+            key = lambda event: tuple(hashable(event.get(field)) for field in fields)
+        else:
+            key = event_digest
+        return global_dedup(events, key, args)
+    if fields:
+        key = lambda event: [event.get(field) for field in fields]
     else:
-        log.debug(f"Deduplicating by fields: {args.fields}")
-        last_event = None
-        ret = []
-        for event in events:
-            new_event = {field: event.get(field) for field in args.fields}
-            if new_event == last_event:
-                log.debug(f"Removing event: {new_event}, considered equal to {last_event}")
-                pass
-            else:
-                ret.append(event)
-                last_event = new_event
-    return ret
+        # Consecutive events are compared as a whole
+        key = lambda event: event
+    return consecutive_dedup(events, key, args)
@@ -5,13 +5,14 @@
 import argparse
 import logging
 from collections import defaultdict
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import iter_events
 
+from .util import get_pushdown_field
 from .decorators import search_command
 
 parser = argparse.ArgumentParser(
@@ -24,7 +25,25 @@ parser.add_argument(
     help="The fields to use for distinct records",
 )
 
-@search_command(parser)
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Select the distinct values of each field with SELECT DISTINCT instead
+    of reading every event.
+    """
+    args = parser.parse_args(argv[1:])
+    if events.query.is_sliced or events.query.combinator:
+        return None
+    if any(get_pushdown_field(events, field.split("__")) is None for field in args.fields):
+        return None
+    ret_dict = {}
+    for field in args.fields:
+        values = events.order_by().values_list(field, flat=True).distinct()
+        values = [value for value in values if value is not None]
+        if values:
+            ret_dict[field] = values
+    return [ret_dict]
+
+@search_command(parser, pushdown=pushdown, cacheable=True)
 def distinct(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Return one event with fields containing the unique values of the specified fields.
@@ -38,7 +57,7 @@ def distinct(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]]
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with distinct records.
     """
-    events = resolve(events)
+    events = iter_events(events)
     args = distinct.parser.parse_args(argv[1:])
     logging.debug(f"Found args: {args}")
     ret_dict = defaultdict(set)
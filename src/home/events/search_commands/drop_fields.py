@@ -4,13 +4,13 @@
 
 import argparse
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
 from .decorators import search_command
-from events.util import resolve
+from events.util import apply_row_functions
 from events.models import (
     BaseEvent,
 )
@@ -28,13 +28,28 @@ parser.add_argument(
     help="Field to drop if present from all events."
 )
 
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    args = parser.parse_args(argv[1:])
+    fields = args.fields
+
+    def row(event):
+        for field in fields:
+            try:
+                event.pop(field)
+            except:
+                pass
+        return event
+    return row
+
 @search_command(
     parser,
     input_validators=[
         QuerySetOrListOfDictsOrEvents,
-    ]
+    ],
+    row_function=row_function,
+    cacheable=True,
 )
-def drop_fields(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def drop_fields(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Remove the specified fields from the result set.
 
@@ -47,17 +62,4 @@ def drop_fields(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with specified fields removed.
     """
-    args = drop_fields.parser.parse_args(argv[1:])
-    log = logging.getLogger(__name__)
-    fields = args.fields
-    log.debug(f"Found fields: {fields}")
-    events = resolve(events)
-
-    for event in events:
-        for field in fields:
-            log.debug(f"Checking event for field: {field}")
-            try:
-                event.pop(field)
-            except:
-                pass
-        yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
@@ -21,7 +21,7 @@ parser.add_argument(
     help="The expressions to return as events",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def echo(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Return the given expressions as an event appended to the result set.
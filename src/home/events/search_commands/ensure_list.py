@@ -9,7 +9,7 @@ from typing import Any, Dict, List, Union
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import iter_events
 
 from .decorators import search_command
 
@@ -22,7 +22,7 @@ parser.add_argument(
     help="The field to ensure it is a list"
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def ensure_list(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Ensure that field contains a list. If any other type of value is in the specified field, it will be placed as a single item in a list.
@@ -39,7 +39,7 @@ def ensure_list(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any
     args = ensure_list.parser.parse_args(argv[1:])
     log = logging.getLogger(__name__)
     field = args.field
-    events = resolve(events)
+    events = iter_events(events)
     for event in events:
         log.debug(f"Found event: {event}")
         if field in event:
@@ -4,12 +4,12 @@
 
 import logging
 import argparse
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import apply_row_functions
 
 from .util import cast
 from .decorators import search_command
@@ -24,8 +24,33 @@ parser.add_argument(
     help="Provide one or more expressions to evaluate",
 )
 
-@search_command(parser)
-def eval(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    args = parser.parse_args(argv[1:])
+    # (field, name of the field to copy or None, the value cast once, the raw value)
+    assignments = []
+    for expression in args.expressions:
+        lhs, rhs = expression.split("=", 1)
+        symbol = rhs.replace("$", "") if rhs.startswith("$") else None
+        value = cast(rhs)
+        if isinstance(value, (list, dict, set)):
+            # Every event gets its own copy of mutable values
+            value = None
+        assignments.append((lhs, symbol, value, rhs))
+
+    def row(event):
+        for lhs, symbol, value, rhs in assignments:
+            if symbol is not None:
+                # A missing field is None, as if it had been back-filled
+                event[lhs] = cast(event.get(symbol))
+            elif value is not None:
+                event[lhs] = value
+            else:
+                event[lhs] = cast(rhs)
+        return event
+    return row
+
+@search_command(parser, row_function=row_function, cacheable=True)
+def eval(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Set the value of a field on each event.
 
@@ -38,24 +63,4 @@ def eval(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], ar
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with the evaluated expressions set as fields.
     """
-    log = logging.getLogger(__name__)
-    events = resolve(events)
-    log.info(f"Received argv: {argv}")
-    args = eval.parser.parse_args(argv[1:])
-    log.debug(f"Found args: {args}")
-    ret = []
-    for event in events:
-        log.debug(f"Found event: {event}")
-        for expression in args.expressions:
-            log.info(f"Found expression: {expression}")
-            lhs, rhs = expression.split("=", 1)
-            log.info(f"Found lhs, rhs: {lhs}, {rhs}")
-            if rhs.startswith("$"):
-                rhs_symbol = rhs.replace("$", "")
-                if rhs_symbol in event:
-                    event[lhs] = cast(event[rhs_symbol])
-                else:
-                    event[lhs] = cast(rhs)    
-            else:
-                event[lhs] = cast(rhs)
-        yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
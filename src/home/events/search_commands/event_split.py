@@ -9,7 +9,7 @@ from typing import Any, Dict, List, Union
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import iter_events
 
 from .decorators import search_command
 
@@ -22,7 +22,7 @@ parser.add_argument(
     help="If the specified split field points to a list, the events returned will be expanded with an event per item in the list. The fields of the events will be preserved with each new item having a copy of other fields' values."
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def event_split(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Attempt to split events into multiple events based on a field. Specified fields should contain a JSON Array.
@@ -43,7 +43,7 @@ def event_split(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any
     args = event_split.parser.parse_args(argv)
     split_field = args.split_field
     log.debug(f"Found split_field: {split_field}")
-    events = resolve(events)
+    events = iter_events(events)
     log.debug("Successfully resolved events")
     for event in events:
         item = event
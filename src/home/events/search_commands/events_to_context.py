@@ -41,7 +41,8 @@ def events_to_context(request: HttpRequest, events: Union[QuerySet, List[Dict[st
     log.info(f"Received argv: {argv}")
     args = events_to_context.parser.parse_args(argv[1:])
     log.debug(f"Found args: {args}")
-    events = resolve(events)
+    # Templates see every field of every event
+    events = resolve(events, fill=True)
     environment["events"] = events
     if args.return_empty:
         return []
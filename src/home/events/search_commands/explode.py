@@ -9,7 +9,7 @@ from typing import Any, Dict, List, Union
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import iter_events
 
 from .decorators import search_command
 
@@ -31,7 +31,7 @@ parser.add_argument(
     "Events without the specified fields will be omitted from the results"
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def explode(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Extract the nested JSON fields from an object and add them to the event. Also removes the original field.
@@ -48,7 +48,7 @@ def explode(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]],
     args = explode.parser.parse_args(argv[1:])
     log = logging.getLogger(__name__)
     field = args.field
-    events = resolve(events)
+    events = iter_events(events)
     for event in events:
         log.debug(f"Found event: {event}")
         
@@ -10,7 +10,7 @@ from datetime import datetime, date, time
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import iter_events
 
 from .decorators import search_command
 
@@ -28,7 +28,7 @@ parser.add_argument(
     help="A field with a timestamp as the value. All available fields from the timestamp (year, month, day, hour, etc) will be added to the event",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def explode_timestamp(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Extract the available fields in a timestamp field and add them as fields to the event with the optional prefix.
@@ -46,7 +46,7 @@ def explode_timestamp(request: HttpRequest, events: Union[QuerySet, List[Dict[st
     log = logging.getLogger(__name__)
     field = args.field
     log.debug(f"Found {field=}")
-    events = resolve(events)
+    events = iter_events(events)
     for event in events:
         log.debug(f"Found {event=}")
         
@@ -53,7 +53,7 @@ group.add_argument(
     help="If specified, a boolean value will be returned",
 )
 
-@search_command(parser, input_validators=[ListOfDicts])
+@search_command(parser, input_validators=[ListOfDicts], cacheable=False)
 def fake_data(request, events, argv, environment):
     if "fake_data" in argv:
         argv.pop(argv.index("fake_data"))
@@ -4,14 +4,20 @@
 
 import logging
 import argparse
+import operator
 import re
-from typing import Any, Dict, List, Union
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+from django.core.exceptions import FieldError, ValidationError
+from django.db import connections
+from django.db.models import Q
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
-from .util import cast
+from events.columnar import ColumnBatch, numpy
+from events.util import apply_row_functions
+from .util import cast, get_pushdown_field, get_pushdown_types
 from .decorators import search_command
 
 lookup_map = {
@@ -29,21 +35,90 @@ lookup_map = {
     "startswith": lambda lhs, rhs: lhs.startswith(rhs),
     "istartswith": lambda lhs, rhs: lhs.lower().startswith(rhs.lower()),
     "endswith": lambda lhs, rhs: lhs.endswith(rhs),
-    "iendswith": lambda lhs, rhs: lhs.lower().endswith(rhs.lower),
+    "iendswith": lambda lhs, rhs: lhs.lower().endswith(rhs.lower()),
     "isnull": lambda lhs, rhs: lhs is None if rhs is True else lhs is not None,
     "regex": lambda lhs, rhs: re.search(rhs, lhs),
     "iregex": lambda lhs, rhs: re.search(rhs, lhs, re.I),
 }
 
-def resolve_field_lookup(expression: str, item: Dict[str, Any]) -> Any:
+def _iexact(rhs):
+    lowered = rhs.lower()
+    return lambda lhs: lhs.lower() == lowered
+
+def _icontains(rhs):
+    lowered = rhs.lower()
+    return lambda lhs: lowered in lhs.lower()
+
+def _istartswith(rhs):
+    lowered = rhs.lower()
+    return lambda lhs: lhs.lower().startswith(lowered)
+
+def _iendswith(rhs):
+    lowered = rhs.lower()
+    return lambda lhs: lhs.lower().endswith(lowered)
+
+# For each lookup, a function taking the (cast) right-hand side once and
+# returning a test of the left-hand side alone. Each test gives the same
+# result as the lookup_map entry. The comparisons are partials of the
+# reflected operator (lhs > rhs is rhs < lhs), so they run as C calls.
+compiled_lookups = {
+    "exact": lambda rhs: partial(operator.eq, rhs),
+    "eq": lambda rhs: partial(operator.eq, rhs),
+    "ne": lambda rhs: partial(operator.ne, rhs),
+    "gt": lambda rhs: partial(operator.lt, rhs),
+    "gte": lambda rhs: partial(operator.le, rhs),
+    "lt": lambda rhs: partial(operator.gt, rhs),
+    "lte": lambda rhs: partial(operator.ge, rhs),
+    "in": lambda rhs: partial(operator.contains, rhs),
+    "contains": lambda rhs: lambda lhs: rhs in lhs,
+    "iexact": _iexact,
+    "icontains": _icontains,
+    "startswith": lambda rhs: lambda lhs: lhs.startswith(rhs),
+    "istartswith": _istartswith,
+    "endswith": lambda rhs: lambda lhs: lhs.endswith(rhs),
+    "iendswith": _iendswith,
+    "isnull": lambda rhs: (lambda lhs: lhs is None) if rhs is True else (lambda lhs: lhs is not None),
+    "regex": lambda rhs: re.compile(rhs).search,
+    "iregex": lambda rhs: re.compile(rhs, re.I).search,
+}
+
+# The lookups which are tested on a whole numeric column of a ColumnBatch
+# at once. The operators compare NumPy arrays element-wise.
+COLUMNAR_LOOKUPS = {
+    "exact": operator.eq,
+    "eq": operator.eq,
+    "ne": operator.ne,
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+# The patterns of these lookups are never cast, so ie. \d+ or 404 stay strings
+UNCAST_LOOKUPS = ("regex", "iregex")
+
+# SQLite's LIKE is case-insensitive, so these would match more than in Python
+CASE_INSENSITIVE_ON_SQLITE = ("contains", "startswith", "endswith")
+
+# The keywords grouping terms. Terms next to each other without a keyword
+# must all match, as if joined by AND.
+AND, OR, NOT, OPEN, CLOSE = "AND", "OR", "NOT", "(", ")"
+
+def split_field_lookup(expression: str) -> Tuple[str, List[str]]:
     log = logging.getLogger(__name__)
     if "__" not in expression or not expression.endswith(tuple([i for i in lookup_map.keys()])):
         log.debug(f"Found expression: {expression}, appending lookup.")
         expression = f"{expression}__exact"
         log.debug(f"Expression modified to: {expression}")
+    *path, lookup = expression.split("__")
+    return lookup, path
+
+def resolve_field_lookup(expression: str, item: Dict[str, Any]) -> Any:
+    log = logging.getLogger(__name__)
+    lookup, path = split_field_lookup(expression)
     ret = item
     log.debug(f"Found ret: {ret}")
-    for subexpr in expression.split("__")[:-1]:
+    for subexpr in path:
         log.debug(f"ret: {ret}, subexpr: {subexpr}")
         try:
             ret = ret[subexpr]
@@ -51,7 +126,252 @@ def resolve_field_lookup(expression: str, item: Dict[str, Any]) -> Any:
             ret = None
             continue
         log.debug(f"Built ret: {ret}")
-    return expression.split("__")[-1], ret
+    return lookup, ret
+
+def make_getter(path: List[str]) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Return a function returning the value at path in an event, or None
+    if any part of the path is missing.
+    """
+    if len(path) == 1:
+        key = path[0]
+        def get(event):
+            try:
+                return event[key]
+            except KeyError:
+                return None
+        return get
+    def get(event):
+        for key in path:
+            try:
+                event = event[key]
+            except (KeyError, IndexError, TypeError):
+                return None
+        return event
+    return get
+
+
+class Term:
+    """
+    A single KEY=VALUE term, optionally negated with a leading !.
+    """
+    def __init__(self, term: str, no_cast: bool = False):
+        if "=" not in term:
+            raise ValueError(f"Invalid term: {term}, terms must be in the form KEY=VALUE")
+        self.term = term
+        expression, rhs = term.split("=", 1)
+        self.negate = expression.startswith("!")
+        self.lookup, self.path = split_field_lookup(expression.lstrip("!"))
+        if self.lookup not in lookup_map:
+            raise ValueError(f"Sorry, {self.lookup} is not a valid lookup, please choose one of {lookup_map.keys()}")
+        if not no_cast and self.lookup not in UNCAST_LOOKUPS:
+            rhs = cast(rhs)
+        self.rhs = rhs
+
+    def compile(self) -> Callable[[Dict[str, Any]], Any]:
+        test = compiled_lookups[self.lookup](self.rhs)
+        get = make_getter(self.path)
+        if self.negate:
+            return lambda event: not test(get(event))
+        return lambda event: test(get(event))
+
+    def q(self, events: QuerySet, vendor: str, negated: bool) -> Optional[Q]:
+        """
+        Return the Q object matching the same events, or None if the
+        database would give a different result. negated is whether the
+        term is inside an odd number of NOTs.
+        """
+        log = logging.getLogger(__name__)
+        lookup, rhs = self.lookup, self.rhs
+        field = get_pushdown_field(events, self.path)
+        if field is None:
+            log.debug(f"Unable to push down term: {self.term}")
+            return None
+        is_key_transform = len(self.path) > 1
+        negate = self.negate
+        if lookup in ("eq", "ne"):
+            negate = negate != (lookup == "ne")
+            lookup = "exact"
+        if rhs is None:
+            # Missing keys are None in Python but never match in SQL
+            return None
+        elif lookup == "in" and not isinstance(rhs, (list, tuple, set)):
+            return None
+        elif lookup == "isnull" and (is_key_transform or not isinstance(rhs, bool)):
+            return None
+        elif is_key_transform and (negate != negated or lookup == "contains"):
+            # contains is JSON containment on a key transform, and negating
+            # a key transform drops events missing the key.
+            return None
+        elif vendor == "sqlite" and lookup in CASE_INSENSITIVE_ON_SQLITE:
+            return None
+        elif not is_key_transform and lookup != "isnull":
+            # The database converts the value to the type of the field, ie.
+            # source=123 matches "123" in SQL but not in Python
+            types = get_pushdown_types(field)
+            if not all(type(value) in types for value in (rhs if lookup == "in" else [rhs])):
+                return None
+        condition = Q(**{f"{'__'.join(self.path)}__{lookup}": rhs})
+        return ~condition if negate else condition
+
+
+    def mask(self, batch: ColumnBatch):
+        """
+        Return a boolean array of the events of batch matching the term,
+        or None if it can't be tested on columns with the same result.
+        """
+        if len(self.path) != 1 or self.lookup not in COLUMNAR_LOOKUPS or type(self.rhs) not in (int, float):
+            return None
+        numeric = batch.numeric(self.path[0])
+        if numeric is None:
+            return None
+        values, valid, _ = numeric
+        mask = COLUMNAR_LOOKUPS[self.lookup](values, self.rhs)
+        if not valid.all():
+            # None is never equal to a number, and can't be ordered with one
+            if self.lookup in ("exact", "eq"):
+                mask &= valid
+            elif self.lookup == "ne":
+                mask |= ~valid
+            else:
+                return None
+        return ~mask if self.negate else mask
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def compile(self) -> Callable[[Dict[str, Any]], bool]:
+        predicate = self.child.compile()
+        return lambda event: not predicate(event)
+
+    def q(self, events: QuerySet, vendor: str, negated: bool) -> Optional[Q]:
+        condition = self.child.q(events, vendor, not negated)
+        return None if condition is None else ~condition
+
+    def mask(self, batch: ColumnBatch):
+        mask = self.child.mask(batch)
+        return None if mask is None else ~mask
+
+
+class And:
+    def __init__(self, children):
+        self.children = children
+
+    def compile(self) -> Callable[[Dict[str, Any]], bool]:
+        predicates = [child.compile() for child in self.children]
+        if len(predicates) == 1:
+            return predicates[0]
+        def predicate(event):
+            for test in predicates:
+                if not test(event):
+                    return False
+            return True
+        return predicate
+
+    def q(self, events: QuerySet, vendor: str, negated: bool) -> Optional[Q]:
+        where = Q()
+        for child in self.children:
+            condition = child.q(events, vendor, negated)
+            if condition is None:
+                return None
+            where &= condition
+        return where
+
+    def mask(self, batch: ColumnBatch):
+        ret = numpy.ones(len(batch), dtype=bool)
+        for child in self.children:
+            mask = child.mask(batch)
+            if mask is None:
+                return None
+            ret &= mask
+        return ret
+
+
+class Or(And):
+    def compile(self) -> Callable[[Dict[str, Any]], bool]:
+        predicates = [child.compile() for child in self.children]
+        if len(predicates) == 1:
+            return predicates[0]
+        def predicate(event):
+            for test in predicates:
+                if test(event):
+                    return True
+            return False
+        return predicate
+
+    def q(self, events: QuerySet, vendor: str, negated: bool) -> Optional[Q]:
+        where = Q()
+        for child in self.children:
+            condition = child.q(events, vendor, negated)
+            if condition is None:
+                return None
+            where |= condition
+        return where
+
+    def mask(self, batch: ColumnBatch):
+        ret = numpy.zeros(len(batch), dtype=bool)
+        for child in self.children:
+            mask = child.mask(batch)
+            if mask is None:
+                return None
+            ret |= mask
+        return ret
+
+
+def parse_terms(tokens: List[str], no_cast: bool = False):
+    """
+    Parse the terms and the AND, OR, NOT, ( and ) keywords between them
+    into a tree of Term, Not, And and Or nodes. NOT binds tighter than
+    AND, which binds tighter than OR.
+    """
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else None
+
+    def parse_or():
+        nonlocal position
+        children = [parse_and()]
+        while peek() == OR:
+            position += 1
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and():
+        nonlocal position
+        children = [parse_not()]
+        while peek() not in (None, OR, CLOSE):
+            if peek() == AND:
+                position += 1
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_not():
+        nonlocal position
+        token = peek()
+        if token == NOT:
+            position += 1
+            return Not(parse_not())
+        if token == OPEN:
+            position += 1
+            node = parse_or()
+            if peek() != CLOSE:
+                raise ValueError("Unbalanced parentheses in filter terms")
+            position += 1
+            return node
+        if token in (None, AND, OR, CLOSE):
+            raise ValueError(f"Expected a term, found: {token or 'the end of the terms'}")
+        position += 1
+        return Term(token, no_cast=no_cast)
+
+    if not tokens:
+        return And([])
+    node = parse_or()
+    if position < len(tokens):
+        raise ValueError(f"Unexpected {tokens[position]} in filter terms")
+    return node
 
 parser = argparse.ArgumentParser(
     prog="filter",
@@ -60,7 +380,8 @@ parser = argparse.ArgumentParser(
 parser.add_argument(
     "terms",
     nargs="*",
-    help="Provide one or more search terms, must be in the form KEY=VALUE where key is a reference to a field and VALUE is the value. For KEY, django field lookups are (kind of) supported.",
+    help="Provide one or more search terms, must be in the form KEY=VALUE where key is a reference to a field and VALUE is the value. For KEY, django field lookups are (kind of) supported. "
+         "Terms can be combined with AND (the default between terms), OR and NOT, and grouped with ( and ), each as a separate argument, ie. status__gte=500 OR ( host=web1 NOT path__startswith=/health ).",
 )
 parser.add_argument(
     "--no-cast",
@@ -68,11 +389,59 @@ parser.add_argument(
     help="If specified, the value will not be cast to a type before completing the test",
 )
 
-@search_command(parser)
-def filter(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def parse_args(argv: List[str]):
+    if "filter" in argv:
+        argv.pop(argv.index("filter"))
+    args = parser.parse_args(argv)
+    return args, parse_terms(args.terms, no_cast=args.no_cast)
+
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[QuerySet]:
+    """
+    Translate the filter terms into a WHERE clause on events.
+
+    Returns None, so the terms are tested in Python, if any of them can't be
+    evaluated by the database with the same result.
+    """
+    log = logging.getLogger(__name__)
+    _, terms = parse_args(argv)
+    if events.query.is_sliced or events.query.combinator:
+        log.debug("Found sliced or combined QuerySet, unable to push down filter")
+        return None
+    where = terms.q(events, connections[events.db].vendor, negated=False)
+    if where is None:
+        return None
+    log.debug(f"Pushing down filter: {where}")
+    try:
+        return events.filter(where)
+    except (FieldError, ValidationError, ValueError, TypeError):
+        log.debug("Unable to push down filter", exc_info=True)
+        return None
+
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    _, terms = parse_args(argv)
+    predicate = terms.compile()
+    return lambda event: event if predicate(event) else None
+
+def columnar(request: HttpRequest, batch: ColumnBatch, argv: List[str], environment: Dict[str, Any]) -> Optional[ColumnBatch]:
+    """
+    Test numeric comparisons on whole columns, when the previous stage
+    returned a ColumnBatch. Returns None if any term can't be.
+    """
+    _, terms = parse_args(argv)
+    mask = terms.mask(batch)
+    if mask is None:
+        return None
+    return batch.take(numpy.flatnonzero(mask).tolist())
+
+@search_command(parser, pushdown=pushdown, row_function=row_function, columnar=columnar, columnar_input=False, cacheable=True)
+def filter(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Reduce the result set by removing events that don't meet the specified criteria.
 
+    The terms are compiled once into a tree of predicates, with the values
+    already cast, regular expressions compiled and field paths resolved to
+    getters, so each event costs a few function calls per term.
+
     Args:
         request (HttpRequest): The HTTP request object.
         events (Union[QuerySet, List[Dict[str, Any]]]): The result set to operate on.
@@ -80,49 +449,8 @@ def filter(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]],
         environment (Dict[str, Any]): Dictionary used as a jinja2 environment (context) for rendering the arguments of a command.
 
     Returns:
-        List[Dict[str, Any]]: A list of dictionaries with events that meet the specified criteria.
+        Iterator[Dict[str, Any]]: A generator of the events that meet the specified criteria.
     """
     log = logging.getLogger(__name__)
-    log.debug(f"Received {events} events")
-    events = resolve(events)
-    log.debug(f"Resolved events: {events}")
     log.debug(f"Received argv: {argv}")
-    if "filter" in argv:
-        argv.pop(argv.index("filter"))
-    args = filter.parser.parse_args(argv)
-    log.debug(f"Found args: {args}")
-
-    for event in events:
-        log.debug(f"Found event: {event}")
-        allowed = True
-        for term in args.terms:
-            log.debug(f"Found term: {term}")
-            expression, rhs = term.split("=")
-            if expression.startswith("!"):
-                negate = True
-                expression = expression.lstrip("!")
-            else:
-                negate = False
-            log.debug(f"Found expression: {expression}, rhs: {rhs}")
-            predicate, lhs = resolve_field_lookup(expression=expression, item=event)
-            log.debug(f"Found predicate: {predicate}, lhs: {lhs}")
-            if predicate not in lookup_map:
-                raise ValueError(f"Sorry, {predicate} is not a valid lookup, please choose one of {lookup_map.keys()}")
-            predicate = lookup_map[predicate]
-            log.debug(f"predicate resolved: {predicate}")
-
-            if not args.no_cast:
-                rhs = cast(rhs)
-                log.debug(f"Cast rhs: {rhs} to {type(rhs)}")
-            if negate:
-                if predicate(lhs, rhs):
-                    log.debug(f"negated {predicate}({lhs}, {rhs}) returned: {predicate(lhs, rhs)}")
-                    allowed = False
-                    break
-            else:
-                if not predicate(lhs, rhs):
-                    log.debug(f"{predicate}({lhs}, {rhs}) returned: {predicate(lhs, rhs)}")
-                    allowed = False
-                    break
-        if allowed:
-            yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
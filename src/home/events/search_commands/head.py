@@ -4,12 +4,13 @@
 
 import logging
 import argparse
-from typing import Any, Dict, List, Union
+from itertools import islice
+from typing import Any, Dict, List, Optional, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import iter_events
 from .decorators import search_command
 
 parser = argparse.ArgumentParser(
@@ -23,7 +24,30 @@ parser.add_argument(
     help="Provide the number of events to return.",
 )
 
-@search_command(parser)
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[QuerySet]:
+    """
+    Add a LIMIT to events instead of reading the first n rows.
+    """
+    if "head" in argv:
+        argv.pop(argv.index("head"))
+    args = parser.parse_args(argv)
+    if args.number < 0:
+        return None
+    return events[:args.number]
+
+def limit(argv: List[str]) -> Optional[int]:
+    """
+    Return the number of events head reads from its input.
+    """
+    argv = list(argv)
+    if "head" in argv:
+        argv.pop(argv.index("head"))
+    args = parser.parse_args(argv)
+    if args.number < 0:
+        return None
+    return args.number
+
+@search_command(parser, pushdown=pushdown, limit=limit, cacheable=True)
 def head(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Return the first n records of the result set.
@@ -38,12 +62,18 @@ def head(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], ar
         List[Dict[str, Any]]: A list of dictionaries with the first n records of the result set.
     """
     log = logging.getLogger(__name__)
-    events = resolve(events)
-    log.debug(f"Received {len(events)} events")
     log.debug(f"Received argv: {argv}")
     if "head" in argv:
         argv.pop(argv.index("head"))
     args = head.parser.parse_args(argv)
 
-    for item in events[:args.number]:
+    if args.number < 0:
+        # Everything but the last n events, which can't be known
+        # without reading them all
+        yield from list(iter_events(events))[:args.number]
+        return
+
+    # islice stops pulling from upstream once we have enough events,
+    # so any generators or QuerySet cursors before us stop early too.
+    for item in islice(iter_events(events), args.number):
         yield item
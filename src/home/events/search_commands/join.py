@@ -3,10 +3,14 @@
 # See the LICENSE file in the root of this repository for details.
 
 import argparse
+from collections import defaultdict
 from datetime import timedelta
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models
 from django.db.models import Q
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
@@ -18,7 +22,9 @@ from events.util import resolve
 from .decorators import search_command
 from .util import (
     cast,
+    get_pushdown_field,
     has_permission_for_model,
+    hashable,
 )
 
 parser = argparse.ArgumentParser(
@@ -63,12 +69,18 @@ parser.add_argument(
         "inner",
     ),
     default="left",
-    help="Specify the type of join to perform. (Default: left)",
+    help="Specify the type of join to perform. left and right keep the "
+         "unmatched events of their side, full keeps the unmatched "
+         "events of both sides and inner only keeps matched events. "
+         "(Default: left)",
 )
 parser.add_argument(
     "-f", "--fields",
+    action="append",
     help="Specify the fields to join on. "
-         "Specify in the format of LEFT_FIELD,RIGHT_FIELD",
+         "Specify in the format of LEFT_FIELD,RIGHT_FIELD, or FIELD "
+         "if the field has the same name on both sides. Can be specified "
+         "multiple times to join on several fields.",
 )
 parser.add_argument(
     "--model",
@@ -84,7 +96,7 @@ parser.add_argument(
          "For KEY, django field lookups are supported.",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def join(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Join the current result set to the results of this command.
@@ -159,36 +171,145 @@ def join(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], ar
         log.critical(f"FOUND ORDER_BY: {order_by}")
         ret = ret.order_by(*order_by)
 
+    pairs = parse_fields(args.fields)
+    left_fields = [left_field for left_field, _ in pairs]
+    right_fields = [right_field for _, right_field in pairs]
+
+    # The left events are already in memory, so they are the build side
+    # of the hash join and the right QuerySet is streamed past them.
     left = events
-    right = list(ret.values())
-    left_field, right_field = args.fields.split(",")
-    if args.type == "left":
-        for left_row in left:
-            match = False
-            for right_row in right:
-                if left_row.get(left_field, False) == right_row.get(right_field, "False"):
-                    new_row = left_row.copy()
-                    new_row.update(
-                        {k: v for k, v in right_row.items() if k != right_field}
-                    )
-                    yield new_row
-                    match = True
-            if not match:
-                yield left_row
-    elif args.type == "right":
+    positions = defaultdict(list)
+    for position, left_row in enumerate(left):
+        key = get_key(left_row, left_fields)
+        if key is not None:
+            positions[key].append(position)
+
+    querysets = None
+    if args.type in ("left", "inner"):
+        # Right events without a matching left event are dropped, so only
+        # ask the database for the ones with one of the left keys.
+        querysets = push_down_keys(ret.all(), left, pairs)
+    if querysets is None:
+        querysets = [ret.all()]
+    right = (
+        right_row
+        for queryset in querysets
+        for right_row in queryset.values().iterator(chunk_size=settings.DELVE_STREAMING_CHUNK_SIZE)
+    )
+
+    if args.type == "right":
         for right_row in right:
-            match = False
-            for left_row in left:
-                if right_row.get(right_field, False) == left_row.get(left_field, "False"):
-                    new_row = right_row.copy()
-                    new_row.update(
-                        {k: v for k, v in left_row.items() if k != left_field}
-                    )
-                    yield new_row
-                    match = True
-            if not match:
+            key = get_key(right_row, right_fields)
+            matches = positions.get(key) if key is not None else None
+            if not matches:
                 yield right_row
-    elif args.type == "full":
-        raise NotImplementedError(f"Sorry {args.type} currently not supported")
-    elif args.type == "inner":
-        raise NotImplementedError(f"Sorry {args.type} currently not supported")
+                continue
+            for position in matches:
+                yield merge(right_row, left[position], left_fields)
+        return
+
+    # Collect the matches of each left event, so the results come out in
+    # the order of the left events, as with a nested loop join.
+    matched = defaultdict(list)
+    unmatched = []
+    for right_row in right:
+        key = get_key(right_row, right_fields)
+        matches = positions.get(key) if key is not None else None
+        if not matches:
+            if args.type == "full":
+                unmatched.append(right_row)
+            continue
+        for position in matches:
+            matched[position].append(right_row)
+
+    for position, left_row in enumerate(left):
+        if position in matched:
+            for right_row in matched[position]:
+                yield merge(left_row, right_row, right_fields)
+        elif args.type in ("left", "full"):
+            yield left_row
+    yield from unmatched
+
+
+def parse_fields(fields: Optional[List[str]]) -> List[Tuple[str, str]]:
+    """
+    Parse the values given to --fields into a list of
+    (LEFT_FIELD, RIGHT_FIELD) pairs. A value without a comma
+    joins a field of the same name on both sides.
+    """
+    if not fields:
+        raise ValueError("Please specify the fields to join on with --fields.")
+    pairs = []
+    for value in fields:
+        if "," in value:
+            left_field, right_field = value.split(",", 1)
+        else:
+            left_field = right_field = value
+        pairs.append((left_field.strip(), right_field.strip()))
+    return pairs
+
+
+def get_key(row: Dict[str, Any], fields: List[str]) -> Optional[Tuple[Any, ...]]:
+    """
+    Return the join key of row, or None if row is missing one of fields,
+    in which case it can not match anything.
+    """
+    key = []
+    for field in fields:
+        if field not in row:
+            return None
+        key.append(hashable(row[field]))
+    return tuple(key)
+
+
+def merge(row: Dict[str, Any], other: Dict[str, Any], other_fields: List[str]) -> Dict[str, Any]:
+    """
+    Return a copy of row updated with the values of other, except
+    for the fields other was joined on.
+    """
+    new_row = row.copy()
+    new_row.update(
+        {k: v for k, v in other.items() if k not in other_fields}
+    )
+    return new_row
+
+
+def push_down_keys(ret: QuerySet, left: List[Dict[str, Any]], pairs: List[Tuple[str, str]]) -> Optional[List[QuerySet]]:
+    """
+    Return QuerySets which together hold each event of ret which can
+    match one of the left events exactly once, by filtering the first
+    join field which is a column of ret on the distinct left values
+    of the field, DELVE_JOIN_CHUNK_SIZE values at a time.
+
+    Returns None if none of the join fields can be pushed down.
+    """
+    log = logging.getLogger(__name__)
+    chunk_size = settings.DELVE_JOIN_CHUNK_SIZE
+    for left_field, right_field in pairs:
+        field = get_pushdown_field(ret, [right_field])
+        if field is None or isinstance(field, models.JSONField):
+            continue
+        values = set()
+        for left_row in left:
+            value = left_row.get(left_field)
+            try:
+                values.add(value)
+            except TypeError:
+                # An unhashable value can't equal a value of this column
+                continue
+        # NULL never matches IN, so right events with a NULL value are fetched separately
+        has_null = None in values
+        values.discard(None)
+        values = list(values)
+        try:
+            querysets = [
+                ret.filter(**{f"{right_field}__in": values[i:i + chunk_size]})
+                for i in range(0, len(values), chunk_size)
+            ]
+        except (ValueError, TypeError, ValidationError) as e:
+            log.debug(f"Unable to push down the keys of {left_field} into {right_field}: {e}")
+            continue
+        if has_null:
+            querysets.append(ret.filter(**{f"{right_field}__isnull": True}))
+        return querysets
+    return None
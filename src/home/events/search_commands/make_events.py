@@ -12,7 +12,7 @@ from django.http import HttpRequest
 
 from events.models import Event
 from events.serializers import EventSerializer
-from events.util import resolve
+from events.util import iter_events
 from .decorators import search_command
 from .util import has_permission_for_model
 
@@ -51,7 +51,7 @@ parser.add_argument(
     help="If specified, provide the name of a field to drop before creating the events."
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=False, side_effects=True)
 def make_events(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Generate events based on the current result set.
@@ -74,7 +74,7 @@ def make_events(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any
     host = args.host
     source = args.source
     sourcetype = args.sourcetype
-    events = resolve(events)
+    events = iter_events(events)
     for orig_event in events:
         event = {
             "host": host if "$" not in host else orig_event.get(host.replace("$", "")),
@@ -5,13 +5,13 @@
 import argparse
 from datetime import datetime
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Union
 
 from dateutil.parser import parse
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import apply_row_functions
 from .decorators import search_command
 
 parser = argparse.ArgumentParser(
@@ -24,8 +24,22 @@ parser.add_argument(
     help="Provide the fields you would like to parse as datetime",
 )
 
-@search_command(parser)
-def mark_timestamp(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    if "mark_timestamp" in argv:
+        argv.pop(argv.index("mark_timestamp"))
+    args = parser.parse_args(argv)
+    fields = args.fields
+
+    def row(event):
+        for field in fields:
+            if field in event:
+                if not isinstance(event[field], datetime):
+                    event[field] = parse(event[field])
+        return event
+    return row
+
+@search_command(parser, row_function=row_function, cacheable=True)
+def mark_timestamp(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Parse the given fields from strings to datetime objects. Useful for use with filter search_command.
 
@@ -38,16 +52,4 @@ def mark_timestamp(request: HttpRequest, events: Union[QuerySet, List[Dict[str,
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with the specified fields parsed as datetime objects.
     """
-    log = logging.getLogger(__name__)
-    events = resolve(events)
-    log.info(f"Received argv: {argv}")
-    if "mark_timestamp" in argv:
-        argv.pop(argv.index("mark_timestamp"))
-    args = mark_timestamp.parser.parse_args(argv)
-    log.info(f"Parsed args: {args}")
-    for event in events:
-        for field in args.fields:
-            if field in event:
-                if not isinstance(event[field], datetime):
-                    event[field] = parse(event[field])
-        yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
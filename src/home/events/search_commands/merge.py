@@ -47,7 +47,7 @@ def get_nested_value(data, field):
             return None
     return item
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def merge(request, events, argv, environment):
     log = logging.getLogger(__name__)
     args = merge.parser.parse_args(argv[1:])
@@ -56,6 +56,8 @@ def merge(request, events, argv, environment):
     log.debug(f"Found events to be list or generator function.")
     
     merged_events = defaultdict(lambda: defaultdict(list))
+    # Events aren't back-filled, a field missing from an event is None
+    columns = events.columns
     
     for event in events:
         key_dict = {field: get_nested_value(event, field) for field in args.fields}
@@ -64,8 +66,9 @@ def merge(request, events, argv, environment):
         if key not in merged_events:
             merged_events[key].update({field: value for field, value in key_dict.items()})
         
-        for field, value in event.items():
+        for field in columns:
             if field not in args.fields:
+                value = event.get(field)
                 if value not in merged_events[key][field]:
                     merged_events[key][field].append(value)
     
@@ -22,7 +22,7 @@ aggregate_parser.add_argument(
     help="The field/expression to aggregate from the result set",
 )
 
-@search_command(aggregate_parser)
+@search_command(aggregate_parser, cacheable=True)
 def aggregate(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
     """
     Perform aggregation on the result set.
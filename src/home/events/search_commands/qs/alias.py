@@ -22,7 +22,7 @@ alias_parser.add_argument(
     help="The field/expression to alias in the QuerySet",
 )
 
-@search_command(alias_parser)
+@search_command(alias_parser, cacheable=True)
 def alias(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Create aliases for expressions in the QuerySet. Aliases are temporary names for expressions that can be used in
@@ -22,7 +22,7 @@ annotate_parser.add_argument(
     help="The field/expression to annotate each object in the QuerySet with",
 )
 
-@search_command(annotate_parser)
+@search_command(annotate_parser, cacheable=True)
 def annotate(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Annotate each object in the QuerySet with the provided expressions.
@@ -16,7 +16,7 @@ count_parser = argparse.ArgumentParser(
     description="Return the number of records in the QuerySet",
 )
 
-@search_command(count_parser)
+@search_command(count_parser, cacheable=True)
 def count(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> int:
     """
     Return the number of records in the QuerySet.
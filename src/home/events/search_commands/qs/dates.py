@@ -33,7 +33,7 @@ dates_parser.add_argument(
     help="The order in which to retrieve the dates",
 )
 
-@search_command(dates_parser)
+@search_command(dates_parser, cacheable=True)
 def dates(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Return a QuerySet of dates based on the provided field and kind.
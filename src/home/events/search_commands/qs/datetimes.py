@@ -35,7 +35,7 @@ datetimes_parser.add_argument(
     help="The timezone to use for the datetimes",
 )
 
-@search_command(datetimes_parser)
+@search_command(datetimes_parser, cacheable=True)
 def datetimes(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Return a list of datetime objects representing all available datetimes in the QuerySet.
@@ -22,7 +22,7 @@ defer_parser.add_argument(
     help="The fields to defer loading",
 )
 
-@search_command(defer_parser)
+@search_command(defer_parser, cacheable=True)
 def defer(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Defer the loading of the specified fields.
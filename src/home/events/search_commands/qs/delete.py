@@ -11,13 +11,14 @@ from django.http import HttpRequest
 
 from events.search_commands.decorators import search_command
 from events.search_commands.util import has_permission_for_model
+from events import result_cache
 
 delete_parser = argparse.ArgumentParser(
     prog="delete",
     description="Delete records from the QuerySet",
 )
 
-@search_command(delete_parser)
+@search_command(delete_parser, cacheable=False, side_effects=True)
 def delete(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> int:
     """
     Delete records from the QuerySet.
@@ -49,4 +50,5 @@ def delete(request: HttpRequest, events: QuerySet, argv: List[str], environment:
 
     log.debug(f"Received {args=}")
     deleted_count, _ = events.delete()
+    result_cache.invalidate(model)
     return deleted_count
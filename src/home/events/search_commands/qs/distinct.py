@@ -26,7 +26,7 @@ distinct_parser.add_argument(
          "in the same order.",
 )
 
-@search_command(distinct_parser)
+@search_command(distinct_parser, cacheable=True)
 def distinct(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Return distinct records from the QuerySet.
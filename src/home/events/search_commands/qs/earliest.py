@@ -21,7 +21,7 @@ earliest_parser.add_argument(
     help="The field to determine the earliest record",
 )
 
-@search_command(earliest_parser)
+@search_command(earliest_parser, cacheable=True)
 def earliest(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
     """
     Return the earliest record in the QuerySet based on the provided field.
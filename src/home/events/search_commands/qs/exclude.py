@@ -22,7 +22,7 @@ exclude_parser.add_argument(
     help="The field/expression to exclude records from the QuerySet",
 )
 
-@search_command(exclude_parser)
+@search_command(exclude_parser, cacheable=True)
 def exclude(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Exclude records from the QuerySet based on the provided expressions.
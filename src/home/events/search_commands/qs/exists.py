@@ -16,7 +16,7 @@ exists_parser = argparse.ArgumentParser(
     description="Check if any records exist in the QuerySet",
 )
 
-@search_command(exists_parser)
+@search_command(exists_parser, cacheable=True)
 def exists(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> bool:
     """
     Check if any records exist in the QuerySet.
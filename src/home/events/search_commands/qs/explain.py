@@ -26,7 +26,7 @@ explain_parser.add_argument(
     help="Additional options for the execution plan",
 )
 
-@search_command(explain_parser)
+@search_command(explain_parser, cacheable=True)
 def explain(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> str:
     """
     Generate an execution plan for the QuerySet.
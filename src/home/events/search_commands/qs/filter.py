@@ -22,7 +22,7 @@ filter_parser.add_argument(
     help="The field/expression to filter records from the QuerySet",
 )
 
-@search_command(filter_parser)
+@search_command(filter_parser, cacheable=True)
 def filter(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Filter records from the QuerySet based on the provided expressions.
@@ -16,7 +16,7 @@ first_parser = argparse.ArgumentParser(
     description="Return the first record in the QuerySet",
 )
 
-@search_command(first_parser)
+@search_command(first_parser, cacheable=True)
 def first(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
     """
     Return the first record in the QuerySet.
@@ -22,7 +22,7 @@ group_by_parser.add_argument(
     help="The field/expression to group records from the QuerySet",
 )
 
-@search_command(group_by_parser)
+@search_command(group_by_parser, cacheable=True)
 def group_by(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Group records from the QuerySet based on the provided expressions.
@@ -22,7 +22,7 @@ having_parser.add_argument(
     help="The field/expression to filter grouped records from the QuerySet",
 )
 
-@search_command(having_parser)
+@search_command(having_parser, cacheable=True)
 def having(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Filter grouped records from the QuerySet based on the provided expressions.
@@ -16,7 +16,7 @@ last_parser = argparse.ArgumentParser(
     description="Return the last record in the QuerySet",
 )
 
-@search_command(last_parser)
+@search_command(last_parser, cacheable=True)
 def last(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
     """
     Return the last record in the QuerySet.
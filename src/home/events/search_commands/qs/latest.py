@@ -21,7 +21,7 @@ latest_parser.add_argument(
     help="The field to determine the latest record",
 )
 
-@search_command(latest_parser)
+@search_command(latest_parser, cacheable=True)
 def latest(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
     """
     Return the latest record in the QuerySet based on the provided field.
@@ -29,7 +29,7 @@ limit_parser.add_argument(
     help="The number of records to skip before starting to return records",
 )
 
-@search_command(limit_parser)
+@search_command(limit_parser, cacheable=True)
 def limit(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Limit the number of records in the QuerySet.
@@ -23,7 +23,7 @@ only_parser.add_argument(
     help="The fields to load on the QuerySet",
 )
 
-@search_command(only_parser)
+@search_command(only_parser, cacheable=True)
 def only(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Load only the specified fields on the QuerySet.
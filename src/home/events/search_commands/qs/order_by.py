@@ -22,7 +22,7 @@ order_by_parser.add_argument(
     help="The fields to order the QuerySet by",
 )
 
-@search_command(order_by_parser)
+@search_command(order_by_parser, cacheable=True)
 def order_by(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Order the QuerySet with the provided fields.
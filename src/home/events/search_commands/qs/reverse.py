@@ -16,7 +16,7 @@ reverse_parser = argparse.ArgumentParser(
     description="Reverse the order of the records in the QuerySet",
 )
 
-@search_command(reverse_parser)
+@search_command(reverse_parser, cacheable=True)
 def reverse(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Reverse the order of the records in the QuerySet.
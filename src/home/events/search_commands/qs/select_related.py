@@ -23,7 +23,7 @@ select_related_parser.add_argument(
     help="The related fields to include in the QuerySet",
 )
 
-@search_command(select_related_parser)
+@search_command(select_related_parser, cacheable=True)
 def select_related(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Perform a SQL join and include the fields of the related object in the QuerySet.
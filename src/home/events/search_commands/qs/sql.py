@@ -16,7 +16,7 @@ sql_parser = argparse.ArgumentParser(
     description="Output the SQL query for the current QuerySet",
 )
 
-@search_command(sql_parser)
+@search_command(sql_parser, cacheable=True)
 def sql(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> str:
     """
     Output the SQL query for the current QuerySet.
@@ -11,6 +11,7 @@ from django.http import HttpRequest
 
 from events.search_commands.decorators import search_command
 from events.search_commands.util import has_permission_for_model
+from events import result_cache
 
 from ._util import parse_field_expressions, generate_keyword_args
 
@@ -24,7 +25,7 @@ update_parser.add_argument(
     help="The fields to update",
 )
 
-@search_command(update_parser)
+@search_command(update_parser, cacheable=False, side_effects=True)
 def update(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> int:
     """
     Update the specified fields in the QuerySet.
@@ -57,4 +58,6 @@ def update(request: HttpRequest, events: QuerySet, argv: List[str], environment:
     log.debug(f"Parsed expressions: {parsed_expressions}")
     positional_args, keyword_args = generate_keyword_args(parsed_expressions)
     log.debug(f"Generated positional_args: {positional_args}, keyword_args: {keyword_args}")
-    return events.update(**keyword_args)
+    updated_count = events.update(**keyword_args)
+    result_cache.invalidate(model)
+    return updated_count
@@ -21,7 +21,7 @@ using_parser.add_argument(
     help="The alias of the database to use",
 )
 
-@search_command(using_parser)
+@search_command(using_parser, cacheable=True)
 def using(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Select the database to use for the QuerySet.
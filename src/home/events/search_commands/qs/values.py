@@ -23,7 +23,7 @@ values_parser.add_argument(
     help="The field/expression to return from the result set",
 )
 
-@search_command(values_parser)
+@search_command(values_parser, cacheable=True)
 def values(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> QuerySet:
     """
     Return a subset of fields from the result set or generate grouped aggregations.
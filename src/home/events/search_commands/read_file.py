@@ -35,7 +35,7 @@ parser.add_argument(
          "will be parsed according to the format specified.",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=False)
 def read_file(request, events, argv, environment):
     # import magic
     if events:
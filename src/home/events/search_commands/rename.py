@@ -3,12 +3,12 @@
 # See the LICENSE file in the root of this repository for details.
 
 import argparse
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import apply_row_functions
 from .decorators import search_command
 
 parser = argparse.ArgumentParser(
@@ -26,8 +26,17 @@ parser.add_argument(
     help="The field to rename to",
 )
 
-@search_command(parser)
-def rename(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    args = parser.parse_args(argv[1:])
+    from_field, to_field = args.from_field, args.to_field
+
+    def row(event):
+        event[to_field] = event.pop(from_field, None)
+        return event
+    return row
+
+@search_command(parser, row_function=row_function, cacheable=True)
+def rename(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Rename a field.
 
@@ -40,8 +49,4 @@ def rename(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]],
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with the specified field renamed.
     """
-    events = resolve(events)
-    args = rename.parser.parse_args(argv[1:])
-    for event in events:
-        event[args.to_field] = event.pop(args.from_field)
-        yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
@@ -4,12 +4,12 @@
 
 import re
 import argparse
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import apply_row_functions
 
 from .decorators import search_command
 
@@ -31,8 +31,21 @@ parser.add_argument(
     help="The string to replace the matched text with",
 )
 
-@search_command(parser)
-def replace(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    args = parser.parse_args(argv[1:])
+    field = args.field
+    expression = re.compile(args.expression)
+    replacement = args.replacement
+
+    def row(event):
+        value = event.get(field)
+        # A missing field is None, as if it had been back-filled
+        event[field] = None if value is None else expression.sub(replacement, value)
+        return event
+    return row
+
+@search_command(parser, row_function=row_function, cacheable=True)
+def replace(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Replace text matching a regular expression with a provided string.
 
@@ -45,11 +58,4 @@ def replace(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]],
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with the specified text replaced.
     """
-    events = resolve(events)
-    args = replace.parser.parse_args(argv[1:])
-    field = args.field
-    expression = re.compile(args.expression)
-    replacement = args.replacement
-    for event in events:
-        event[field] = expression.sub(replacement, event[field])
-        yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
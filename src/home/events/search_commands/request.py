@@ -92,7 +92,15 @@ parser.add_argument(
     help="If specified, SSL certificates will not be verified",
 )
 
-@search_command(parser)
+def has_side_effects(argv: List[str]) -> bool:
+    """
+    Return whether the request described by argv changes anything, ie.
+    it is not a GET, HEAD or OPTIONS request or it saves an event.
+    """
+    args, _ = parser.parse_known_args(argv[1:])
+    return args.method not in ("GET", "HEAD", "OPTIONS") or args.save_event
+
+@search_command(parser, cacheable=False, side_effects=has_side_effects)
 def make_request(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Issue an HTTP request to retrieve data.
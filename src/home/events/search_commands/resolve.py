@@ -17,7 +17,7 @@ parser = argparse.ArgumentParser(
     description="Resolve the result set. This will unwrap any generators or QuerySets.",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def resolve(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Resolve the result set. This will unwrap any generators or QuerySets.
@@ -5,12 +5,12 @@
 import re
 import argparse
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import apply_row_functions
 
 from .decorators import search_command
 
@@ -29,8 +29,27 @@ parser.add_argument(
     help="The regular expressions to use for extraction",
 )
 
-@search_command(parser)
-def rex(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    args = parser.parse_args(argv[1:])
+    field = args.field
+    expressions = [re.compile(expression) for expression in args.expressions]
+
+    def row(event):
+        value = event.get(field)
+        if value is None:
+            return event
+        for expression in expressions:
+            try:
+                results = expression.search(value)
+            except:
+                results = expression.search(value.decode())
+            if results:
+                event.update(results.groupdict())
+        return event
+    return row
+
+@search_command(parser, row_function=row_function, cacheable=True)
+def rex(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Use regular expressions to extract values from a field and store in extracted_fields.
 
@@ -43,21 +62,4 @@ def rex(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], arg
     Returns:
         List[Dict[str, Any]]: A list of dictionaries with extracted values.
     """
-    log = logging.getLogger(__name__)
-    log.info("In search_command rex")
-    events = resolve(events)
-    args = rex.parser.parse_args(argv[1:])
-    log.debug(f"Found args: {args}")
-    expressions = [re.compile(expression) for expression in args.expressions]
-    log.debug(f"Found expressions: {expressions}")
-    for event in events:
-        log.debug(f"Found event: {event}")
-        for expression in expressions:
-            try:
-                results = expression.search(event[args.field])
-            except:
-                results = expression.search(event[args.field].decode())
-            log.debug(f"Found results: {results}")
-            if results:
-                event.update(results.groupdict())
-        yield event
+    return apply_row_functions(events, [row_function(request, argv, environment)])
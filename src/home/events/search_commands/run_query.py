@@ -24,7 +24,7 @@ parser.add_argument(
     help="The name of the saved query to run",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=False, side_effects=True)
 def run_query(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Union[QuerySet, List[Dict[str, Any]]]:
     """
     Run a named query. If any events are received, the results of the query are appended to the events received.
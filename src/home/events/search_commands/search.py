@@ -261,7 +261,8 @@ parser.add_argument(
     parser,
     input_validators=[
         MustBeFirst,
-    ]
+    ],
+    cacheable=True,
 )
 def search(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Union[QuerySet, List[Dict[str, Any]]]:
     """
@@ -6,11 +6,15 @@ import argparse
 import logging
 import inspect
 from types import GeneratorType
-from typing import Any, Dict, List, Union
+from typing import Any, Callable, Dict, Iterator, List, Optional, Union
 
+from django.conf import settings
+from django.core.exceptions import FieldError
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
+from events.util import apply_row_functions
+
 from .decorators import search_command
 
 parser = argparse.ArgumentParser(
@@ -23,8 +27,38 @@ parser.add_argument(
     help="The fields to select from the result set",
 )
 
-@search_command(parser)
-def select(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Union[QuerySet, List[Dict[str, Any]]]:
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[QuerySet]:
+    """
+    Select only the specified columns instead of fetching whole rows.
+    """
+    args = parser.parse_args(argv[1:])
+    try:
+        return events.values(*args.fields)
+    except FieldError:
+        return None
+
+def row_function(request: HttpRequest, argv: List[str], environment: Dict[str, Any]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    args = parser.parse_args(argv[1:])
+    paths = [(field, field.split("__")) for field in args.fields]
+
+    def row(event):
+        ret = {}
+        for field, path in paths:
+            item = event
+            for segment in path:
+                try:
+                    item = item[segment]
+                except KeyError:
+                    item = None
+                    break
+                except TypeError:
+                    item = getattr(item, segment)
+            ret[field] = item
+        return ret
+    return row
+
+@search_command(parser, pushdown=pushdown, row_function=row_function, cacheable=True)
+def select(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
     """
     Remove all but the specified fields from all events.
 
@@ -38,32 +72,13 @@ def select(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]],
         Union[QuerySet, List[Dict[str, Any]]]: A QuerySet or list of events with only the specified fields.
     """
     log = logging.getLogger(__name__)
-    args = select.parser.parse_args(argv[1:])
-    log.info(f"In select, Found args: {args}")
     if isinstance(events, GeneratorType) or inspect.isgeneratorfunction(events) or isinstance(events, list):
         log.debug("Found events to be list or generator function.")
-        for event in events:
-            row = {}
-            for field in args.fields:
-                item = event
-                for segment in field.split("__"):
-                    log.debug(f"Trying segment: {segment}")
-                    try:
-                        item = item[segment]
-                        log.debug(f"Found segment {segment}: {item}")
-                    except KeyError:
-                        log.warning(f"Received KeyError, field {segment} not in {item}")
-                        item = None
-                    except TypeError:
-                        item = getattr(item, segment)
-                row[field] = item
-                log.debug(f"row[field]: {row[field]}")
-            log.debug(f"Yielding row: {row}")
-            yield row
+        return apply_row_functions(events, [row_function(request, argv, environment)])
     elif isinstance(events, QuerySet):
         log.debug(f"Found events to be instance of QuerySet.")
-        for row in list(events.values(*args.fields)):
-            log.debug(f"Yielding row: {row}")
-            yield row
+        args = select.parser.parse_args(argv[1:])
+        return (row for row in events.values(*args.fields).iterator(chunk_size=settings.DELVE_STREAMING_CHUNK_SIZE))
     else:
         log.warning(f"Found type(events): {type(events)}")
+        return (event for event in ())
@@ -31,7 +31,7 @@ parser.add_argument(
     help="The email message",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=False, side_effects=True)
 def send_email(request: HttpRequest, events: Union[List[Dict[str, Any]], Any], argv: List[str], context: Dict[str, Any]) -> Union[List[Dict[str, Any]], Any]:
     """
     Send an email notification based on the result set.
@@ -4,13 +4,18 @@
 
 import argparse
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
+from django.core.exceptions import FieldError
+from django.db import models
+from django.db.models import F
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
-from operator import itemgetter
 
-from events.util import resolve
+from events.columnar import ColumnBatch, numpy
+from events.sorting import fields_sort_key, sort_events, sort_key, top_events
+from events.util import iter_events
+from .util import get_pushdown_field, is_pushdown_column
 from .decorators import search_command
 
 parser = argparse.ArgumentParser(
@@ -28,11 +33,77 @@ parser.add_argument(
     help="The fields to sort by",
 )
 
-@search_command(parser)
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[QuerySet]:
+    """
+    Add an ORDER BY to events instead of sorting them in Python.
+
+    NULLs are ordered as sort_key orders None: first, or last when
+    descending. JSON values are never pushed down, the database orders
+    them differently than sort_key.
+    """
+    log = logging.getLogger(__name__)
+    args = parser.parse_args(argv[1:])
+    if not args.fields or events.query.is_sliced or events.query.combinator:
+        return None
+    for field in args.fields:
+        if "__" in field or not is_pushdown_column(events, field) or isinstance(
+            get_pushdown_field(events, [field]), models.JSONField
+        ):
+            log.debug(f"Unable to push down sort on field: {field}")
+            return None
+    if args.descending:
+        ordering = [F(field).desc(nulls_last=True) for field in args.fields]
+    else:
+        ordering = [F(field).asc(nulls_first=True) for field in args.fields]
+    try:
+        return events.order_by(*ordering)
+    except FieldError:
+        return None
+
+def top(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any], number: int) -> List[Dict[str, Any]]:
+    """
+    Return only the first number sorted events, when sort is followed
+    by head, keeping at most number events in memory.
+    """
+    args = parser.parse_args(argv[1:])
+    key = fields_sort_key(args.fields) if args.fields else sort_key
+    return top_events(iter_events(events), key=key, reverse=args.descending, number=number)
+
+def columnar(request: HttpRequest, batch: ColumnBatch, argv: List[str], environment: Dict[str, Any]) -> Optional[ColumnBatch]:
+    """
+    Sort a ColumnBatch on numeric fields with numpy.lexsort, in the
+    order of sort_key: None and missing values first, then numbers, then
+    NaN. Returns None if a field holds anything but numbers.
+    """
+    args = parser.parse_args(argv[1:])
+    if not args.fields:
+        return None
+    keys = []
+    # numpy.lexsort sorts by its last key first
+    for field in reversed(args.fields):
+        numeric = batch.numeric(field)
+        if numeric is None:
+            return None
+        values, valid, _ = numeric
+        nan = valid & numpy.isnan(values)
+        category = numpy.where(valid, numpy.where(nan, 2, 1), 0)
+        values = numpy.where(valid & ~nan, values, 0.0)
+        if args.descending:
+            # Negating keeps ties in their original order, like sorted(reverse=True)
+            category, values = -category, -values
+        keys.extend((values, category))
+    return batch.take(numpy.lexsort(keys).tolist())
+
+@search_command(parser, pushdown=pushdown, top=top, columnar=columnar, cacheable=True)
 def sort(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Union[QuerySet, List[Dict[str, Any]]]:
     """
     Sort the result set by the specified fields.
 
+    Values of different types, and missing fields, are ordered as
+    described by events.sorting.sort_key. Result sets larger than
+    DELVE_SORT_BUFFER_SIZE are sorted in runs which are spilled to
+    temporary files and merged while the output is read.
+
     Args:
         request (HttpRequest): The HTTP request object.
         events (Union[QuerySet, List[Dict[str, Any]]]): The result set to operate on.
@@ -47,19 +118,15 @@ def sort(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], ar
     args = sort.parser.parse_args(argv[1:])
     log.debug(f"Found args: {args}")
 
-    events = resolve(events)
-
     if not args.fields:
         log.info("No fields specified, using default sort")
-        return sorted(
-            events,
-            reverse=args.descending,
-        )
+        key = sort_key
     else:
         log.debug(f"Sorting by fields: {args.fields}")
-        events.sort(
-            reverse=args.descending,
-            key=itemgetter(*args.fields),
-        )
+        key = fields_sort_key(args.fields)
 
-    return events
+    return sort_events(
+        iter_events(events),
+        key=key,
+        reverse=args.descending,
+    )
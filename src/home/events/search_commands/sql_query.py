@@ -29,7 +29,7 @@ parser.add_argument(
     help="The SQL query to issue."
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=False, side_effects=True)
 def sql_query(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
     """
     Perform a SQL query against the specified database.
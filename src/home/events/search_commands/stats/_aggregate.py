@@ -0,0 +1,370 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+A hash aggregation engine for the stats subcommands.
+
+aggregate reads the events once, keeping one running aggregate per
+group of events with the same values of the --by fields, so its memory
+is proportional to the number of groups rather than the number of
+events. None values are skipped by every aggregate, as in SQL.
+
+Aggregates over different partitions of the events can be combined with
+merge_groups, so partial aggregates (ie. from different workers) give the
+same result as aggregating every event at once. The dc, percentile and
+freq aggregates are estimated with the sketches of events.sketches, so
+they also need bounded memory per group.
+
+aggregate_columnar computes the numeric aggregates over an
+events.columnar.ColumnBatch with NumPy instead, with the same results.
+"""
+
+import math
+from collections import defaultdict
+
+from events.columnar import group_aggregate, numpy
+from events.sketches import CountMinSketch, HyperLogLog, TDigest
+from events.sorting import sort_key
+from events.search_commands.util import hashable
+
+
+class Aggregate:
+    """
+    The running state of an aggregate function over one group.
+    """
+    def add(self, value):
+        raise NotImplementedError
+
+    def merge(self, other):
+        """
+        Combine the state of other, an aggregate of the same type over
+        other events, into this one.
+        """
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+
+class CountAggregate(Aggregate):
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value):
+        if value is not None:
+            self.count += 1
+
+    def merge(self, other):
+        self.count += other.count
+
+    def result(self):
+        return self.count
+
+
+class DistinctCountAggregate(Aggregate):
+    def __init__(self):
+        self.values = set()
+
+    def add(self, value):
+        if value is not None:
+            self.values.add(hashable(value))
+
+    def merge(self, other):
+        self.values |= other.values
+
+    def result(self):
+        return len(self.values)
+
+
+class SumAggregate(Aggregate):
+    def __init__(self):
+        self.total = 0
+
+    def add(self, value):
+        if value is not None:
+            self.total += value
+
+    def merge(self, other):
+        self.total += other.total
+
+    def result(self):
+        return self.total
+
+
+class MinAggregate(Aggregate):
+    def __init__(self):
+        self.value = None
+
+    def add(self, value):
+        if value is not None and (self.value is None or sort_key(value) < sort_key(self.value)):
+            self.value = value
+
+    def merge(self, other):
+        self.add(other.value)
+
+    def result(self):
+        return self.value
+
+
+class MaxAggregate(Aggregate):
+    def __init__(self):
+        self.value = None
+
+    def add(self, value):
+        if value is not None and (self.value is None or sort_key(value) > sort_key(self.value)):
+            self.value = value
+
+    def merge(self, other):
+        self.add(other.value)
+
+    def result(self):
+        return self.value
+
+
+class AvgAggregate(Aggregate):
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, value):
+        if value is not None:
+            self.total += value
+            self.count += 1
+
+    def merge(self, other):
+        self.total += other.total
+        self.count += other.count
+
+    def result(self):
+        if not self.count:
+            return None
+        return self.total / self.count
+
+
+class StdevAggregate(Aggregate):
+    """
+    The sample standard deviation, computed with Welford's algorithm.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        if value is not None:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        # Chan et al.'s parallel variant of Welford's algorithm
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+
+    def result(self):
+        if self.count < 2:
+            return None
+        return math.sqrt(self.m2 / (self.count - 1))
+
+
+class ApproximateDistinctCountAggregate(Aggregate):
+    """
+    The number of distinct values, estimated with a HyperLogLog.
+    """
+    def __init__(self, precision=None):
+        self.sketch = HyperLogLog(precision)
+
+    def add(self, value):
+        if value is not None:
+            self.sketch.add(value)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        return self.sketch.count()
+
+
+class PercentileAggregate(Aggregate):
+    """
+    Percentiles of the values, estimated with a t-digest. The result is
+    a dict of each percentile to its value.
+    """
+    def __init__(self, percentiles=(50, 95, 99), compression=None):
+        self.percentiles = percentiles
+        self.sketch = TDigest(compression)
+
+    def add(self, value):
+        if value is not None:
+            self.sketch.add(value)
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+
+    def result(self):
+        return {
+            percentile: self.sketch.quantile(percentile / 100)
+            for percentile in self.percentiles
+        }
+
+
+class FrequencyAggregate(Aggregate):
+    """
+    The top most frequent values, with their number of occurrences
+    estimated with a count-min sketch. Only top candidates are kept, a
+    value replaces the least frequent candidate once it is estimated to
+    be more frequent. The result is a list of (value, count) tuples, most
+    frequent first.
+    """
+    def __init__(self, top=10, epsilon=None, delta=None):
+        self.top = top
+        self.sketch = CountMinSketch(epsilon, delta)
+        # key -> [value, estimated count when last seen]
+        self.candidates = {}
+
+    def add(self, value):
+        if value is not None:
+            self._consider(value, self.sketch.add(value))
+
+    def _consider(self, value, estimate):
+        key = hashable(value)
+        if key in self.candidates or len(self.candidates) < self.top:
+            self.candidates[key] = [value, estimate]
+            return
+        least = min(self.candidates, key=lambda key: self.candidates[key][1])
+        if estimate > self.candidates[least][1]:
+            del self.candidates[least]
+            self.candidates[key] = [value, estimate]
+
+    def merge(self, other):
+        self.sketch.merge(other.sketch)
+        for value, _ in other.candidates.values():
+            self._consider(value, self.sketch.estimate(value))
+
+    def result(self):
+        counts = [(value, self.sketch.estimate(value)) for value, _ in self.candidates.values()]
+        counts.sort(key=lambda item: -item[1])
+        return counts[:self.top]
+
+
+AGGREGATES = {
+    "count": CountAggregate,
+    "distinct_count": DistinctCountAggregate,
+    "sum": SumAggregate,
+    "min": MinAggregate,
+    "max": MaxAggregate,
+    "avg": AvgAggregate,
+    "stdev": StdevAggregate,
+    "dc": ApproximateDistinctCountAggregate,
+    "percentile": PercentileAggregate,
+    "freq": FrequencyAggregate,
+}
+
+
+def group_key(event, by):
+    return tuple(hashable(event.get(field)) for field in by)
+
+
+def aggregate(events, by, function, value, **options):
+    """
+    Compute the aggregate function (a key of AGGREGATES, created with
+    options) of value(event) for each group of events with the same
+    values of the fields in by, in one pass over events.
+
+    Returns a dict of each group's key to a (values, aggregate) tuple,
+    where values are the values of by for the group.
+    """
+    by = by or []
+    groups = {}
+    for event in events:
+        key = group_key(event, by)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ([event.get(field) for field in by], AGGREGATES[function](**options))
+        group[1].add(value(event))
+    return groups
+
+
+def merge_groups(groups, other):
+    """
+    Merge the groups returned by aggregate for other events into groups,
+    returning groups.
+    """
+    for key, (values, state) in other.items():
+        if key in groups:
+            groups[key][1].merge(state)
+        else:
+            groups[key] = (values, state)
+    return groups
+
+
+def sorted_groups(groups):
+    """
+    Return the items of groups ordered by the values of their by fields.
+    """
+    return sorted(
+        groups.items(),
+        key=lambda item: tuple(sort_key(value) for value in item[1][0]),
+    )
+
+
+def group_rows(groups, by, as_field):
+    """
+    Return one row per group holding the values of the by fields and the
+    group's aggregate as as_field.
+    """
+    by = by or []
+    return [
+        {**dict(zip(by, values)), as_field: state.result()}
+        for _, (values, state) in sorted_groups(groups)
+    ]
+
+
+def decorate(events, groups, by, row):
+    """
+    Return the events grouped by the values of the by fields, each passed
+    through row(event, result) with the aggregate of its group.
+    """
+    members = defaultdict(list)
+    for event in events:
+        members[group_key(event, by)].append(event)
+    ret = []
+    for key, (_, state) in sorted_groups(groups):
+        result = state.result()
+        for event in members[key]:
+            ret.append(row(event, result))
+    return ret
+
+
+def aggregate_columnar(batch, by, function, field, as_field, per_group):
+    """
+    The equivalent of aggregate followed by group_rows (if per_group) or
+    decorate for a ColumnBatch, where function is count, sum, min, max,
+    avg or stdev. Returns a list of rows, or a ColumnBatch of the events
+    with the result of their group as as_field, or None if field does not
+    hold numbers only.
+    """
+    by = by or []
+    numeric = batch.numeric(field)
+    if numeric is None:
+        return None
+    values, valid, integer = numeric
+    codes, keys = batch.factorize(by)
+    results = group_aggregate(function, codes, len(keys), values, valid, integer)
+    order = sorted(range(len(keys)), key=lambda group: tuple(sort_key(value) for value in keys[group]))
+    if per_group:
+        return [{**dict(zip(by, keys[group])), as_field: results[group]} for group in order]
+    # Events are grouped in the order of their groups, keeping their
+    # order within each group
+    rank = numpy.empty(len(keys), dtype=numpy.int64)
+    rank[order] = numpy.arange(len(keys))
+    permutation = numpy.argsort(rank[codes], kind="stable")
+    batch = batch.take(permutation.tolist())
+    return batch.with_column(as_field, [results[code] for code in codes[permutation].tolist()])
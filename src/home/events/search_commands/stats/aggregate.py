@@ -0,0 +1,117 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+from django.conf import settings
+from django.db.models import F, FloatField, Window
+from django.db.models.functions import Cast
+
+from events.util import iter_events, resolve
+from events.search_commands.util import is_pushdown_column
+from events.search_commands.qs._util import AGGREGATION_FUNCTIONS
+from ._aggregate import aggregate, aggregate_columnar, decorate, group_rows
+
+# The subcommands computed by the aggregation engine, with the name of
+# the database aggregate they are pushed down as and whether the field
+# is cast to a float first.
+FUNCTIONS = {
+    "sum": ("Sum", True),
+    "min": ("Min", False),
+    "max": ("Max", False),
+    "stdev": ("StdDev", True),
+    "distinct_count": ("Count", False),
+}
+
+# The subcommands which can be computed over a ColumnBatch
+COLUMNAR_FUNCTIONS = ("sum", "min", "max", "stdev")
+
+DESCRIPTIONS = {
+    "sum": "Take the sum of a field",
+    "min": "Take the minimum value of a field",
+    "max": "Take the maximum value of a field",
+    "stdev": "Take the sample standard deviation of a field",
+    "distinct_count": "Take the number of distinct values of a field",
+}
+
+def add_aggregate_parser_arguments(aggregate_parser, function):
+    aggregate_parser.add_argument(
+        "--by",
+        nargs="+",
+        help=f"If specified, the {function} returned will be by the specified fields",
+    )
+    aggregate_parser.add_argument(
+        "--as-field",
+        default=function,
+        help=f"If specified, the {function} will be stored as the specified field",
+    )
+    aggregate_parser.add_argument(
+        "--per-group",
+        action="store_true",
+        help=f"If specified, return one event per group holding the --by "
+             f"fields and the {function}, instead of every event with the "
+             f"{function} of its group",
+    )
+    aggregate_parser.add_argument(
+        "field",
+        help="The field to aggregate, null or missing values are ignored",
+    )
+
+def compute(events, args, environment):
+    function = args.subparser_name
+    value = lambda event: event.get(args.field)
+    if args.per_group:
+        groups = aggregate(iter_events(events), args.by, function, value)
+        return group_rows(groups, args.by, args.as_field)
+    events = resolve(events)
+    groups = aggregate(events, args.by, function, value)
+    return decorate(
+        events,
+        groups,
+        args.by or [],
+        lambda event, result: {args.as_field: result, **event},
+    )
+
+def compute_columnar(batch, args, environment):
+    function = args.subparser_name
+    if function not in COLUMNAR_FUNCTIONS:
+        return None
+    return aggregate_columnar(batch, args.by, function, args.field, args.as_field, args.per_group)
+
+def compute_pushdown(events, args, environment):
+    function = args.subparser_name
+    if events.query.is_sliced or events.query.combinator:
+        return None
+    columns = [args.field, *(args.by or [])]
+    if not all(is_pushdown_column(events, column) for column in columns):
+        return None
+    name, cast_to_float = FUNCTIONS[function]
+    expression = F(args.field)
+    if cast_to_float:
+        expression = Cast(expression, FloatField())
+    if function == "stdev":
+        expression = AGGREGATION_FUNCTIONS[name](expression, sample=True)
+    else:
+        expression = AGGREGATION_FUNCTIONS[name](expression, distinct=function == "distinct_count")
+
+    if args.per_group:
+        if not args.by:
+            return [events.aggregate(**{args.as_field: expression})]
+        return events.order_by(*args.by).values(*args.by).annotate(**{args.as_field: expression})
+    if function == "distinct_count":
+        # Window functions can't count distinct values
+        return None
+    window = Window(
+        expression,
+        partition_by=[F(field) for field in args.by] if args.by else None,
+    )
+    events = events.annotate(_stats_aggregate=window)
+    if args.by:
+        events = events.order_by(*args.by, *events.query.order_by)
+    if not events._fields:
+        events = events.values()
+
+    def _annotated(events):
+        for event in events.iterator(chunk_size=settings.DELVE_STREAMING_CHUNK_SIZE):
+            result = event.pop("_stats_aggregate")
+            yield {args.as_field: result, **event}
+    return _annotated(events)
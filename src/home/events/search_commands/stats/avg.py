@@ -2,12 +2,14 @@
 # This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
 # See the LICENSE file in the root of this repository for details.
 
-from itertools import groupby
-from operator import itemgetter
-from statistics import mean
+from django.conf import settings
+from django.db.models import F, FloatField, Window
+from django.db.models.functions import Cast
 
-from events.util import resolve
-from events.search_commands.util import cast
+from events.util import iter_events, resolve
+from events.search_commands.util import is_pushdown_column
+from events.search_commands.qs._util import AGGREGATION_FUNCTIONS
+from ._aggregate import aggregate, aggregate_columnar, decorate, group_rows
 
 def add_avg_parser_arguments(avg_parser):
     avg_parser.add_argument(
@@ -20,25 +22,59 @@ def add_avg_parser_arguments(avg_parser):
         default="avg",
         help="If specified, the average will be stored as the specified field",
     )
+    avg_parser.add_argument(
+        "--per-group",
+        action="store_true",
+        help="If specified, return one event per group holding the --by "
+             "fields and the average, instead of every event with the "
+             "average of its group",
+    )
     avg_parser.add_argument(
         "field",
         help="The field to average",
     )
 
 def avg(events, args, environment):
+    value = lambda event: event.get(args.field)
+    if args.per_group:
+        groups = aggregate(iter_events(events), args.by, "avg", value)
+        return group_rows(groups, args.by, args.as_field)
     events = resolve(events)
+    groups = aggregate(events, args.by, "avg", value)
+    return decorate(
+        events,
+        groups,
+        args.by or [],
+        lambda event, average: {args.as_field: average, **event},
+    )
+
+def avg_columnar(batch, args, environment):
+    return aggregate_columnar(batch, args.by, "avg", args.field, args.as_field, args.per_group)
+
+def avg_pushdown(events, args, environment):
+    if events.query.is_sliced or events.query.combinator:
+        return None
+    columns = [args.field, *(args.by or [])]
+    if not all(is_pushdown_column(events, column) for column in columns):
+        return None
+    Avg = AGGREGATION_FUNCTIONS["Avg"]
+    if args.per_group:
+        average = Avg(Cast(F(args.field), FloatField()))
+        if not args.by:
+            return [events.aggregate(**{args.as_field: average})]
+        return events.order_by(*args.by).values(*args.by).annotate(**{args.as_field: average})
+    window = Window(
+        Avg(Cast(F(args.field), FloatField())),
+        partition_by=[F(field) for field in args.by] if args.by else None,
+    )
+    events = events.annotate(_stats_avg=window)
     if args.by:
-        ret = []
-        events.sort(key=itemgetter(*args.by))
-        for key, event_group in groupby(events, key=itemgetter(*args.by)):
-            event_group = list(event_group)
-            average = mean((event.get(args.field) for event in event_group))
-            for event in event_group:
-                ret.append(
-                    {args.as_field: average, **event}
-                )
-        return ret
-    else:
-        average = mean((event.get(args.field) for event in events))
-        return [{args.as_field: average, **event} for event in events]
+        events = events.order_by(*args.by, *events.query.order_by)
+    if not events._fields:
+        events = events.values()
 
+    def _annotated(events):
+        for event in events.iterator(chunk_size=settings.DELVE_STREAMING_CHUNK_SIZE):
+            average = event.pop("_stats_avg")
+            yield {args.as_field: average, **event}
+    return _annotated(events)
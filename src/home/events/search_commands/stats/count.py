@@ -3,17 +3,15 @@
 # See the LICENSE file in the root of this repository for details.
 
 import logging 
-from itertools import groupby
 from operator import itemgetter
-from types import GeneratorType
-import inspect
-from itertools import chain
-import sys
-from io import StringIO
 
-from django.db.models.query import QuerySet
+from django.conf import settings
+from django.db.models import F, Window
 
-from events.util import resolve
+from events.util import iter_events, resolve
+from events.search_commands.util import fieldgetter, is_pushdown_column
+from events.search_commands.qs._util import AGGREGATION_FUNCTIONS
+from ._aggregate import aggregate, decorate, group_rows
 
 def add_count_parser_arguments(count_parser):
     count_parser.add_argument(
@@ -40,82 +38,96 @@ def add_count_parser_arguments(count_parser):
         help="If specified, the average will be stored under the specified key "
              "similar to SQL AS keyword",
     )
+    count_parser.add_argument(
+        "--per-group",
+        action="store_true",
+        help="If specified with --by, return one event per group holding the "
+             "--by fields and the count, instead of every event with the "
+             "count of its group",
+    )
 
-# def resolve_to_list_of_dicts(events):
-#     log = logging.getLogger(__name__)
-#     if isinstance(events, QuerySet):
-#         log.debug(f"Casting matching events, detected {type(events)}")
-#         events = list(events.values())
-#     elif isinstance(events, GeneratorType) or inspect.isgeneratorfunction(events):
-#         log.debug(f"Casting matching events, detected {type(events)}({events})")
-#         log.debug("swapping stdout and stderr")
-#         orig_stderr = sys.stderr
-#         orig_stdout = sys.stdout
-#         sys.stderr = StringIO()
-#         sys.stdout = StringIO()
-#         try:
-#             events = list(events)
-#         except (Exception, SystemExit) as exception:
-#             log.exception(f"Exception raised: {exception}")
-#             raise
-#         finally:
-#             log.debug("replacing original stdout and stderr")
-#             sys.stderr = orig_stderr
-#             sys.stdout = orig_stdout
+def count_function(args):
+    """
+    Return the aggregate function and the value counted for each event.
+    """
+    function = "distinct_count" if args.distinct else "count"
+    if args.field is None:
+        # Events are compared by value, see hashable
+        return function, lambda event: event
+    return function, lambda event: event.get(args.field)
 
-#     if isinstance(events, list):
-#         # keys is a set of all keys from all events in events
-#         log.debug(f"Found events: {events}")
-#         # Peek at the data type of the first item
-#         if events and isinstance(events[0], dict):
-#             keys = set(chain.from_iterable(events))
-#             log.debug(f"Found keys: {keys}")
-#             for event in events:
-#                 # Add None to fill any missing values
-#                 if isinstance(event, dict):
-#                     log.debug(f"Adding missing keys")
-#                     try:
-#                         event.update({key: event.get(key, None) for key in keys})
-#                     except:
-#                         log.exception(f"Found item: {type(event)}({event})")
-#                         raise
-#     return events
+def count(events, args, environment):
+    function, value = count_function(args)
+    field_name = args.field_name if args.field_name else "count"
 
+    if not args.by:
+        groups = aggregate(iter_events(events), None, function, value)
+        if args.per_group:
+            return group_rows(groups, None, field_name)
+        return groups[()][1].result() if groups else 0
+    if args.per_group:
+        groups = aggregate(iter_events(events), args.by, function, value)
+        return group_rows(groups, args.by, field_name)
+    events = resolve(events)
+    groups = aggregate(events, args.by, function, value)
+    key = fieldgetter(*args.by)
+    return decorate(
+        events,
+        groups,
+        args.by,
+        lambda event, count: {
+            "key": key(event),
+            field_name: count,
+            **event,
+        },
+    )
 
-def count(events, args, environment):
+def count_pushdown(events, args, environment):
     log = logging.getLogger(__name__)
-    events = resolve(events)
+    if events.query.is_sliced or events.query.combinator:
+        return None
+    columns = [args.field] if args.field else []
+    columns.extend(args.by or [])
+    if not all(is_pushdown_column(events, column) for column in columns):
+        log.debug(f"Unable to push down count on: {columns}")
+        return None
+    Count = AGGREGATION_FUNCTIONS["Count"]
+    field_name = args.field_name if args.field_name else "count"
 
-    if args.by:
-        ret = []
-        events.sort(key=itemgetter(*args.by))
-        for key, event_group in groupby(events, key=itemgetter(*args.by)):
-            event_group = list(event_group)
+    if args.per_group:
+        if args.field is None and args.distinct:
+            # Distinct events can't be counted in a GROUP BY
+            return None
+        count = Count(args.field or "*", distinct=args.distinct)
+        if not args.by:
+            return [events.aggregate(**{field_name: count})]
+        return events.order_by(*args.by).values(*args.by).annotate(**{field_name: count})
+    if not args.by:
+        if args.field is None:
             if args.distinct:
-                count = len(set(str(i) for i in event_group))
-                for event in event_group:
-                    field_name = args.field_name if args.field_name else "count"
-                    ret.append(
-                        {
-                            "key": key,
-                            field_name: count,
-                            **event,
-                        }
-                    )
-            else:
-                count = len(event_group)
-                for event in event_group:
-                    field_name = args.field_name if args.field_name else "count"
-                    ret.append(
-                        {
-                            "key": key,
-                            field_name: count,
-                            **event,
-                        }
-                    )
-        return ret
-    else:
-        if args.distinct:
-            return len(set(str(e) for e in events))
-        else:
-            return len(events)
+                return events.order_by().distinct().count()
+            return events.count()
+        return events.aggregate(
+            count=Count(args.field, distinct=args.distinct),
+        )["count"]
+    if args.distinct:
+        # Window functions can't count distinct values
+        return None
+    window = Window(
+        Count(args.field or "*"),
+        partition_by=[F(field) for field in args.by],
+    )
+    events = events.annotate(_stats_count=window).order_by(*args.by, *events.query.order_by)
+    if not events._fields:
+        events = events.values()
+
+    def _annotated(events):
+        for event in events.iterator(chunk_size=settings.DELVE_STREAMING_CHUNK_SIZE):
+            count = event.pop("_stats_count")
+            key = itemgetter(*args.by)(event)
+            yield {
+                "key": key,
+                field_name: count,
+                **event,
+            }
+    return _annotated(events)
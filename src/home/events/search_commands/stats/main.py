@@ -6,12 +6,34 @@ import argparse
 
 from .avg import (
     avg,
+    avg_columnar,
+    avg_pushdown,
     add_avg_parser_arguments,
 )
 from .count import (
     count,
+    count_pushdown,
     add_count_parser_arguments
 )
+from .aggregate import (
+    FUNCTIONS,
+    DESCRIPTIONS,
+    compute,
+    compute_columnar,
+    compute_pushdown,
+    add_aggregate_parser_arguments,
+)
+
+from .sketch import (
+    dc,
+    dc_pushdown,
+    add_dc_parser_arguments,
+    percentile,
+    add_percentile_parser_arguments,
+    freq,
+    freq_pushdown,
+    add_freq_parser_arguments,
+)
 
 from events.search_commands.decorators import search_command
 
@@ -35,7 +57,62 @@ count_parser = subcommands.add_parser(
 )
 add_count_parser_arguments(count_parser)
 
-@search_command(parser)
+for function in FUNCTIONS:
+    aggregate_parser = subcommands.add_parser(
+        function,
+        description=f"{DESCRIPTIONS[function]} and store it as an additional "
+                    "field on each event, or on one event per group with --per-group",
+    )
+    add_aggregate_parser_arguments(aggregate_parser, function)
+
+dc_parser = subcommands.add_parser(
+    "dc",
+    description="Estimate the number of distinct values of a field with a "
+                "HyperLogLog, in bounded memory per group",
+)
+add_dc_parser_arguments(dc_parser)
+
+percentile_parser = subcommands.add_parser(
+    "percentile",
+    description="Estimate percentiles of a field with a t-digest, in "
+                "bounded memory per group",
+)
+add_percentile_parser_arguments(percentile_parser)
+
+freq_parser = subcommands.add_parser(
+    "freq",
+    description="Estimate the most frequent values of a field and their "
+                "counts with a count-min sketch, returning one event per value",
+)
+add_freq_parser_arguments(freq_parser)
+
+def pushdown(request, events, argv, environment):
+    if "stats" in argv:
+        argv.pop(argv.index("stats"))
+    args = parser.parse_args(argv)
+    match args.subparser_name:
+        case "avg":
+            return avg_pushdown(events, args, environment)
+        case "count":
+            return count_pushdown(events, args, environment)
+        case function if function in FUNCTIONS:
+            return compute_pushdown(events, args, environment)
+        case "dc":
+            return dc_pushdown(events, args, environment)
+        case "freq":
+            return freq_pushdown(events, args, environment)
+
+def columnar(request, batch, argv, environment):
+    if "stats" in argv:
+        argv.pop(argv.index("stats"))
+    args = parser.parse_args(argv)
+    match args.subparser_name:
+        case "avg":
+            return avg_columnar(batch, args, environment)
+        case function if function in FUNCTIONS:
+            return compute_columnar(batch, args, environment)
+
+@search_command(parser, pushdown=pushdown, columnar=columnar, cacheable=True)
 def stats(request, events, argv, environment):
 
     if "stats" in argv:
@@ -46,4 +123,12 @@ def stats(request, events, argv, environment):
             return avg(events, args, environment)
         case "count":
             return count(events, args, environment)
+        case function if function in FUNCTIONS:
+            return compute(events, args, environment)
+        case "dc":
+            return dc(events, args, environment)
+        case "percentile":
+            return percentile(events, args, environment)
+        case "freq":
+            return freq(events, args, environment)
     
@@ -0,0 +1,171 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+from django.db.models import F
+
+from events.util import iter_events, resolve
+from events.search_commands.util import is_pushdown_column
+from events.search_commands.qs._util import AGGREGATION_FUNCTIONS
+from ._aggregate import aggregate, decorate, group_rows, sorted_groups
+
+def add_sketch_parser_arguments(sketch_parser, function, default_field):
+    sketch_parser.add_argument(
+        "--by",
+        nargs="+",
+        help=f"If specified, the {function} returned will be by the specified fields",
+    )
+    sketch_parser.add_argument(
+        "field",
+        help="The field to aggregate, null or missing values are ignored",
+    )
+    if function != "freq":
+        sketch_parser.add_argument(
+            "--per-group",
+            action="store_true",
+            help=f"If specified, return one event per group holding the --by "
+                 f"fields and the {function}, instead of every event with the "
+                 f"{function} of its group",
+        )
+    if default_field is not None:
+        sketch_parser.add_argument(
+            "--as-field",
+            default=default_field,
+            help=f"If specified, the {function} will be stored as the specified field",
+        )
+
+def add_dc_parser_arguments(dc_parser):
+    add_sketch_parser_arguments(dc_parser, "dc", "dc")
+    dc_parser.add_argument(
+        "--precision",
+        type=int,
+        help="The precision of the HyperLogLog, between 4 and 18. Each group "
+             "uses 2 ** precision bytes, and the relative error is about "
+             "1.04 / sqrt(2 ** precision). (Default: DELVE_HLL_PRECISION)",
+    )
+
+def add_percentile_parser_arguments(percentile_parser):
+    add_sketch_parser_arguments(percentile_parser, "percentile", None)
+    percentile_parser.add_argument(
+        "--percentiles",
+        nargs="+",
+        type=float,
+        default=[50, 95, 99],
+        help="The percentiles to estimate, each is stored as a field named "
+             "p followed by the percentile, ie. p95. (Default: 50 95 99)",
+    )
+    percentile_parser.add_argument(
+        "--compression",
+        type=int,
+        help="The compression of the t-digest, higher is more accurate and "
+             "uses more memory. (Default: DELVE_TDIGEST_COMPRESSION)",
+    )
+
+def add_freq_parser_arguments(freq_parser):
+    add_sketch_parser_arguments(freq_parser, "freq", "count")
+    freq_parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="The number of most frequent values to return (per group). (Default: 10)",
+    )
+    freq_parser.add_argument(
+        "--epsilon",
+        type=float,
+        help="The error of the estimated counts as a fraction of the number "
+             "of events. (Default: DELVE_COUNT_MIN_EPSILON)",
+    )
+    freq_parser.add_argument(
+        "--delta",
+        type=float,
+        help="The probability of an estimate exceeding the error. "
+             "(Default: DELVE_COUNT_MIN_DELTA)",
+    )
+
+def percentile_field(percentile):
+    return f"p{percentile:g}"
+
+def dc(events, args, environment):
+    value = lambda event: event.get(args.field)
+    if args.per_group:
+        groups = aggregate(iter_events(events), args.by, "dc", value, precision=args.precision)
+        return group_rows(groups, args.by, args.as_field)
+    events = resolve(events)
+    groups = aggregate(events, args.by, "dc", value, precision=args.precision)
+    return decorate(
+        events,
+        groups,
+        args.by or [],
+        lambda event, result: {args.as_field: result, **event},
+    )
+
+def percentile(events, args, environment):
+    value = lambda event: event.get(args.field)
+    options = {"percentiles": args.percentiles, "compression": args.compression}
+    row = lambda result: {
+        percentile_field(percentile): estimate for percentile, estimate in result.items()
+    }
+    if args.per_group:
+        groups = aggregate(iter_events(events), args.by, "percentile", value, **options)
+        return [
+            {**dict(zip(args.by or [], values)), **row(state.result())}
+            for _, (values, state) in sorted_groups(groups)
+        ]
+    events = resolve(events)
+    groups = aggregate(events, args.by, "percentile", value, **options)
+    return decorate(
+        events,
+        groups,
+        args.by or [],
+        lambda event, result: {**row(result), **event},
+    )
+
+def freq(events, args, environment):
+    groups = aggregate(
+        iter_events(events),
+        args.by,
+        "freq",
+        lambda event: event.get(args.field),
+        top=args.top,
+        epsilon=args.epsilon,
+        delta=args.delta,
+    )
+    ret = []
+    for _, (values, state) in sorted_groups(groups):
+        for value, count in state.result():
+            ret.append(
+                {**dict(zip(args.by or [], values)), args.field: value, args.as_field: count}
+            )
+    return ret
+
+def dc_pushdown(events, args, environment):
+    """
+    Count the exact number of distinct values with a GROUP BY.
+    """
+    if not args.per_group or events.query.is_sliced or events.query.combinator:
+        return None
+    columns = [args.field, *(args.by or [])]
+    if not all(is_pushdown_column(events, column) for column in columns):
+        return None
+    count = AGGREGATION_FUNCTIONS["Count"](F(args.field), distinct=True)
+    if not args.by:
+        return [events.aggregate(**{args.as_field: count})]
+    return events.order_by(*args.by).values(*args.by).annotate(**{args.as_field: count})
+
+def freq_pushdown(events, args, environment):
+    """
+    Count the exact number of occurrences of the most frequent values
+    with a GROUP BY, when there is no --by.
+    """
+    if args.by or events.query.is_sliced or events.query.combinator:
+        return None
+    if not is_pushdown_column(events, args.field):
+        return None
+    count = AGGREGATION_FUNCTIONS["Count"]("*")
+    return (
+        events.filter(**{f"{args.field}__isnull": False})
+        .order_by()
+        .values(args.field)
+        .annotate(**{args.as_field: count})
+        .order_by(f"-{args.as_field}")[:args.top]
+    )
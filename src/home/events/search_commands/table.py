@@ -45,7 +45,7 @@ parser.add_argument(
     help="The fields to include in the table",
 )
 
-@search_command(parser)
+@search_command(parser, cacheable=True)
 def table(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
     """
     Return the JSON configuration to make a table using datatables.
@@ -70,8 +70,8 @@ def table(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], a
         ]
         columns = fields
     else:
-        # resolve, up above, ensures that the keys are the same for all events
-        columns = events[0].keys()
+        # Events aren't back-filled, so use the keys of every event
+        columns = events.columns
     events = [
         [encode(event.get(column, None)) for column in columns] for event in events
     ]
@@ -31,6 +31,9 @@ class DecoratorsTests(unittest.TestCase):
         # Check if the parser is attached to the decorated function
         self.assertEqual(mock_command.parser, mock_parser)
 
+        # Commands are only cacheable if they say so
+        self.assertFalse(mock_command.cacheable)
+
         # Execute the decorated function and check the result
         result = mock_command(None, [], [], {})
         self.assertEqual(result, "success")
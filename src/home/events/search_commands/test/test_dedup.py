@@ -103,3 +103,68 @@ class DedupTests(APITestCase):
         # that was kept
         self.assertEqual(results[0]["extracted_fields"]["foo"], 0)
 
+
+    def test_dedup_pushed_down_to_database(self):
+        """When the QuerySet is ordered by the dedup fields, dedup
+        is done by the database and keeps the same events.
+        """
+        from events.search_commands import dedup
+
+        for i, event in enumerate(self.events):
+            event.host = f"10.0.0.{i % 3}"
+            event.save()
+        queryset = Event.objects.filter(index="test").order_by("host", "-created")
+        pushed_down = dedup.pushdown(MagicMock(user=self.user), queryset, ["dedup", "host"], {})
+        self.assertIsNotNone(pushed_down)
+        expected = list(dedup(MagicMock(user=self.user), queryset, ["dedup", "host"], {}))
+        self.assertEqual([event["id"] for event in pushed_down.values()], [event["id"] for event in expected])
+        self.assertEqual(len(expected), 3)
+
+        # Without ordering by the dedup fields, duplicates need not be adjacent
+        self.assertIsNone(dedup.pushdown(MagicMock(user=self.user), queryset.order_by("created"), ["dedup", "host"], {}))
+
+    def test_dedup_global(self):
+        """With --global duplicates need not be adjacent, and
+        --keep-last and --count-field work with or without it.
+        """
+        from events.search_commands import dedup
+
+        events = [{"host": host, "n": i} for i, host in enumerate("abacbba")]
+        run = lambda *argv: list(dedup(MagicMock(user=self.user), list(events), ["dedup", *argv], {}))
+        self.assertEqual([event["n"] for event in run("host")], [0, 1, 2, 3, 4, 6])
+        self.assertEqual([event["n"] for event in run("host", "--global")], [0, 1, 3])
+        self.assertEqual([event["n"] for event in run("host", "--bloom")], [0, 1, 3])
+        self.assertEqual([event["n"] for event in run("host", "--global", "--keep-last")], [3, 5, 6])
+        self.assertEqual(
+            [(event["n"], event["dups"]) for event in run("host", "--global", "--count-field", "dups")],
+            [(0, 3), (1, 3), (3, 1)],
+        )
+        self.assertEqual(
+            [(event["n"], event["dups"]) for event in run("host", "--keep-last", "--count-field", "dups")],
+            [(0, 1), (1, 1), (2, 1), (3, 1), (5, 2), (6, 1)],
+        )
+        # Without fields whole events are compared, whatever the order of their keys
+        repeated = [{"a": 1, "b": 2}, {"b": 2, "a": 1}, {"a": 1, "b": 3}, {"a": 1, "b": 2}]
+        for argv in (["--global"], ["--bloom"]):
+            results = list(dedup(MagicMock(user=self.user), repeated, ["dedup", *argv], {}))
+            self.assertEqual(results, [{"a": 1, "b": 2}, {"a": 1, "b": 3}])
+        with self.assertRaises(ValueError):
+            run("host", "--bloom", "--keep-last")
+
+    def test_dedup_global_pushed_down_to_database(self):
+        """With --global, dedup is done by the database whatever the
+        ordering of the QuerySet and keeps the same events.
+        """
+        from events.search_commands import dedup
+
+        for i, event in enumerate(self.events):
+            event.host = f"10.0.0.{i % 3}"
+            event.save()
+        queryset = Event.objects.filter(index="test").order_by("created")
+        for argv in (["host", "--global"], ["host", "--global", "--keep-last"], ["host", "--bloom"]):
+            pushed_down = dedup.pushdown(MagicMock(user=self.user), queryset, ["dedup", *argv], {})
+            self.assertIsNotNone(pushed_down, argv)
+            expected = list(dedup(MagicMock(user=self.user), queryset, ["dedup", *argv], {}))
+            self.assertEqual([event["id"] for event in pushed_down.values()], [event["id"] for event in expected], argv)
+            self.assertEqual(len(expected), 3, argv)
+        self.assertIsNone(dedup.pushdown(MagicMock(user=self.user), queryset, ["dedup", "host", "--global", "--count-field", "count"], {}))
@@ -106,3 +106,19 @@ class DeleteTests(APITestCase):
         self.assertEqual(len(results[0]['extracted_fields__foo']), 10)
         self.assertEqual(len(results[0]['index']), 1)
         
+
+    def test_distinct_pushed_down_to_database(self):
+        """Assert that distinct on a QuerySet selects the distinct values
+        with the database.
+        """
+        from events.search_commands import distinct
+
+        queryset = Event.objects.filter(index="test")
+        argv = ["distinct", "host", "extracted_fields__foo"]
+        pushed_down = distinct.pushdown(MagicMock(user=self.user), queryset, list(argv), {})
+        expected = distinct(MagicMock(user=self.user), queryset, list(argv), {})
+        self.assertEqual(
+            {key: sorted(value) for key, value in pushed_down[0].items()},
+            {key: sorted(value) for key, value in expected[0].items()},
+        )
+        self.assertEqual(sorted(pushed_down[0]["extracted_fields__foo"]), list(range(10)))
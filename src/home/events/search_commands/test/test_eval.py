@@ -103,3 +103,12 @@ class EvalTests(APITestCase):
         )
         self.assertEqual(len(results), 10)
         self.assertEqual(results[0]["test_field"], "json")
+
+    def test_eval_missing_field_is_none(self) -> None:
+        """Test that dollar sign substitution of a field an event doesn't
+        have gives None, not the literal expression."""
+        from events.search_commands import eval
+
+        events = [{"foo": 1}, {"bar": 2}]
+        results = list(eval(MagicMock(user=self.user), iter(events), ["eval", "baz=$foo"], {}))
+        self.assertEqual([result["baz"] for result in results], [1, None])
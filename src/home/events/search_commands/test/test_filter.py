@@ -12,6 +12,7 @@ from typing import Any
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db.models.query import QuerySet
 
 from rest_framework import status
 from rest_framework.authtoken.models import Token
@@ -88,3 +89,114 @@ class FilterTests(APITestCase):
             request=MagicMock(user=self.user),
         )
         self.assertEqual(len(results), 5)
+
+    def test_filter_pushed_down_to_database(self) -> None:
+        """Assert that filter terms which can be evaluated by the database
+        are added to the QuerySet and give the same events as filtering
+        in Python.
+        """
+        from events.search_commands import filter
+
+        queryset = Event.objects.filter(index="test")
+        for term in ["extracted_fields__foo__gte=5", "extracted_fields__foo__in=[1,2,3]", "!host=127.0.0.2"]:
+            pushed_down = filter.pushdown(MagicMock(user=self.user), queryset, ["filter", term], {})
+            self.assertIsInstance(pushed_down, QuerySet)
+            expected = list(filter(MagicMock(user=self.user), queryset, ["filter", term], {}))
+            self.assertEqual(
+                sorted(event["id"] for event in pushed_down.values()),
+                sorted(event["id"] for event in expected),
+            )
+
+    def test_filter_falls_back_to_python(self) -> None:
+        """Assert that terms which would behave differently in the database
+        are left for filter to evaluate in Python.
+        """
+        from events.search_commands import filter
+
+        queryset = Event.objects.filter(index="test")
+        for term in ["!extracted_fields__foo=5", "extracted_fields__foo__contains=1", "extracted_fields__foo=None", "user__username=testuser"]:
+            self.assertIsNone(filter.pushdown(MagicMock(user=self.user), queryset, ["filter", term], {}))
+        self.assertIsNone(filter.pushdown(MagicMock(user=self.user), queryset[:5], ["filter", "host=127.0.0.1"], {}))
+
+        query = Query(
+            name="test",
+            text="search index=test | filter !extracted_fields__foo__gte=5",
+            user=self.user,
+        )
+        results = query.resolve(request=MagicMock(user=self.user))
+        self.assertEqual(len(results), 5)
+
+    def test_filter_pushdown_matches_python_types(self) -> None:
+        """Assert that a term whose value the database would convert to
+        the type of the field is evaluated in Python, with the same result.
+        """
+        from events.search_commands import filter
+
+        Event.objects.create(index="test", source="123", user=self.user, text="numeric source")
+        queryset = Event.objects.filter(index="test")
+        for term in ["source=123", "source__gt=5", "source__in=[123]", "host=1.5"]:
+            self.assertIsNone(filter.pushdown(MagicMock(user=self.user), queryset, ["filter", term], {}), term)
+        for term in ["source=test", "source__in=['123']"]:
+            self.assertIsNotNone(filter.pushdown(MagicMock(user=self.user), queryset, ["filter", term], {}), term)
+        for term in ["source=123", "source=test"]:
+            query = Query(name="test", text=f"search index=test | filter {term}", user=self.user)
+            pushed_down = query.resolve(request=MagicMock(user=self.user))
+            in_python = list(filter(MagicMock(user=self.user), list(queryset.values()), ["filter", term], {}))
+            self.assertEqual(
+                sorted(str(event["id"]) for event in pushed_down),
+                sorted(str(event["id"]) for event in in_python),
+                term,
+            )
+
+    def test_filter_groups_terms(self) -> None:
+        """Assert that terms can be combined with AND, OR and NOT and
+        grouped with parentheses, with the same events in the database
+        and in Python.
+        """
+        from events.search_commands import filter
+
+        queryset = Event.objects.filter(index="test")
+        for terms, expected in [
+            (["extracted_fields__foo__lt=2", "OR", "extracted_fields__foo__gte=8"], [0, 1, 8, 9]),
+            (["extracted_fields__foo__gte=2", "AND", "extracted_fields__foo__lt=4"], [2, 3]),
+            (["extracted_fields__foo__gte=2", "extracted_fields__foo__lt=4"], [2, 3]),
+            (["NOT", "(", "extracted_fields__foo__gte=2", "extracted_fields__foo__lt=9", ")"], [0, 1, 9]),
+            (["(", "extracted_fields__foo=1", "OR", "extracted_fields__foo=3", ")", "host=127.0.0.1"], [1, 3]),
+            (["extracted_fields__foo=1", "OR", "extracted_fields__foo=3", "host=127.0.0.2"], [1]),
+            (["host=127.0.0.2", "OR", "NOT", "NOT", "extracted_fields__foo__in=[4,5]"], [4, 5]),
+        ]:
+            results = list(filter(MagicMock(user=self.user), queryset, ["filter", *terms], {}))
+            self.assertEqual(sorted(event["extracted_fields"]["foo"] for event in results), expected, terms)
+            pushed_down = filter.pushdown(MagicMock(user=self.user), queryset, ["filter", *terms], {})
+            if pushed_down is not None:
+                self.assertEqual(sorted(event.extracted_fields["foo"] for event in pushed_down), expected, terms)
+        # Negating a key transform inside NOT ( ... ) is left to Python
+        self.assertIsNone(filter.pushdown(MagicMock(user=self.user), queryset, ["filter", "NOT", "(", "extracted_fields__foo=1", ")"], {}))
+        self.assertIsNotNone(filter.pushdown(MagicMock(user=self.user), queryset, ["filter", "NOT", "(", "!extracted_fields__foo=1", ")"], {}))
+
+        for terms in [["(", "host=127.0.0.1"], ["host=127.0.0.1", "OR"], ["host"], ["NOT"], [")"]]:
+            with self.assertRaises(ValueError):
+                filter(MagicMock(user=self.user), queryset, ["filter", *terms], {})
+
+    def test_filter_compiled_lookups(self) -> None:
+        """Assert that each compiled lookup gives the same result as
+        the lookup it replaces.
+        """
+        from events.search_commands.filter import compiled_lookups, lookup_map
+
+        cases = {
+            "exact": ("a", "a"), "iexact": ("A", "a"), "contains": ("abc", "b"),
+            "icontains": ("ABC", "b"), "in": (1, [1, 2]), "gt": (2, 1), "gte": (1, 1),
+            "lt": (2, 1), "lte": (1, 2), "ne": (1, 2), "eq": (1, 1),
+            "startswith": ("abc", "a"), "istartswith": ("ABC", "a"),
+            "endswith": ("abc", "c"), "iendswith": ("ABC", "c"),
+            "isnull": (None, True), "regex": ("a1", r"\d"), "iregex": ("A", "a"),
+        }
+        self.assertEqual(set(cases), set(lookup_map))
+        for lookup, (lhs, rhs) in cases.items():
+            for value in (lhs, "zzz" if isinstance(lhs, str) else 0):
+                self.assertEqual(
+                    bool(compiled_lookups[lookup](rhs)(value)),
+                    bool(lookup_map[lookup](value, rhs)),
+                    (lookup, value, rhs),
+                )
@@ -89,3 +89,48 @@ class HeadTests(APITestCase):
             request=MagicMock(user=self.user),
         )
         self.assertEqual(len(results), 5)
+
+    def test_head_stops_consuming_upstream(self) -> None:
+        """Assert that head stops pulling events from the previous
+        search command once it has the requested number of events.
+        """
+        from events.search_commands import head
+
+        consumed = []
+        def upstream():
+            for i in range(1000):
+                consumed.append(i)
+                yield {"foo": i}
+
+        results = list(
+            head(MagicMock(user=self.user), upstream(), ["head", "-n", "5"], {})
+        )
+        self.assertEqual([result["foo"] for result in results], list(range(5)))
+        self.assertEqual(len(consumed), 5)
+
+    def test_head_pushed_down_to_database(self) -> None:
+        """Assert that head on a QuerySet adds a LIMIT instead of
+        reading the rows.
+        """
+        from events.search_commands import head
+
+        queryset = Event.objects.filter(index="test")
+        pushed_down = head.pushdown(MagicMock(user=self.user), queryset, ["head", "-n", "3"], {})
+        self.assertTrue(pushed_down.query.is_sliced)
+        self.assertEqual(len(pushed_down), 3)
+
+    def test_head_negative_number(self) -> None:
+        """Assert that a negative number returns every event but the
+        last n, and isn't pushed down.
+        """
+        from events.search_commands import head
+
+        query = Query(
+            name="test",
+            text="search index=test --order-by extracted_fields__foo | head -n -3",
+            user=self.user,
+        )
+        results = query.resolve(request=MagicMock(user=self.user))
+        self.assertEqual([result["extracted_fields"]["foo"] for result in results], list(range(7)))
+        queryset = Event.objects.filter(index="test")
+        self.assertIsNone(head.pushdown(MagicMock(user=self.user), queryset, ["head", "-n", "-3"], {}))
@@ -12,6 +12,9 @@ from typing import Any
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.authtoken.models import Token
@@ -92,3 +95,91 @@ class JoinTests(APITestCase):
         # single value, the result effectively squares the
         # number of events
         self.assertEqual(len(results), 100)
+
+    def join(self, text: str, events: list) -> list:
+        return Query(text=text).resolve(
+            request=MagicMock(user=self.user),
+            events=events,
+        )
+
+    def create_other_event(self) -> Event:
+        return Event.objects.create(
+            index="other",
+            host="127.0.0.1",
+            source="test",
+            sourcetype="json",
+            user=self.user,
+            text=json.dumps({"foo": "other"}),
+        )
+
+    def test_join_left_keeps_unmatched(self) -> None:
+        results = self.join(
+            "join --fields idx,index",
+            [{"idx": "test"}, {"idx": "missing"}],
+        )
+        self.assertEqual(len(results), 11)
+        self.assertEqual(
+            sorted(result["extracted_fields"]["foo"] for result in results[:10]),
+            list(range(10)),
+        )
+        self.assertEqual(results[10]["idx"], "missing")
+        self.assertIsNone(results[10]["host"])
+        # The right join field is not copied
+        self.assertNotIn("index", results[0])
+
+    def test_join_inner(self) -> None:
+        self.create_other_event()
+        results = self.join(
+            "join --type inner --fields idx,index",
+            [{"idx": "test"}, {"idx": "missing"}],
+        )
+        self.assertEqual(len(results), 10)
+        for result in results:
+            self.assertEqual(result["idx"], "test")
+
+    def test_join_right(self) -> None:
+        self.create_other_event()
+        results = self.join(
+            "join --type right --fields idx,index",
+            [{"idx": "test", "bar": 1}],
+        )
+        self.assertEqual(len(results), 11)
+        self.assertEqual(
+            sorted((result["index"], result["bar"]) for result in results),
+            [("other", None)] + [("test", 1)] * 10,
+        )
+
+    def test_join_full(self) -> None:
+        self.create_other_event()
+        results = self.join(
+            "join --type full --fields idx,index",
+            [{"idx": "test"}, {"idx": "missing"}],
+        )
+        self.assertEqual(len(results), 12)
+        self.assertEqual(results[10]["idx"], "missing")
+        self.assertEqual(results[11]["index"], "other")
+        self.assertIsNone(results[11]["idx"])
+
+    def test_join_multiple_fields(self) -> None:
+        results = self.join(
+            "join --type inner --fields idx,index --fields address,host",
+            [
+                {"idx": "test", "address": "127.0.0.1"},
+                {"idx": "test", "address": "10.0.0.1"},
+            ],
+        )
+        self.assertEqual(len(results), 10)
+        for result in results:
+            self.assertEqual(result["address"], "127.0.0.1")
+
+    @override_settings(DELVE_JOIN_CHUNK_SIZE=1)
+    def test_join_pushes_down_keys_in_chunks(self) -> None:
+        self.create_other_event()
+        with CaptureQueriesContext(connection) as queries:
+            results = self.join(
+                "join --type inner --fields idx,index",
+                [{"idx": "test"}, {"idx": "other"}, {"idx": "missing"}],
+            )
+        self.assertEqual(len(results), 11)
+        pushed_down = [query for query in queries if '"index" IN' in query["sql"]]
+        self.assertEqual(len(pushed_down), 3)
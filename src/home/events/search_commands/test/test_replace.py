@@ -78,3 +78,12 @@ class ReplaceTests(APITestCase):
         )
         self.assertEqual(len(results), 10)
         self.assertTrue(all(result['foo'].startswith('bar_') for result in results))
+
+    def test_replace_missing_field(self) -> None:
+        """Test that events without the field are passed through."""
+        from events.search_commands import replace
+
+        events = [{"foo": "foo_1"}, {"bar": "foo_2"}]
+        results = list(replace(MagicMock(user=self.user), iter(events), ["replace", "-f", "foo", "foo_", "bar_"], {}))
+        self.assertEqual([result.get("foo") for result in results], ["bar_1", None])
+        self.assertEqual(results[1]["bar"], "foo_2")
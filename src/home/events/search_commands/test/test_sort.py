@@ -6,12 +6,14 @@
 command, located at events.search_commands.sort.
 """
 import json
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 from typing import Any
 
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.conf import settings
+from django.db.models import Case, IntegerField, Value, When
+from django.test import override_settings
 
 from rest_framework import status
 from rest_framework.authtoken.models import Token
@@ -78,3 +80,80 @@ class SortTests(APITestCase):
         )
         self.assertEqual(len(results), 10)
         self.assertEqual([result['foo'] for result in results], list(range(10)))
+
+    def test_sort_pushed_down_to_database(self) -> None:
+        """Assert that sorting a QuerySet by fields adds an ORDER BY,
+        but not for values in JSON, which the database orders differently.
+        """
+        from events.search_commands import sort
+
+        queryset = Event.objects.filter(index="test")
+        pushed_down = sort.pushdown(MagicMock(user=self.user), queryset, ["sort", "-d", "id"], {})
+        self.assertEqual(
+            [event.id for event in pushed_down],
+            sorted((event.id for event in self.events), reverse=True),
+        )
+        self.assertIsNone(sort.pushdown(MagicMock(user=self.user), queryset, ["sort", "extracted_fields__foo"], {}))
+        self.assertIsNone(sort.pushdown(MagicMock(user=self.user), queryset, ["sort", "extracted_fields"], {}))
+
+    def test_sort_pushdown_orders_none_like_python(self) -> None:
+        """Assert that NULLs are ordered as sort orders None, first,
+        or last when descending.
+        """
+        from events.search_commands import sort
+
+        queryset = Event.objects.filter(index="test").annotate(
+            maybe=Case(
+                *[When(pk=event.pk, then=Value(i)) for i, event in enumerate(self.events[:5])],
+                default=None,
+                output_field=IntegerField(),
+            )
+        ).values("maybe")
+        for argv in (["sort", "maybe"], ["sort", "-d", "maybe"]):
+            pushed_down = sort.pushdown(MagicMock(user=self.user), queryset, list(argv), {})
+            self.assertIn("NULLS", str(pushed_down.query))
+            results = Query(text=" ".join(argv)).resolve(
+                request=MagicMock(user=self.user),
+                events=list(queryset),
+            )
+            self.assertEqual([event["maybe"] for event in pushed_down], [event["maybe"] for event in results])
+
+    def test_sort_missing_and_mixed_values(self) -> None:
+        """Events missing the field, or with values of different
+        types, are sorted instead of raising a TypeError.
+        """
+        events = [{"foo": "b"}, {"foo": 2}, {}, {"foo": None}, {"foo": 1.5}, {"foo": "a"}]
+        results = Query(text="sort foo").resolve(
+            request=MagicMock(user=self.user),
+            events=events,
+        )
+        self.assertEqual([result["foo"] for result in results], [None, None, 1.5, 2, "a", "b"])
+
+    def test_sort_followed_by_head_keeps_top(self) -> None:
+        """Assert that sort only keeps the events head returns when
+        it is directly followed by head.
+        """
+        events = [{"foo": i % 7, "bar": i} for i in range(50)]
+        with patch("events.search_commands.sort.sort_events") as sort_events:
+            results = Query(text="sort -d foo | head -n 3").resolve(
+                request=MagicMock(user=self.user),
+                events=events,
+            )
+        sort_events.assert_not_called()
+        # Ties keep their original order, as with sorted()
+        self.assertEqual(results, sorted(events, key=lambda event: event["foo"], reverse=True)[:3])
+
+    @override_settings(DELVE_SORT_BUFFER_SIZE=4)
+    def test_sort_spills_to_disk(self) -> None:
+        """Assert that result sets larger than DELVE_SORT_BUFFER_SIZE
+        are sorted the same as in memory.
+        """
+        query = Query(
+            name="test",
+            text="search index=test | explode extracted_fields | sort -d foo",
+            user=self.user,
+        )
+        results = query.resolve(
+            request=MagicMock(user=self.user),
+        )
+        self.assertEqual([result['foo'] for result in results], list(range(9, -1, -1)))
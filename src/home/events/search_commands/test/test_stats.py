@@ -0,0 +1,248 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the stats search
+command, located at events.search_commands.stats.
+"""
+import json
+import statistics
+from operator import itemgetter
+from unittest.mock import MagicMock
+from typing import Any
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db.models.fields.json import KT
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import (
+    APITestCase,
+    APIRequestFactory,
+    APIClient,
+)
+
+from events.models import (
+    Event,
+    Query,
+)
+from events.util import resolve
+
+TEST_USER = "testuser"
+TEST_USER_PASS = "testuser"
+TEST_ADMIN = "testadmin"
+TEST_ADMIN_PASS = "testadmin"
+
+class StatsTests(APITestCase):
+    def setUp(self, *args: Any, **kwargs: Any) -> None:
+        """For preparation, we are going to setup a user and
+        an APIClient and add ten Events.
+        """
+        self.factory = APIRequestFactory()
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+        self.user.save()
+        self.events = []
+        for i in range(10):
+            event = Event.objects.create(
+                index="test",
+                host=f"10.0.0.{i % 3}",
+                source="test",
+                sourcetype="json",
+                user=self.user,
+                text=json.dumps(
+                    {
+                        "foo": i,
+                    }
+                )
+            )
+            event.extract_fields()
+            event.process()
+            event.save()
+            self.events.append(event)
+        super().setUp(*args, **kwargs)
+
+
+    def test_stats_count(self) -> None:
+        """Test that stats count returns the number of events,
+        or the number of (distinct) non-null values of a field.
+        """
+        for text, expected in [
+            ("search index=test | stats count", 10),
+            ("search index=test | stats count host", 10),
+            ("search index=test | stats count host --distinct", 3),
+            ("search index=test | select host | stats count --distinct", 3),
+        ]:
+            query = Query(name="test", text=text, user=self.user)
+            results = query.resolve(request=MagicMock(user=self.user))
+            self.assertEqual(results, expected, text)
+
+    def test_stats_pushed_down_to_database(self) -> None:
+        """Assert that stats on a QuerySet is computed by the database
+        with the same result as computing it in Python.
+        """
+        from events.search_commands import stats
+
+        queryset = Event.objects.filter(index="test").order_by("id")
+        for argv in [
+            ["stats", "count"],
+            ["stats", "count", "host", "--distinct"],
+            ["stats", "count", "--by", "host"],
+            ["stats", "count", "--by", "host", "source", "--field-name", "total"],
+            ["stats", "avg", "--by", "host", "--as-field", "average", "created"],
+        ]:
+            if argv[1] == "avg":
+                # avg needs a numeric field, so select one with the database
+                queryset = Event.objects.filter(index="test").values("id", "host", foo=KT("extracted_fields__foo"))
+                argv = [*argv[:-1], "foo"]
+            pushed_down = stats.pushdown(MagicMock(user=self.user), queryset, list(argv), {})
+            self.assertIsNotNone(pushed_down, argv)
+            expected = stats(MagicMock(user=self.user), queryset, list(argv), {})
+            if isinstance(expected, int):
+                self.assertEqual(pushed_down, expected, argv)
+                continue
+            pushed_down = sorted(resolve(pushed_down), key=itemgetter("id"))
+            expected = sorted(expected, key=itemgetter("id"))
+            if argv[1] == "avg":
+                for event in pushed_down + expected:
+                    event["average"] = round(float(event["average"]), 6)
+            self.assertEqual(pushed_down, expected, argv)
+
+    def test_stats_falls_back_to_python(self) -> None:
+        """Assert that stats is computed in Python when the database
+        can't give the same result.
+        """
+        from events.search_commands import stats
+
+        queryset = Event.objects.filter(index="test")
+        for argv in [
+            ["stats", "count", "--by", "host", "--distinct"],
+            ["stats", "count", "extracted_fields__foo"],
+            ["stats", "avg", "extracted_fields__foo", "--by", "user"],
+        ]:
+            self.assertIsNone(stats.pushdown(MagicMock(user=self.user), queryset, list(argv), {}), argv)
+        self.assertIsNone(stats.pushdown(MagicMock(user=self.user), queryset[:5], ["stats", "count"], {}))
+
+    def test_stats_per_group(self) -> None:
+        """Test that the aggregate subcommands return one event per
+        group with --per-group.
+        """
+        hosts = ["10.0.0.0", "10.0.0.1", "10.0.0.2"]
+        for subcommand, expected in [
+            ("count", [4, 3, 3]),
+            ("count foo --distinct", [4, 3, 3]),
+            ("sum foo", [18, 12, 15]),
+            ("min foo", [0, 1, 2]),
+            ("max foo", [9, 7, 8]),
+            ("avg foo", [4.5, 4, 5]),
+            ("stdev foo", [statistics.stdev([0, 3, 6, 9]), 3, 3]),
+            ("distinct_count foo", [4, 3, 3]),
+        ]:
+            name = subcommand.split()[0]
+            field = "count" if name == "count" else name
+            text = f"search index=test | explode extracted_fields | stats {subcommand} --by host --per-group"
+            query = Query(name="test", text=text, user=self.user)
+            results = query.resolve(request=MagicMock(user=self.user))
+            self.assertEqual([result["host"] for result in results], hosts, text)
+            for result, value in zip(results, expected):
+                self.assertEqual(set(result), {"host", field}, text)
+                self.assertAlmostEqual(result[field], value, msg=text)
+
+    def test_stats_decorates_events(self) -> None:
+        """Test that without --per-group every event is returned with
+        the aggregate of its group, grouped by the --by fields.
+        """
+        text = "search index=test | explode extracted_fields | stats max foo --by host --as-field highest"
+        query = Query(name="test", text=text, user=self.user)
+        results = query.resolve(request=MagicMock(user=self.user))
+        self.assertEqual(len(results), 10)
+        self.assertEqual(
+            [(result["host"], result["highest"]) for result in results],
+            [("10.0.0.0", 9)] * 4 + [("10.0.0.1", 7)] * 3 + [("10.0.0.2", 8)] * 3,
+        )
+        # Events missing the field are ignored
+        events = [{"foo": 1}, {"foo": None}, {"bar": 2}, {"foo": 3}]
+        results = Query(text="stats sum foo").resolve(request=MagicMock(user=self.user), events=events)
+        self.assertEqual([result["sum"] for result in results], [4] * 4)
+
+    def test_stats_per_group_pushed_down_to_database(self) -> None:
+        """Assert that stats --per-group on a QuerySet is computed with a
+        GROUP BY, with the same result as computing it in Python.
+        """
+        from events.search_commands import stats
+
+        queryset = Event.objects.filter(index="test").values("id", "host", foo=KT("extracted_fields__foo"))
+        for argv in [
+            ["stats", "count", "--by", "host", "--per-group"],
+            ["stats", "count", "foo", "--distinct", "--by", "host", "--per-group"],
+            ["stats", "sum", "foo", "--by", "host", "--per-group"],
+            ["stats", "avg", "foo", "--by", "host", "--per-group"],
+            ["stats", "stdev", "foo", "--by", "host", "--per-group"],
+            ["stats", "stdev", "foo", "--per-group"],
+            ["stats", "sum", "foo", "--by", "host"],
+        ]:
+            pushed_down = stats.pushdown(MagicMock(user=self.user), queryset, list(argv), {})
+            self.assertIsNotNone(pushed_down, argv)
+            # KT returns text, so compare with the numbers the database summed
+            events = [{**event, "foo": int(event["foo"])} for event in queryset]
+            expected = stats(MagicMock(user=self.user), events, list(argv), {})
+            pushed_down = resolve(pushed_down)
+            if "--per-group" not in argv:
+                pushed_down = sorted(pushed_down, key=itemgetter("id"))
+                expected = sorted(expected, key=itemgetter("id"))
+                for event in pushed_down:
+                    event["foo"] = int(event["foo"])
+            self.assertEqual(len(pushed_down), len(expected), argv)
+            for pushed_down_event, expected_event in zip(pushed_down, expected):
+                self.assertEqual(set(pushed_down_event), set(expected_event), argv)
+                for key, value in expected_event.items():
+                    if isinstance(value, float):
+                        self.assertAlmostEqual(pushed_down_event[key], value, msg=argv)
+                    else:
+                        self.assertEqual(pushed_down_event[key], value, argv)
+
+    def test_stats_sketches(self) -> None:
+        """Test the approximate aggregates, which are exact for
+        small numbers of values.
+        """
+        text = "search index=test | explode extracted_fields | stats dc foo --by host --per-group"
+        results = Query(name="test", text=text, user=self.user).resolve(request=MagicMock(user=self.user))
+        self.assertEqual([(result["host"], result["dc"]) for result in results], [("10.0.0.0", 4), ("10.0.0.1", 3), ("10.0.0.2", 3)])
+
+        text = "search index=test | explode extracted_fields | stats percentile foo --percentiles 0 50 100 --per-group"
+        results = Query(name="test", text=text, user=self.user).resolve(request=MagicMock(user=self.user))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(set(results[0]), {"p0", "p50", "p100"})
+        self.assertEqual(results[0]["p0"], 0)
+        self.assertAlmostEqual(results[0]["p50"], 4.5, delta=0.5)
+        self.assertEqual(results[0]["p100"], 9)
+
+        events = [{"path": path} for path in ["/a"] * 5 + ["/b"] * 3 + ["/c"] + [None] * 10]
+        results = Query(text="stats freq path --top 2").resolve(request=MagicMock(user=self.user), events=events)
+        self.assertEqual(results, [{"path": "/a", "count": 5}, {"path": "/b", "count": 3}])
+
+    def test_stats_count_distinct_events(self) -> None:
+        """Test that count --distinct without a field compares events
+        by value, regardless of the order of their keys.
+        """
+        events = [{"a": 1, "b": 2}, {"b": 2, "a": 1}, {"a": 1, "b": 3}]
+        results = Query(text="stats count --distinct").resolve(request=MagicMock(user=self.user), events=events)
+        self.assertEqual(results, 2)
+
+    def test_stats_sketches_pushed_down_to_database(self) -> None:
+        """Assert that dc and freq on a QuerySet are computed exactly by
+        the database.
+        """
+        from events.search_commands import stats
+
+        queryset = Event.objects.filter(index="test")
+        pushed_down = stats.pushdown(MagicMock(user=self.user), queryset, ["stats", "dc", "host", "--per-group"], {})
+        self.assertEqual(pushed_down, [{"dc": 3}])
+        pushed_down = stats.pushdown(MagicMock(user=self.user), queryset, ["stats", "freq", "host", "--top", "1"], {})
+        self.assertEqual(list(pushed_down), [{"host": "10.0.0.0", "count": 4}])
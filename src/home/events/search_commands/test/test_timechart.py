@@ -0,0 +1,149 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the timechart search
+command, located at events.search_commands.timechart.
+"""
+import json
+import datetime
+from unittest.mock import MagicMock
+from typing import Any
+
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from rest_framework.test import APITestCase
+
+from events.models import (
+    Event,
+    Query,
+)
+from events.search_commands.timechart import lttb, min_max
+
+START = datetime.datetime(2025, 1, 1, 23, 0, tzinfo=datetime.timezone.utc)
+
+class TimechartTests(APITestCase):
+    def setUp(self, *args: Any, **kwargs: Any) -> None:
+        """For preparation, we are going to setup a user and add
+        twelve Events, two minutes apart starting at 23:00 UTC, from
+        hosts a and b in turn.
+        """
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+        for i in range(12):
+            event = Event.objects.create(
+                index="test",
+                host="ab"[i % 2],
+                sourcetype="json",
+                user=self.user,
+                text=json.dumps({"foo": i}),
+            )
+            Event.objects.filter(pk=event.pk).update(created=START + datetime.timedelta(minutes=2 * i))
+        super().setUp(*args, **kwargs)
+
+    def resolve(self, text: str, events: Any = None) -> Any:
+        return Query(text=text).resolve(request=MagicMock(user=self.user), events=events)
+
+    def points(self, dataset: Any, y_field: str = "count") -> Any:
+        return [(point["time"].strftime("%H:%M"), point[y_field]) for point in dataset["data"]]
+
+    def test_count(self) -> None:
+        for text in [
+            "search index=test | timechart --span 10m",
+            # Not pushed down
+            "search index=test | explode extracted_fields | timechart --span 10m",
+        ]:
+            results = self.resolve(text)
+            self.assertEqual(results["visualization"], "chartjs", text)
+            self.assertEqual(results["options"]["scales"]["x"]["time"]["unit"], "minute", text)
+            datasets = results["data"]["datasets"]
+            self.assertEqual(len(datasets), 1, text)
+            self.assertEqual(
+                self.points(datasets[0]),
+                [("23:00", 5), ("23:10", 5), ("23:20", 2)],
+                text,
+            )
+
+    def test_by(self) -> None:
+        for text in [
+            "search index=test | timechart --span 1h --by host",
+            "search index=test | explode extracted_fields | timechart --span 1h --by host",
+        ]:
+            datasets = self.resolve(text)["data"]["datasets"]
+            self.assertEqual([dataset["label"] for dataset in datasets], ["a", "b"], text)
+            self.assertEqual(self.points(datasets[0]), [("23:00", 6)], text)
+
+    def test_aggregate(self) -> None:
+        results = self.resolve("search index=test | explode extracted_fields | timechart --span 10m --function avg foo")
+        self.assertEqual(results["options"]["parsing"]["yAxisKey"], "avg")
+        self.assertEqual(
+            self.points(results["data"]["datasets"][0], "avg"),
+            [("23:00", 2), ("23:10", 7), ("23:20", 10.5)],
+        )
+        results = self.resolve("search index=test | explode extracted_fields | timechart --span 10m --function max foo")
+        self.assertEqual(
+            self.points(results["data"]["datasets"][0], "max"),
+            [("23:00", 4), ("23:10", 9), ("23:20", 11)],
+        )
+        results = self.resolve("search index=test | timechart --function sum")
+        self.assertIn("A field is required", results[0]["exception"])
+
+    def test_aggregate_non_numeric(self) -> None:
+        """The min or max of strings is charted without downsampling,
+        their sum or avg is an error.
+        """
+        events = [
+            {"created": START + datetime.timedelta(minutes=i), "foo": f"value-{i:02}"}
+            for i in range(20)
+        ]
+        data = self.resolve("timechart --span 1m --max-points 4 --function max foo", events)["data"]["datasets"][0]["data"]
+        self.assertEqual([point["max"] for point in data], [event["foo"] for event in events])
+        data = self.resolve("timechart --span 1m --max-points 4 --downsample minmax --function min foo", events)["data"]["datasets"][0]["data"]
+        self.assertEqual(len(data), 20)
+        results = self.resolve("timechart --span 1m --function sum foo", events)
+        self.assertIn("is not a number", results[0]["exception"])
+
+    @override_settings(TIME_ZONE="America/New_York")
+    def test_time_zone(self) -> None:
+        """Day buckets start at midnight of the current time zone,
+        in the database and in Python alike.
+        """
+        for text in [
+            "search index=test | timechart --span 1d",
+            "search index=test | explode extracted_fields | timechart --span 1d",
+        ]:
+            data = self.resolve(text)["data"]["datasets"][0]["data"]
+            self.assertEqual(len(data), 1, text)
+            self.assertEqual(data[0]["time"], datetime.datetime(2025, 1, 1, 5, tzinfo=datetime.timezone.utc), text)
+            self.assertEqual(data[0]["count"], 12, text)
+
+    def test_max_points(self) -> None:
+        for text in [
+            "search index=test | timechart --span 2m --max-points 4",
+            "search index=test | timechart --span 2m --max-points 4 --downsample minmax",
+        ]:
+            data = self.resolve(text)["data"]["datasets"][0]["data"]
+            self.assertLessEqual(len(data), 4, text)
+        data = self.resolve("search index=test | timechart --span 2m --max-points 4 --downsample none")["data"]["datasets"][0]["data"]
+        self.assertEqual(len(data), 12)
+
+    def test_downsample(self) -> None:
+        times = [START + datetime.timedelta(minutes=i) for i in range(100)]
+        values = [0] * 100
+        values[37] = 50
+        values[62] = -50
+        points = list(zip(times, values))
+        for downsample in (lttb, min_max):
+            sampled = downsample(points, 10)
+            self.assertLessEqual(len(sampled), 10, downsample)
+            self.assertEqual(sampled, sorted(sampled), downsample)
+            # Spikes are kept
+            self.assertIn(points[37], sampled, downsample)
+            self.assertIn(points[62], sampled, downsample)
+        sampled = lttb(points, 10)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+        self.assertEqual(lttb(points[:5], 10), points[:5])
@@ -0,0 +1,109 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the top and rare search
+commands, located at events.search_commands.top.
+"""
+import json
+from unittest.mock import MagicMock
+from typing import Any
+
+from django.contrib.auth import get_user_model
+
+from rest_framework.test import APITestCase
+
+from events.models import (
+    Event,
+    Query,
+)
+
+class TopTests(APITestCase):
+    def setUp(self, *args: Any, **kwargs: Any) -> None:
+        """For preparation, we are going to setup a user and add
+        twelve Events, with hosts occurring 6, 4 and 2 times.
+        """
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+        for i, host in enumerate(["a"] * 6 + ["b"] * 4 + ["c"] * 2):
+            Event.objects.create(
+                index="test",
+                host=host,
+                source="odd" if i % 2 else "even",
+                sourcetype="json",
+                user=self.user,
+                text=json.dumps({"foo": i}),
+            )
+        super().setUp(*args, **kwargs)
+
+    def resolve(self, text: str, events: Any = None) -> Any:
+        return Query(text=text).resolve(request=MagicMock(user=self.user), events=events)
+
+    def test_top(self) -> None:
+        for text in [
+            "search index=test | top host -n 2",
+            # Not pushed down
+            "search index=test | explode extracted_fields | top host -n 2",
+        ]:
+            results = self.resolve(text)
+            self.assertEqual(
+                [(result["host"], result["count"]) for result in results],
+                [("a", 6), ("b", 4)],
+                text,
+            )
+            self.assertEqual(results[0]["percent"], 50, text)
+
+    def test_rare(self) -> None:
+        for text in [
+            "search index=test | rare host -n 1",
+            "search index=test | explode extracted_fields | rare host -n 1",
+        ]:
+            results = self.resolve(text)
+            self.assertEqual(
+                [(result["host"], result["count"]) for result in results],
+                [("c", 2)],
+                text,
+            )
+
+    def test_top_by(self) -> None:
+        for text in [
+            "search index=test | top host --by source -n 1 --count-field hits",
+            "search index=test | explode extracted_fields | top host --by source -n 1 --count-field hits",
+        ]:
+            results = self.resolve(text)
+            self.assertEqual(
+                [(result["source"], result["host"], result["hits"], result["percent"]) for result in results],
+                [("even", "a", 3, 50), ("odd", "a", 3, 50)],
+                text,
+            )
+
+    def test_top_multiple_fields_and_missing_values(self) -> None:
+        events = [{"a": 1, "b": 2}] * 3 + [{"a": 1, "b": 3}] * 2 + [{"a": 1}] * 5
+        results = self.resolve("top a b", events)
+        self.assertEqual(
+            [(result["a"], result["b"], result["count"]) for result in results],
+            [(1, 2, 3), (1, 3, 2)],
+        )
+
+    def test_top_bounded_capacity(self) -> None:
+        """With fewer counters than distinct values, the frequent values
+        are still found.
+        """
+        events = [{"url": "/frequent"}] * 50 + [{"url": f"/{i}"} for i in range(200)] + [{"url": "/common"}] * 20
+        results = self.resolve("top url -n 2 --capacity 10", events)
+        self.assertEqual([result["url"] for result in results], ["/frequent", "/common"])
+        self.assertGreaterEqual(results[1]["count"], 20)
+        results = self.resolve("top url -n 2 --exact", events)
+        self.assertEqual([result["count"] for result in results], [50, 20])
+
+    def test_top_pushed_down_to_database(self) -> None:
+        from events.search_commands import top
+
+        queryset = Event.objects.filter(index="test")
+        pushed_down = top.pushdown(MagicMock(user=self.user), queryset, ["top", "host", "-n", "1"], {})
+        self.assertEqual(pushed_down, [{"host": "a", "count": 6, "percent": 50}])
+        # extracted_fields can't be grouped by in the database
+        self.assertIsNone(top.pushdown(MagicMock(user=self.user), queryset, ["top", "extracted_fields__foo"], {}))
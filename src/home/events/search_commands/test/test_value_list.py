@@ -79,3 +79,14 @@ class ValueListTests(APITestCase):
         )
         self.assertEqual(len(results), 10)
         self.assertEqual(results, list(range(10)))
+
+    def test_value_list_pushed_down_to_database(self) -> None:
+        """Assert that value_list on a QuerySet only selects the field."""
+        from events.search_commands import value_list
+
+        queryset = Event.objects.filter(index="test").order_by("id")
+        for field in ["host", "created"]:
+            pushed_down = value_list.pushdown(MagicMock(user=self.user), queryset, ["value_list", field], {})
+            expected = value_list(MagicMock(user=self.user), queryset, ["value_list", field], {})
+            self.assertEqual(pushed_down, expected)
+        self.assertIsNone(value_list.pushdown(MagicMock(user=self.user), queryset, ["value_list", "extracted_fields__foo"], {}))
@@ -0,0 +1,437 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+import re
+import logging
+import argparse
+import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from dateutil.parser import isoparse
+from django.conf import settings
+from django.db import models
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+from django.utils import timezone
+
+from events.columnar import MISSING, ColumnBatch, numpy
+from events.sorting import sort_key
+from events.util import hashable, iter_events
+from .util import get_pushdown_field, is_pushdown_column
+from .decorators import search_command
+from .qs._util import AGGREGATION_FUNCTIONS, SUPPORTED_FUNCTIONS
+
+# The letter of a span, the unit the database truncates to for it and
+# its length in seconds.
+SPAN_UNITS = {
+    "s": ("second", 1),
+    "m": ("minute", 60),
+    "h": ("hour", 60 * 60),
+    "d": ("day", 60 * 60 * 24),
+    "w": ("week", 60 * 60 * 24 * 7),
+}
+
+# A Monday, so week spans start on Mondays like TruncWeek
+ORIGIN = datetime.datetime(1970, 1, 5)
+
+parser = argparse.ArgumentParser(
+    prog="timechart",
+    description="Count or aggregate events in time buckets and return the "
+                "JSON data to configure a Chart.js chart.",
+)
+parser.add_argument(
+    "-s", "--span",
+    default="1h",
+    help="The size of each time bucket, a number followed by s, m, h, d "
+         "or w, ie. 5m. (Default: 1h)",
+)
+parser.add_argument(
+    "--time-field",
+    default="created",
+    help="The field holding the time of each event. (Default: created)",
+)
+parser.add_argument(
+    "-f", "--function",
+    default="count",
+    choices=("count", "sum", "avg", "min", "max"),
+    help="The aggregate to compute for each bucket. (Default: count)",
+)
+parser.add_argument(
+    "-b", "--by",
+    help="The field to split into series",
+)
+parser.add_argument(
+    "-t", "--type",
+    default="line",
+    choices=("bar", "line"),
+    help="The type of chart to make. (Default: line)",
+)
+parser.add_argument(
+    "--max-points",
+    type=int,
+    help="The maximum number of points of each series, series with more "
+         "buckets are downsampled. (Default: DELVE_TIMECHART_MAX_POINTS)",
+)
+parser.add_argument(
+    "--downsample",
+    default="lttb",
+    choices=("lttb", "minmax", "none"),
+    help="How series with more than --max-points buckets are downsampled. lttb "
+         "(Largest-Triangle-Three-Buckets) keeps the shape of the series, "
+         "minmax keeps the lowest and highest value of each stretch, so "
+         "spikes are never lost. Series of values other than numbers, ie. the "
+         "max of a string field, are not downsampled. (Default: lttb)",
+)
+parser.add_argument(
+    "field",
+    nargs="?",
+    help="The field to aggregate, required unless the function is count, "
+         "in which case events missing the field are not counted",
+)
+
+def parse_span(span: str) -> Tuple[int, str]:
+    """
+    Return the number and unit letter of span, ie. (5, "m") for 5m.
+    """
+    match = re.fullmatch(r"(\d+)([smhdw])", span.strip())
+    if match is None or not int(match.group(1)):
+        raise ValueError(f"Invalid span: {span}, expected a number followed by s, m, h, d or w, ie. 5m")
+    return int(match.group(1)), match.group(2)
+
+def floor_time(value: datetime.datetime, seconds: int, tz) -> datetime.datetime:
+    """
+    Return the start of the bucket of length seconds value falls in.
+    Buckets are aligned in tz, so day buckets start at midnight.
+    """
+    if timezone.is_aware(value):
+        value = timezone.make_naive(value, tz)
+    offset = (value - ORIGIN) // datetime.timedelta(seconds=1)
+    start = ORIGIN + datetime.timedelta(seconds=offset - offset % seconds)
+    return timezone.make_aware(start, tz)
+
+def to_datetime(value: Any) -> Optional[datetime.datetime]:
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime.combine(value, datetime.time())
+    if isinstance(value, str):
+        try:
+            return isoparse(value)
+        except ValueError:
+            return None
+    return None
+
+
+class Bucket:
+    """
+    The running count, sum, minimum and maximum of the values in one
+    time bucket of one series.
+    """
+    __slots__ = ("count", "total", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, count, total=None, minimum=None, maximum=None):
+        self.count += count
+        if total is not None:
+            self.total += total
+        if minimum is not None and (self.min is None or minimum < self.min):
+            self.min = minimum
+        if maximum is not None and (self.max is None or maximum > self.max):
+            self.max = maximum
+
+    def result(self, function: str) -> Any:
+        if function == "count":
+            return self.count
+        if function == "sum":
+            return self.total
+        if function == "avg":
+            return self.total / self.count if self.count else None
+        return getattr(self, function)
+
+
+def lttb(points: List[tuple], threshold: int) -> List[tuple]:
+    """
+    Downsample points, (x, y) tuples ordered by x, to threshold points
+    with the Largest-Triangle-Three-Buckets algorithm. y must be a number.
+    """
+    if threshold >= len(points):
+        return points
+    x = [point[0].timestamp() for point in points]
+    y = [float(point[1]) for point in points]
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # The average of the next bucket is the third point of the triangle
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, len(points))
+        average_x = sum(x[start:end]) / (end - start)
+        average_y = sum(y[start:end]) / (end - start)
+        # Pick the point of this bucket forming the largest triangle
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        largest, picked = -1, start
+        for j in range(start, end):
+            area = abs(
+                (x[a] - average_x) * (y[j] - y[a])
+                - (x[a] - x[j]) * (average_y - y[a])
+            )
+            if area > largest:
+                largest, picked = area, j
+        sampled.append(points[picked])
+        a = picked
+    sampled.append(points[-1])
+    return sampled
+
+def min_max(points: List[tuple], threshold: int) -> List[tuple]:
+    """
+    Downsample points, (x, y) tuples ordered by x, to at most threshold
+    points by keeping the lowest and highest point of threshold / 2
+    stretches of consecutive points.
+    """
+    if threshold >= len(points):
+        return points
+    stretches = max(threshold // 2, 1)
+    every = len(points) / stretches
+    sampled = []
+    for i in range(stretches):
+        stretch = range(int(i * every), int((i + 1) * every))
+        low = min(stretch, key=lambda j: points[j][1])
+        high = max(stretch, key=lambda j: points[j][1])
+        for j in sorted({low, high}):
+            sampled.append(points[j])
+    return sampled
+
+def make_chart(args: argparse.Namespace, series: Dict[Any, Any], unit: str) -> Dict[str, Any]:
+    """
+    Return the Chart.js configuration for series, a dict of each series'
+    key to a (label, {bucket start: Bucket}) tuple.
+    """
+    max_points = args.max_points if args.max_points is not None else settings.DELVE_TIMECHART_MAX_POINTS
+    y_field = args.function
+    datasets = []
+    for label, buckets in sorted(series.values(), key=lambda item: sort_key(item[0])):
+        points = [
+            (start, bucket.result(args.function))
+            for start, bucket in sorted(buckets.items())
+        ]
+        points = [point for point in points if point[1] is not None]
+        if not all(isinstance(value, (int, float, Decimal)) for _, value in points):
+            # The min or max of strings or times can be charted, not downsampled
+            pass
+        elif args.downsample == "lttb":
+            points = lttb(points, max_points)
+        elif args.downsample == "minmax":
+            points = min_max(points, max_points)
+        datasets.append(
+            {
+                "label": label if args.by else y_field,
+                "data": [{"time": start, y_field: value} for start, value in points],
+            }
+        )
+    return {
+        "visualization": "chartjs",
+        "type": args.type,
+        "data": {"datasets": datasets},
+        "options": {
+            "plugins": {},
+            "parsing": {
+                "xAxisKey": "time",
+                "yAxisKey": y_field,
+            },
+            "scales": {
+                "x": {
+                    "type": "time",
+                    "time": {
+                        "unit": unit,
+                        "displayFormats": {
+                            "second": "MM-DD HH:mm:ss",
+                            "minute": "MM-DD HH:mm",
+                            "hour":  "MM-DD HH",
+                            "day": "YY-MM-DD",
+                            "week": "YY-MM-DD",
+                        },
+                    },
+                },
+            },
+        },
+    }
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    args = parser.parse_args(argv[1:])
+    if args.function != "count" and args.field is None:
+        raise ValueError(f"A field is required to compute the {args.function}")
+    if args.max_points is not None and args.max_points < 3:
+        raise ValueError("--max-points must be at least 3")
+    parse_span(args.span)
+    return args
+
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Truncate the time of each event to the unit of the span, and count and
+    aggregate the events of each truncated time and series with a GROUP BY,
+    so only one row per unit of time and series is read.
+    """
+    log = logging.getLogger(__name__)
+    args = parse_args(argv)
+    if events.query.is_sliced or events.query.combinator:
+        return None
+    if not isinstance(get_pushdown_field(events, [args.time_field]), models.DateTimeField):
+        log.debug(f"Unable to push down timechart on time field: {args.time_field}")
+        return None
+    columns = [column for column in (args.by, args.field) if column]
+    if not all(is_pushdown_column(events, column) for column in columns):
+        log.debug(f"Unable to push down timechart on: {columns}")
+        return None
+    number, letter = parse_span(args.span)
+    unit, seconds = SPAN_UNITS[letter]
+    Count = AGGREGATION_FUNCTIONS["Count"]
+    aggregates = {"_count": Count(args.field or "*")}
+    if args.function in ("sum", "avg"):
+        aggregates["_sum"] = AGGREGATION_FUNCTIONS["Sum"](Cast(F(args.field), FloatField()))
+    elif args.function in ("min", "max"):
+        aggregates["_min"] = AGGREGATION_FUNCTIONS["Min"](args.field)
+        aggregates["_max"] = AGGREGATION_FUNCTIONS["Max"](args.field)
+    rows = (
+        events.order_by()
+        .annotate(_bucket=SUPPORTED_FUNCTIONS["Trunc"](args.time_field, unit))
+        .values("_bucket", *([args.by] if args.by else []))
+        .annotate(**aggregates)
+    )
+    tz = timezone.get_current_timezone()
+    series = {}
+    for row in rows.iterator(chunk_size=settings.DELVE_STREAMING_CHUNK_SIZE):
+        if row["_bucket"] is None:
+            continue
+        label = row.get(args.by)
+        buckets = series.setdefault(hashable(label), (label, {}))[1]
+        start = floor_time(row["_bucket"], number * seconds, tz)
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = Bucket()
+        bucket.add(row["_count"], row.get("_sum"), row.get("_min"), row.get("_max"))
+    return make_chart(args, series, unit)
+
+def columnar(request: HttpRequest, batch: ColumnBatch, argv: List[str], environment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Bucket and aggregate the events of a ColumnBatch with NumPy. Only
+    used when the current time zone is UTC, so buckets are a fixed number
+    of seconds apart, and the time field holds datetimes and the field
+    (unless counting) numbers. Returns None otherwise.
+    """
+    args = parse_args(argv)
+    if timezone.get_current_timezone_name() != "UTC":
+        return None
+    number, letter = parse_span(args.span)
+    unit, seconds = SPAN_UNITS[letter]
+    times = batch.column(args.time_field)
+    if set(map(type, times)) != {datetime.datetime}:
+        return None
+    # Whole seconds since ORIGIN, naive times being UTC like in floor_time
+    origin = ORIGIN.replace(tzinfo=datetime.timezone.utc)
+    second = datetime.timedelta(seconds=1)
+    offsets = numpy.fromiter(
+        (
+            ((time if time.tzinfo is not None else time.replace(tzinfo=datetime.timezone.utc)) - origin) // second
+            for time in times
+        ),
+        dtype=numpy.int64,
+        count=len(batch),
+    )
+    starts = offsets - offsets % (number * seconds)
+    values = None
+    integer = True
+    if args.function == "count":
+        if args.field:
+            valid = numpy.array([value is not None and value is not MISSING for value in batch.column(args.field)], dtype=bool)
+        else:
+            valid = numpy.ones(len(batch), dtype=bool)
+    else:
+        numeric = batch.numeric(args.field)
+        if numeric is None:
+            return None
+        values, valid, integer = numeric
+        values = values[valid]
+        if numpy.isnan(values).any():
+            # Buckets compare NaN in the order events are read
+            return None
+    codes, labels = batch.factorize([args.by] if args.by else [])
+    pairs = numpy.stack([codes[valid], starts[valid]], axis=1)
+    if not len(pairs):
+        return make_chart(args, {}, unit)
+    keys, inverse = numpy.unique(pairs, axis=0, return_inverse=True)
+    inverse = inverse.reshape(-1)
+    counts = numpy.bincount(inverse, minlength=len(keys)).tolist()
+    totals = minimums = maximums = None
+    if values is not None:
+        totals = numpy.bincount(inverse, weights=values, minlength=len(keys)).tolist()
+        minimums = numpy.full(len(keys), numpy.inf)
+        numpy.minimum.at(minimums, inverse, values)
+        maximums = numpy.full(len(keys), -numpy.inf)
+        numpy.maximum.at(maximums, inverse, values)
+        minimums, maximums = minimums.tolist(), maximums.tolist()
+    tz = timezone.get_current_timezone()
+    cast = int if integer else float
+    series = {}
+    for index, (code, start) in enumerate(keys.tolist()):
+        label = labels[code][0] if args.by else None
+        buckets = series.setdefault(hashable(label), (label, {}))[1]
+        bucket = buckets[timezone.make_aware(ORIGIN + datetime.timedelta(seconds=start), tz)] = Bucket()
+        if values is None:
+            bucket.add(counts[index])
+        else:
+            bucket.add(counts[index], cast(totals[index]), cast(minimums[index]), cast(maximums[index]))
+    return make_chart(args, series, unit)
+
+@search_command(parser, pushdown=pushdown, columnar=columnar, cacheable=True)
+def timechart(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Count or aggregate events in time buckets of --span and return the
+    JSON data to configure a Chart.js chart with one series per value of
+    --by. Series with more than --max-points buckets are downsampled.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        events (Union[QuerySet, List[Dict[str, Any]]]): The result set to operate on.
+        argv (List[str]): List of command-line arguments.
+        environment (Dict[str, Any]): Dictionary used as a jinja2 environment (context) for rendering the arguments of a command.
+
+    Returns:
+        Dict[str, Any]: A dictionary representing the chart data in Chart.js format.
+    """
+    args = parse_args(argv)
+    number, letter = parse_span(args.span)
+    unit, seconds = SPAN_UNITS[letter]
+    tz = timezone.get_current_timezone()
+    series = {}
+    for event in iter_events(events):
+        time = to_datetime(event.get(args.time_field))
+        if time is None:
+            continue
+        value = event.get(args.field) if args.field else None
+        if args.field and value is None:
+            continue
+        label = event.get(args.by) if args.by else None
+        buckets = series.setdefault(hashable(label), (label, {}))[1]
+        start = floor_time(time, number * seconds, tz)
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = Bucket()
+        if args.function == "count":
+            bucket.add(1)
+        elif args.function in ("sum", "avg"):
+            if not isinstance(value, (int, float, Decimal)):
+                raise ValueError(f"Unable to compute the {args.function} of {args.field}, {value!r} is not a number")
+            bucket.add(1, value)
+        else:
+            bucket.add(1, None, value, value)
+    return make_chart(args, series, unit)
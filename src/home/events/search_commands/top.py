@@ -0,0 +1,217 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+import argparse
+import logging
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Union
+
+from django.conf import settings
+from django.core.exceptions import FieldError
+from django.db.models.query import QuerySet
+from django.http import HttpRequest
+
+from events.sketches import SpaceSaving
+from events.sorting import sort_key
+from events.util import hashable, iter_events
+from .util import is_pushdown_column
+from .decorators import search_command
+from .qs._util import AGGREGATION_FUNCTIONS
+
+def make_parser(prog: str, description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog=prog,
+        description=description,
+    )
+    parser.add_argument(
+        "-n", "--number",
+        type=int,
+        default=10,
+        help="The number of values to return (per group). (Default: 10)",
+    )
+    parser.add_argument(
+        "--by",
+        nargs="+",
+        help="If specified, the values are counted separately for each "
+             "combination of values of the specified fields",
+    )
+    parser.add_argument(
+        "--count-field",
+        default="count",
+        help="The field to store the count in. (Default: count)",
+    )
+    parser.add_argument(
+        "--percent-field",
+        default="percent",
+        help="The field to store the percentage of the events (of the "
+             "group) with the value in. (Default: percent)",
+    )
+    parser.add_argument(
+        "fields",
+        nargs="+",
+        help="The fields to count the values of, events missing "
+             "one of the fields are ignored",
+    )
+    return parser
+
+top_parser = make_parser(
+    "top",
+    "Return the most frequent values of the specified fields and their counts.",
+)
+top_parser.add_argument(
+    "--capacity",
+    type=int,
+    help="The number of distinct values to keep counters for (per group). "
+         "Counts are exact until more distinct values than this are seen, "
+         "after which the least frequent values are dropped. "
+         "(Default: the larger of DELVE_TOP_CAPACITY and 10 times --number)",
+)
+top_parser.add_argument(
+    "--exact",
+    action="store_true",
+    help="If specified, count every distinct value, using memory "
+         "proportional to the number of distinct values",
+)
+
+rare_parser = make_parser(
+    "rare",
+    "Return the least frequent values of the specified fields and their counts. "
+    "Every distinct value is counted.",
+)
+
+def count_values(events, args: argparse.Namespace, capacity: Optional[int]):
+    """
+    Count the values of args.fields in one pass over events, in one
+    SpaceSaving summary per group of args.by values. Returns a list of
+    (by values, summary) tuples ordered by the by values.
+    """
+    by = args.by or []
+    groups = {}
+    for event in events:
+        values = tuple(event.get(field) for field in args.fields)
+        if any(value is None for value in values):
+            continue
+        key = tuple(hashable(event.get(field)) for field in by)
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = ([event.get(field) for field in by], SpaceSaving(capacity))
+        group[1].add(values)
+    return sorted(
+        groups.values(),
+        key=lambda group: tuple(sort_key(value) for value in group[0]),
+    )
+
+def make_rows(args: argparse.Namespace, groups, most_common: bool) -> List[Dict[str, Any]]:
+    ret = []
+    for by_values, summary in groups:
+        counters = summary.most_common(args.number) if most_common else summary.least_common(args.number)
+        for values, count, _ in counters:
+            ret.append({
+                **dict(zip(args.by or [], by_values)),
+                **dict(zip(args.fields, values)),
+                args.count_field: count,
+                args.percent_field: 100 * count / summary.total,
+            })
+    return ret
+
+def count_pushdown(events: QuerySet, args: argparse.Namespace, descending: bool) -> Optional[List[Dict[str, Any]]]:
+    """
+    Count the values with GROUP BY ... ORDER BY count, reading one row per
+    distinct combination of values instead of one per event. Without --by
+    only the first --number rows are read.
+    """
+    log = logging.getLogger(__name__)
+    if events.query.is_sliced or events.query.combinator or args.number < 0:
+        return None
+    by = args.by or []
+    columns = [*by, *args.fields]
+    if not all(is_pushdown_column(events, column) for column in columns):
+        log.debug(f"Unable to push down {'top' if descending else 'rare'} on: {columns}")
+        return None
+    for field in args.fields:
+        events = events.filter(**{f"{field}__isnull": False})
+    Count = AGGREGATION_FUNCTIONS["Count"]
+    order = f"-{args.count_field}" if descending else args.count_field
+    try:
+        counted = events.order_by().values(*columns).annotate(**{args.count_field: Count("*")})
+        if not by:
+            total = events.count()
+            rows = list(counted.order_by(order)[:args.number])
+            groups = [(rows, total)]
+        else:
+            counted = counted.order_by(*by, order)
+            groups = []
+            for _, rows in groupby(counted.iterator(chunk_size=settings.DELVE_STREAMING_CHUNK_SIZE), key=itemgetter(*by)):
+                rows = list(rows)
+                total = sum(row[args.count_field] for row in rows)
+                groups.append((rows[:args.number], total))
+    except (FieldError, ValueError) as e:
+        log.debug(f"Unable to push down {'top' if descending else 'rare'}: {e}")
+        return None
+    ret = []
+    for rows, total in groups:
+        for row in rows:
+            ret.append({
+                **{column: row[column] for column in columns},
+                args.count_field: row[args.count_field],
+                args.percent_field: 100 * row[args.count_field] / total,
+            })
+    return ret
+
+def top_pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    args = top_parser.parse_args(argv[1:])
+    return count_pushdown(events, args, descending=True)
+
+def rare_pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    args = rare_parser.parse_args(argv[1:])
+    return count_pushdown(events, args, descending=False)
+
+@search_command(top_parser, pushdown=top_pushdown, cacheable=True)
+def top(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Return the most frequent values of the specified fields and their counts.
+
+    The values are counted in one pass with a space-saving summary of at
+    most --capacity counters per group, so memory is bounded however many
+    distinct values there are. Counts are exact unless a group had more
+    distinct values than --capacity, in which case they may overestimate.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        events (Union[QuerySet, List[Dict[str, Any]]]): The result set to operate on.
+        argv (List[str]): List of command-line arguments.
+        environment (Dict[str, Any]): Dictionary used as a jinja2 environment (context) for rendering the arguments of a command.
+
+    Returns:
+        List[Dict[str, Any]]: One event per value with its count and percentage.
+    """
+    args = top.parser.parse_args(argv[1:])
+    if args.exact:
+        capacity = None
+    else:
+        capacity = args.capacity or max(settings.DELVE_TOP_CAPACITY, 10 * args.number)
+    groups = count_values(iter_events(events), args, capacity)
+    return make_rows(args, groups, most_common=True)
+
+@search_command(rare_parser, pushdown=rare_pushdown, cacheable=True)
+def rare(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Return the least frequent values of the specified fields and their counts.
+
+    A bounded summary can't tell which values are least frequent, so every
+    distinct value is counted.
+
+    Args:
+        request (HttpRequest): The HTTP request object.
+        events (Union[QuerySet, List[Dict[str, Any]]]): The result set to operate on.
+        argv (List[str]): List of command-line arguments.
+        environment (Dict[str, Any]): Dictionary used as a jinja2 environment (context) for rendering the arguments of a command.
+
+    Returns:
+        List[Dict[str, Any]]: One event per value with its count and percentage.
+    """
+    args = rare.parser.parse_args(argv[1:])
+    groups = count_values(iter_events(events), args, None)
+    return make_rows(args, groups, most_common=False)
@@ -5,16 +5,26 @@
 import ast
 # TODO: import logging
 import inspect
+from contextvars import ContextVar
 from types import GeneratorType
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 from django.db.models.query import QuerySet
 from django.contrib.auth.models import Permission
+from django.core.exceptions import FieldDoesNotExist
 from django.db import models
 from django.http import HttpRequest, HttpResponse
 
-from events.util import cast
+from events.util import cast, hashable
+
+# While set to a list, every permission checked by has_permission_for_model
+# is appended to it as (permission_string, model), see events.single_flight.
+permission_checks = ContextVar("permission_checks", default=None)
 
 def has_permission_for_model(permission_string: str, model: models.Model, request: HttpRequest) -> bool:
+    checks = permission_checks.get()
+    if checks is not None:
+        checks.append((permission_string, model))
     permission_names = [
         f"{model._meta.app_label}.{perm.codename}" for perm in
         Permission.objects.filter(
@@ -32,6 +42,61 @@ def has_permission_for_model(permission_string: str, model: models.Model, reques
     return True
 
 
+def get_pushdown_field(events: QuerySet, path: List[str]) -> Optional[models.Field]:
+    """
+    Return the model field referenced by path if the database can evaluate
+    path for events with the same result the Python implementation of a
+    search command would get from the resolved events, otherwise None.
+
+    Relations are refused because resolved events only hold their primary
+    key, as are lookups through anything but a JSONField. If events is a
+    values() QuerySet the first segment of path must be one of the selected
+    fields.
+    """
+    if events._fields and path[0] not in events._fields:
+        return None
+    try:
+        field = events.model._meta.get_field(path[0])
+    except FieldDoesNotExist:
+        return None
+    if field.is_relation:
+        return None
+    if len(path) > 1:
+        if not isinstance(field, models.JSONField):
+            return None
+        # Django treats integer segments as array indexes, not keys
+        if any(segment.isdigit() for segment in path[1:]):
+            return None
+    return field
+
+
+def get_pushdown_types(field: models.Field) -> Tuple[type, ...]:
+    """
+    Return the types a value compared to field in the database must have
+    to compare the same in Python to the values of resolved events. The
+    database converts ie. 123 to '123' for a CharField, Python doesn't.
+    """
+    if isinstance(field, (models.CharField, models.TextField)):
+        return (str,)
+    if isinstance(field, models.BooleanField):
+        return (bool,)
+    if isinstance(field, (models.IntegerField, models.FloatField)):
+        return (int, float)
+    return ()
+
+
+def is_pushdown_column(events: QuerySet, name: str) -> bool:
+    """
+    Return True if name is a key of the events events resolves to, and the
+    database can refer to it in an expression, ie. F(name).
+    """
+    if events._fields:
+        return name in events._fields
+    if name in events.query.annotations:
+        return True
+    return "__" not in name and get_pushdown_field(events, [name]) is not None
+
+
 # def cast(value):
 #     if value.isdigit():
 #         return int(value)
@@ -57,3 +122,13 @@ def ensure_list(data):
         return data
     else:
         raise ValueError(f"Cannot convert {type(data)} to list.")
+
+def fieldgetter(*fields: str) -> Callable[[Dict[str, Any]], Any]:
+    """
+    Like operator.itemgetter, but a field missing from an event is None,
+    the same as if resolve had back-filled it.
+    """
+    if len(fields) == 1:
+        field = fields[0]
+        return lambda event: event.get(field)
+    return lambda event: tuple(event.get(field) for field in fields)
@@ -4,13 +4,14 @@
 
 import argparse
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 
 from django.db.models.query import QuerySet
 from django.http import HttpRequest
 
-from events.util import resolve
+from events.util import resolve, localize_datetimes
 from events.models import Query, Event
+from .util import is_pushdown_column
 from .decorators import search_command
 
 parser = argparse.ArgumentParser(
@@ -22,7 +23,20 @@ parser.add_argument(
     help="The field to extract the values from",
 )
 
-@search_command(parser)
+def pushdown(request: HttpRequest, events: QuerySet, argv: List[str], environment: Dict[str, Any]) -> Optional[List[Any]]:
+    """
+    Select only the values of field instead of whole events.
+    """
+    args = parser.parse_args(argv[1:])
+    if not is_pushdown_column(events, args.field):
+        return None
+    values = []
+    for value in events.values_list(args.field, flat=True):
+        # resolve would have localized datetimes in the events
+        values.append(localize_datetimes({args.field: value})[args.field])
+    return values
+
+@search_command(parser, pushdown=pushdown, cacheable=True)
 def value_list(request: HttpRequest, events: Union[QuerySet, List[Dict[str, Any]]], argv: List[str], environment: Dict[str, Any]) -> List[Any]:
     """
     Reduce the result set to include the values from a given field.
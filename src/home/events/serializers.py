@@ -13,6 +13,8 @@ from rest_framework.exceptions import (
 )
 from rest_framework.fields import CurrentUserDefault
 
+from . import result_cache
+from . import ingest
 from .models import (
     Event,
     Query,
@@ -118,11 +120,14 @@ class BulkEventSerializer(serializers.ListSerializer):
         for attrs in validated_data:
             log.debug(f"Creating events, found {attrs=}")
             result.append(self.child.create(attrs))
+        # bulk_create doesn't send pre_save, so the events are processed here
+        ingest.process_events(result)
         # result = [self.child.create(attrs) for attrs in validated_data]
         try:
-            self.child.Meta.model.objects.bulk_create(result)
+            self.child.Meta.model.objects.bulk_create(result, batch_size=settings.DELVE_INGEST_BATCH_SIZE)
         except IntegrityError as e:
             raise ValidationError(e)
+        result_cache.invalidate(self.child.Meta.model, [event.index for event in result])
         return result
 
 class EventSerializer(serializers.ModelSerializer):
@@ -155,20 +160,14 @@ class EventSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         instance = Event(**validated_data)
-        if settings.DELVE_ENABLE_EXTRACTIONS_ON_CREATE:
-            instance.extract_fields()
-        if settings.DELVE_ENABLE_PROCESSORSS_ON_CREATE:
-            instance.process()
         if isinstance(self._kwargs["data"], dict):
+            # Extracted and processed by the pre_save signal
             instance.save()
         return instance
 
     def update(self, instance, validated_data):
         for key, value in validated_data.items(): 
             setattr(instance, key, value)
-        if settings.DELVE_ENABLE_EXTRACTIONS_ON_UPDATE:
-            instance.extract_fields()
-        if settings.DELVE_ENABLE_PROCESSORSS_ON_UPDATE:
-            instance.process()
+        # Extracted and processed by the pre_save signal
         instance.save()
         return instance
@@ -4,7 +4,9 @@
 
 import logging
 
-from django.db.models.signals import post_save, pre_save
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.core.signals import setting_changed
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
 from django.conf import settings
@@ -14,7 +16,12 @@ from .models import (
     BaseEvent,
     GlobalContext,
     LocalContext,
+    compile_query_plan,
 )
+from . import result_cache
+from . import ingest
+from . import ingest_queue
+from . import spool
 
 @receiver(pre_save, sender=GlobalContext)
 def validate_global_context(sender, instance, **kwargs):
@@ -31,6 +38,49 @@ def create_global_context(sender, instance, created, **kwargs):
     elif not hasattr(instance, "global_context"):
         GlobalContext.objects.create(user=instance, context={})
 
+@receiver(setting_changed)
+def clear_query_plan_cache(sender, setting, **kwargs):
+    # Cached plans hold the resolved search command functions
+    if setting == "DELVE_SEARCH_COMMANDS":
+        compile_query_plan.cache_clear()
+
+@receiver(setting_changed)
+def clear_ingest_dispatch_tables(sender, setting, **kwargs):
+    # The dispatch tables hold the imported extractions and processors
+    if setting in ("DELVE_EXTRACTION_MAP", "DELVE_PROCESSOR_MAP"):
+        ingest.clear_dispatch_tables()
+    if setting == "DELVE_INGEST_WORKERS":
+        ingest.shutdown_pool()
+    if setting in (
+        "DELVE_INGEST_QUEUE_INTERVAL",
+        "DELVE_INGEST_SPOOL",
+        "DELVE_INGEST_SPOOL_DRAIN",
+        "DELVE_INGEST_SPOOL_SEGMENT_SIZE",
+    ):
+        ingest_queue.reset_queue()
+        spool.reset_spool()
+
+@receiver(post_save)
+def invalidate_result_cache(sender, instance, created, **kwargs):
+    # QuerySet.update and bulk_create don't send signals,
+    # they invalidate the result cache where they are called.
+    if not issubclass(sender, BaseEvent):
+        return
+    if created:
+        result_cache.invalidate(sender, [instance.index])
+    else:
+        # The event may have been moved out of another index
+        result_cache.invalidate(sender)
+
+def invalidate_result_cache_on_delete(sender, instance, **kwargs):
+    result_cache.invalidate(sender, [instance.index])
+
+# Connected to each model of events rather than to every sender: Django
+# loads the rows of a model with post_delete receivers before deleting them
+for model in apps.get_models():
+    if issubclass(model, BaseEvent):
+        post_delete.connect(invalidate_result_cache_on_delete, sender=model)
+
 @receiver(pre_save, sender=Event)
 def extract_fields_and_process(sender, instance, **kwargs):
     log = logging.getLogger(__name__)
@@ -38,16 +88,6 @@ def extract_fields_and_process(sender, instance, **kwargs):
     # Reference: https://stackoverflow.com/questions/11561722/django-what-is-the-role-of-modelstate
     created = instance._state.adding
     log.debug(f"instance found to be created: {created}")
-
-    if created and settings.DELVE_ENABLE_EXTRACTIONS_ON_CREATE:
-        log.debug(f"Extracting fields on new event: {instance}")
-        instance.extract_fields()
-    if created and settings.DELVE_ENABLE_PROCESSORSS_ON_CREATE:
-        log.debug(f"Processing new event: {instance}")
-        instance.process()
-    if not created and settings.DELVE_ENABLE_EXTRACTIONS_ON_UPDATE:
-        log.debug(f"Extracting fields on existing event: {instance}")
-        instance.extract_fields()
-    if not created and settings.DELVE_ENABLE_PROCESSORSS_ON_UPDATE:
-        log.debug(f"Processing existing event: {instance}")
-        instance.process()
\ No newline at end of file
+    # Events saved one at a time are only extracted and processed here,
+    # bulk_create skips signals so its callers use process_events too.
+    ingest.process_events([instance], created=created)
@@ -0,0 +1,110 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+Single-flight deduplication of identical queries resolved concurrently.
+
+The first thread to resolve a query becomes the leader and runs it, threads
+resolving the same query (same rendered stages and context) while it is
+running wait for it and share its result instead of running their own.
+
+Results are shared between users, so the permissions checked by the leader
+through has_permission_for_model are recorded and checked again for each
+waiting request. A request which fails any of them, or which waited on a
+leader that failed, runs the query itself.
+"""
+
+import copy
+import json
+import hashlib
+import logging
+import threading
+
+from events import result_cache
+
+
+def get_key(query, context, environment_globals):
+    """
+    Return the key identifying query for single-flight, or None if
+    concurrent runs of query must not be shared.
+    """
+    log = logging.getLogger(__name__)
+    environment = {**(environment_globals or {}), **context}
+    rendered = []
+    try:
+        for stage in query.get_query_plan():
+            # Commands which aren't cacheable depend on more than their
+            # arguments, ie. the user or an external service.
+            if not getattr(stage.operation, "cacheable", False):
+                return None
+            rendered.append(result_cache.render_argv(stage, environment))
+        material = json.dumps([rendered, context], sort_keys=True, default=str)
+    except Exception:
+        log.debug("Not sharing, unable to build key", exc_info=True)
+        return None
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+        self.permission_checks = []
+
+
+class SingleFlight:
+    """
+    Run at most one call for each key at a time, see SingleFlight.do.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, request, func):
+        """
+        Return func(), or the result of the concurrent call for key if
+        there is one and request passes the permissions it checked.
+        """
+        from events.search_commands.util import permission_checks
+        log = logging.getLogger(__name__)
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            token = permission_checks.set(call.permission_checks)
+            try:
+                call.result = func()
+                call.failed = result_cache.is_error(call.result)
+                return call.result
+            except BaseException:
+                call.failed = True
+                raise
+            finally:
+                permission_checks.reset(token)
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        log.debug(f"Waiting for concurrent query: {key}")
+        call.done.wait()
+        if call.failed or not self._permitted(call, request):
+            log.debug(f"Unable to share result of concurrent query: {key}")
+            return func()
+        # Callers may change the events in place
+        return copy.deepcopy(call.result)
+
+    def _permitted(self, call, request):
+        from events.search_commands.util import has_permission_for_model
+        try:
+            return all(
+                has_permission_for_model(permission_string, model, request)
+                for permission_string, model in call.permission_checks
+            )
+        except Exception:
+            return False
+
+
+queries = SingleFlight()
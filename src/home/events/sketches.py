@@ -0,0 +1,366 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+Probabilistic sketches for approximate aggregates in bounded memory.
+
+- HyperLogLog estimates the number of distinct values.
+- TDigest estimates quantiles (percentiles).
+- CountMinSketch estimates how often each value occurred.
+- SpaceSaving finds the most frequent values.
+- BloomFilter tells whether a value was (probably) seen before.
+
+Each sketch can be merged with another sketch built with the same
+parameters, so partial sketches computed over different partitions of
+the events (or by different workers) combine into the sketch of all of
+them. Sketches are plain objects and can be pickled.
+"""
+
+import math
+import heapq
+import hashlib
+from array import array
+
+from django.conf import settings
+
+from events.util import hashable
+
+
+def value_bytes(value):
+    """
+    Return the bytes hashed for value. Equal numbers give the same
+    bytes whether they are ints or floats.
+    """
+    if isinstance(value, str):
+        return b"s" + value.encode("utf-8")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return b"r" + repr(hashable(value)).encode("utf-8")
+
+
+def hash64(value):
+    return int.from_bytes(hashlib.blake2b(value_bytes(value), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct values added, with a relative
+    standard error of about 1.04 / sqrt(2 ** precision), using
+    2 ** precision bytes.
+    """
+    def __init__(self, precision=None):
+        if precision is None:
+            precision = settings.DELVE_HLL_PRECISION
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        x = hash64(value)
+        index = x >> (64 - self.precision)
+        remaining = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLogs with the same precision can be merged")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        if m >= 128:
+            alpha = 0.7213 / (1 + 1.079 / m)
+        else:
+            alpha = {16: 0.673, 32: 0.697, 64: 0.709}[m]
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class TDigest:
+    """
+    Estimates quantiles of the values added with a merging t-digest.
+    Higher compression keeps more centroids and gives more accurate
+    estimates, mostly for the extreme quantiles.
+    """
+    def __init__(self, compression=None):
+        if compression is None:
+            compression = settings.DELVE_TDIGEST_COMPRESSION
+        if compression <= 0:
+            raise ValueError(f"TDigest compression must be positive, got {compression}")
+        self.compression = compression
+        self.centroids = []
+        self.buffer = []
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value, weight=1):
+        self.buffer.append((value, weight))
+        self.count += weight
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if len(self.buffer) >= 5 * self.compression:
+            self.compress()
+
+    def merge(self, other):
+        other.compress()
+        self.buffer.extend(other.centroids)
+        self.count += other.count
+        for value in (other.min, other.max):
+            if value is not None:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+        self.compress()
+        return self
+
+    def _k(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _q_limit(self, k):
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def compress(self):
+        if not self.buffer:
+            return
+        points = sorted(self.centroids + self.buffer)
+        self.buffer = []
+        total = sum(weight for _, weight in points)
+        centroids = []
+        mean, weight = points[0]
+        weight_so_far = 0
+        q_limit = self._q_limit(self._k(0) + 1)
+        for point_mean, point_weight in points[1:]:
+            if (weight_so_far + weight + point_weight) / total <= q_limit:
+                weight += point_weight
+                mean += (point_mean - mean) * point_weight / weight
+            else:
+                centroids.append((mean, weight))
+                weight_so_far += weight
+                q_limit = self._q_limit(self._k(weight_so_far / total) + 1)
+                mean, weight = point_mean, point_weight
+        centroids.append((mean, weight))
+        self.centroids = centroids
+
+    def quantile(self, q):
+        """
+        Return the estimated value below which a fraction q of the
+        values fall, or None if no values were added.
+        """
+        self.compress()
+        if not self.centroids:
+            return None
+        if len(self.centroids) == 1:
+            return self.centroids[0][0]
+        target = q * self.count
+        # The cumulative weight at the center of each centroid
+        centers = []
+        cumulative = 0
+        for _, weight in self.centroids:
+            centers.append(cumulative + weight / 2)
+            cumulative += weight
+        first_mean, _ = self.centroids[0]
+        last_mean, _ = self.centroids[-1]
+        if target <= centers[0]:
+            return self.min + (first_mean - self.min) * target / centers[0]
+        if target >= centers[-1]:
+            remaining = self.count - centers[-1]
+            if remaining <= 0:
+                return last_mean
+            return last_mean + (self.max - last_mean) * (target - centers[-1]) / remaining
+        for i in range(len(centers) - 1):
+            if centers[i] <= target <= centers[i + 1]:
+                lower, _ = self.centroids[i]
+                upper, _ = self.centroids[i + 1]
+                span = centers[i + 1] - centers[i]
+                return lower + (upper - lower) * (target - centers[i]) / span
+
+
+class CountMinSketch:
+    """
+    Estimates how often each value was added. An estimate is never lower
+    than the true count, and with probability 1 - delta it exceeds it by
+    at most epsilon times the total count.
+    """
+    def __init__(self, epsilon=None, delta=None):
+        if epsilon is None:
+            epsilon = settings.DELVE_COUNT_MIN_EPSILON
+        if delta is None:
+            delta = settings.DELVE_COUNT_MIN_DELTA
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError("CountMinSketch epsilon and delta must be between 0 and 1")
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = [array("q", bytes(8 * self.width)) for _ in range(self.depth)]
+        self.total = 0
+
+    def _indexes(self, value):
+        digest = hashlib.blake2b(value_bytes(value), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, value, count=1):
+        """
+        Add count occurrences of value and return its new estimate.
+        """
+        estimate = None
+        for row, index in enumerate(self._indexes(value)):
+            self.table[row][index] += count
+            if estimate is None or self.table[row][index] < estimate:
+                estimate = self.table[row][index]
+        self.total += count
+        return estimate
+
+    def estimate(self, value):
+        return min(self.table[row][index] for row, index in enumerate(self._indexes(value)))
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Only CountMinSketches with the same epsilon and delta can be merged")
+        for row, other_row in zip(self.table, other.table):
+            for index, count in enumerate(other_row):
+                if count:
+                    row[index] += count
+        self.total += other.total
+        return self
+
+
+class SpaceSaving:
+    """
+    Tracks the most frequent values with the space-saving algorithm,
+    using at most capacity counters. While no more than capacity distinct
+    values were added the counts are exact. After that, a new value takes
+    over the counter of the least frequent value, inheriting its count as
+    the error of its own, so a count is never lower than the true count
+    and exceeds it by at most its error.
+
+    With a capacity of None every value is counted exactly.
+    """
+    def __init__(self, capacity=None):
+        self.capacity = capacity
+        # key -> [value, count, error]
+        self.counters = {}
+        # (count, sequence, key) of each counter, entries whose count is
+        # outdated are skipped when the least frequent value is looked up
+        self.heap = []
+        self.sequence = 0
+        self.total = 0
+
+    def add(self, value, count=1):
+        self.total += count
+        key = hashable(value)
+        counter = self.counters.get(key)
+        if counter is not None:
+            counter[1] += count
+        elif self.capacity is None or len(self.counters) < self.capacity:
+            counter = self.counters[key] = [value, count, 0]
+        else:
+            _, least, _ = self.counters.pop(self._least())
+            counter = self.counters[key] = [value, least + count, least]
+        if self.capacity is not None:
+            self.sequence += 1
+            heapq.heappush(self.heap, (counter[1], self.sequence, key))
+            if len(self.heap) > 4 * self.capacity:
+                self._rebuild()
+
+    def _least(self):
+        while True:
+            count, _, key = heapq.heappop(self.heap)
+            counter = self.counters.get(key)
+            if counter is not None and counter[1] == count:
+                return key
+
+    def _rebuild(self):
+        self.heap = []
+        for key, (_, count, _) in self.counters.items():
+            self.sequence += 1
+            self.heap.append((count, self.sequence, key))
+        heapq.heapify(self.heap)
+
+    def merge(self, other):
+        for value, count, _ in other.counters.values():
+            self.add(value, count)
+        # Values other dropped were counted in its total, but not added
+        self.total += other.total - sum(count for _, count, _ in other.counters.values())
+        return self
+
+    def most_common(self, number):
+        """
+        Return the number most frequent values as (value, count, error)
+        tuples, most frequent first.
+        """
+        counters = sorted(self.counters.values(), key=lambda counter: -counter[1])
+        return [tuple(counter) for counter in counters[:number]]
+
+    def least_common(self, number):
+        """
+        Return the number least frequent values as (value, count, error)
+        tuples, least frequent first. This is only meaningful if every
+        value was counted exactly.
+        """
+        counters = sorted(self.counters.values(), key=lambda counter: counter[1])
+        return [tuple(counter) for counter in counters[:number]]
+
+
+class BloomFilter:
+    """
+    Tells whether a value was added before, using about
+    -capacity * ln(error_rate) / ln(2) ** 2 bits. A value which was added
+    is always found, a value which was not is wrongly found with
+    probability error_rate, as long as at most capacity distinct values
+    were added (the rate grows beyond that).
+    """
+    def __init__(self, capacity=None, error_rate=None):
+        if capacity is None:
+            capacity = settings.DELVE_BLOOM_CAPACITY
+        if error_rate is None:
+            error_rate = settings.DELVE_BLOOM_ERROR_RATE
+        if capacity <= 0:
+            raise ValueError(f"BloomFilter capacity must be positive, got {capacity}")
+        if not 0 < error_rate < 1:
+            raise ValueError("BloomFilter error_rate must be between 0 and 1")
+        self.size = max(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _indexes(self, value):
+        digest = hashlib.blake2b(value_bytes(value), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        """
+        Add value and return whether it was (probably) added before.
+        """
+        seen = True
+        bits = self.bits
+        for index in self._indexes(value):
+            byte, bit = index >> 3, 1 << (index & 7)
+            if not bits[byte] & bit:
+                seen = False
+                bits[byte] |= bit
+        return seen
+
+    def __contains__(self, value):
+        bits = self.bits
+        return all(bits[index >> 3] & (1 << (index & 7)) for index in self._indexes(value))
+
+    def merge(self, other):
+        if (other.size, other.hashes) != (self.size, self.hashes):
+            raise ValueError("Only BloomFilters with the same capacity and error_rate can be merged")
+        self.bits = bytearray(a | b for a, b in zip(self.bits, other.bits))
+        return self
@@ -0,0 +1,172 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+Sorting of result sets which may not fit in memory.
+
+sort_events sorts up to DELVE_SORT_BUFFER_SIZE events in memory. Beyond
+that, each full buffer is sorted and spilled to a temporary file as a
+run, and the runs are merged with heapq.merge while the output is read,
+so only one event per run is held in memory. When there are too many
+runs to merge at once they are merged into longer runs first.
+
+sort_key gives every value a place in a single total ordering, so events
+missing a field (None) or holding values of different types can be
+sorted together.
+"""
+
+import json
+import heapq
+import pickle
+import decimal
+import datetime
+import tempfile
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from events.util import ResultSet
+
+# The number of runs merged at once
+MERGE_FAN_IN = 64
+
+
+def sort_key(value: Any) -> Tuple:
+    """
+    Return a key for value which orders None first, then numbers
+    (including booleans, NaN after every other number), strings,
+    datetimes, dates, bytes and finally anything else by its type name
+    and JSON representation.
+    """
+    if value is None:
+        return (0,)
+    if isinstance(value, (bool, int, float, decimal.Decimal)):
+        if value != value:
+            return (1, 1)
+        return (1, 0, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            # Naive datetimes are taken to be UTC, so they compare with aware ones
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return (3, value)
+    if isinstance(value, datetime.date):
+        return (4, value)
+    if isinstance(value, (bytes, bytearray)):
+        return (5, bytes(value))
+    return (6, type(value).__name__, json.dumps(value, sort_keys=True, default=str))
+
+
+def fields_sort_key(fields: List[str]) -> Callable[[Any], Tuple]:
+    """
+    Return a key function ordering events by the values of fields,
+    in order, see sort_key. Missing fields sort as None.
+    """
+    def key(event):
+        return tuple(sort_key(event.get(field)) for field in fields)
+    return key
+
+
+def top_events(events: Iterable[Any], key: Callable[[Any], Any], reverse: bool = False, number: int = 10) -> List[Any]:
+    """
+    Return the first number events of events sorted by key, holding at
+    most number events in memory. Equivalent to
+    sorted(events, key=key, reverse=reverse)[:number].
+    """
+    if reverse:
+        return ResultSet(heapq.nlargest(number, events, key=key))
+    return ResultSet(heapq.nsmallest(number, events, key=key))
+
+
+def sort_events(events: Iterable[Any], key: Callable[[Any], Any], reverse: bool = False, buffer_size: Optional[int] = None) -> Iterable[Any]:
+    """
+    Sort events by key, like sorted(events, key=key, reverse=reverse).
+
+    If there are at most buffer_size (DELVE_SORT_BUFFER_SIZE by default)
+    events they are sorted in memory and returned as a ResultSet.
+    Otherwise sorted runs of buffer_size events are spilled to temporary
+    files and a generator merging them is returned.
+    """
+    if buffer_size is None:
+        buffer_size = settings.DELVE_SORT_BUFFER_SIZE
+    runs = []
+    buffer = []
+    try:
+        for event in events:
+            buffer.append(event)
+            if len(buffer) >= buffer_size:
+                buffer.sort(key=key, reverse=reverse)
+                runs.append((0, spill((key(event), event) for event in buffer)))
+                buffer = []
+                compact(runs, reverse)
+    except BaseException:
+        close(runs)
+        raise
+    buffer.sort(key=key, reverse=reverse)
+    if not runs:
+        return ResultSet(buffer)
+    return merge_runs(runs, [(key(event), event) for event in buffer], reverse)
+
+
+def spill(pairs: Iterable[Tuple[Any, Any]]):
+    """
+    Write the sorted (key, event) pairs to a new temporary file and
+    return it.
+    """
+    run = tempfile.TemporaryFile()
+    for pair in pairs:
+        pickle.dump(pair, run, protocol=pickle.HIGHEST_PROTOCOL)
+    run.flush()
+    return run
+
+
+def read(run) -> Iterator[Tuple[Any, Any]]:
+    run.seek(0)
+    while True:
+        try:
+            yield pickle.load(run)
+        except EOFError:
+            return
+
+
+def close(runs) -> None:
+    for _, run in runs:
+        run.close()
+
+
+def compact(runs, reverse: bool) -> None:
+    """
+    While the last MERGE_FAN_IN runs are of the same level, merge them
+    into one run of the next level. Runs are kept in input order, so
+    the sort stays stable.
+    """
+    while len(runs) >= MERGE_FAN_IN:
+        group = runs[-MERGE_FAN_IN:]
+        level = group[-1][0]
+        if any(run_level != level for run_level, _ in group):
+            return
+        merged = spill(heapq.merge(*[read(run) for _, run in group], key=itemgetter(0), reverse=reverse))
+        close(group)
+        del runs[-MERGE_FAN_IN:]
+        runs.append((level + 1, merged))
+
+
+def merge_runs(runs, pairs: List[Tuple[Any, Any]], reverse: bool) -> Iterator[Any]:
+    """
+    Yield the events of the spilled runs and the in-memory (key, event)
+    pairs of the last, partial run in order, closing the runs once done.
+    """
+    try:
+        merged = heapq.merge(
+            *[read(run) for _, run in runs],
+            pairs,
+            key=itemgetter(0),
+            reverse=reverse,
+        )
+        for _, event in merged:
+            yield event
+    finally:
+        close(runs)
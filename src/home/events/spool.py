@@ -0,0 +1,318 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""
+A durable spool of ingested events on local disk, the directory named by
+DELVE_INGEST_SPOOL.
+
+The spool is a sequence of segments, files holding one JSON event per
+line. Events are appended to the open segment ({sequence}.open) and
+synced to disk before the request is answered. Requests appending while
+a sync is in progress are synced together by the next one, so a burst
+of requests costs a few fsyncs rather than one each. A segment is sealed
+(renamed to {sequence}.jsonl) when it grows past
+DELVE_INGEST_SPOOL_SEGMENT_SIZE bytes, or by the process writing it, and
+only sealed segments are read back.
+
+Events keep the id they were given when spooled and a segment is only
+removed once its events are committed, so writing a segment skips the
+events already in the table: a crash in between loses nothing and
+writes nothing twice.
+
+With DELVE_INGEST_SPOOL_DRAIN set, requests only append to the spool and
+drain writes the sealed segments in the background. It runs as a
+django_q task, queued when a segment is sealed and scheduled every
+minute (by the writer thread of the ingest queue when it starts), so the
+spool is drained whenever the task cluster is running, including after a
+restart.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, OperationalError
+from django.utils.dateparse import parse_datetime
+
+from events import ingest
+
+OPEN = ".open"
+SEALED = ".jsonl"
+FAILED = ".failed"
+
+
+def event_to_row(event: Any) -> Dict[str, Any]:
+    row = {name: getattr(event, name) for name in ingest.FIELDS}
+    row["id"] = str(event.id)
+    row["created"] = event.created.isoformat()
+    row["user_id"] = event.user_id
+    return row
+
+
+class Spool:
+    """
+    The segments of a spool directory. Only one process may append to a
+    spool, any process may read and remove its sealed segments.
+    """
+    def __init__(self, directory: str, segment_size: int):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.lock = threading.Lock()
+        # Held by the thread syncing the open segment
+        self.sync_lock = threading.Lock()
+        self.file = None
+        self.path = None
+        self.sequence = None
+        # The number of writes, and of writes known to be on disk
+        self.written = 0
+        self.synced = 0
+        # The segments sealed since the last take_sealed
+        self.sealed = []
+
+    def names(self) -> List[str]:
+        try:
+            return sorted(os.listdir(self.directory))
+        except FileNotFoundError:
+            return []
+
+    def segments(self) -> List[str]:
+        """
+        Return the paths of the sealed segments, oldest first.
+        """
+        return [os.path.join(self.directory, name) for name in self.names() if name.endswith(SEALED)]
+
+    def recover(self, age: Optional[float] = None) -> None:
+        """
+        Seal the segments left open by a previous run, which must only be
+        done by the process appending to the spool. Other processes must
+        pass age, to only seal the segments not written to for age
+        seconds, which the process appending to the spool would have
+        sealed if it were running.
+        """
+        for name in self.names():
+            if name.endswith(OPEN):
+                path = os.path.join(self.directory, name)
+                try:
+                    if age is not None and time.time() - os.path.getmtime(path) < age:
+                        continue
+                    os.replace(path, path[:-len(OPEN)] + SEALED)
+                except FileNotFoundError:
+                    # Sealed meanwhile
+                    continue
+
+    def write(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        Append rows to the open segment, without syncing it. Returns a
+        ticket to pass to sync.
+        """
+        data = b"".join(ingest.dumps(row).encode() + b"\n" for row in rows)
+        with self.lock:
+            if self.file is None:
+                if self.sequence is None:
+                    os.makedirs(self.directory, exist_ok=True)
+                    sequences = [int(name.split(".")[0]) for name in self.names() if name.split(".")[0].isdigit()]
+                    self.sequence = max(sequences, default=0) + 1
+                self.path = os.path.join(self.directory, f"{self.sequence:020d}{OPEN}")
+                self.sequence += 1
+                self.file = open(self.path, "ab")
+            self.file.write(data)
+            self.file.flush()
+            self.written += 1
+            ticket = self.written
+            if self.file.tell() >= self.segment_size:
+                self._seal()
+        return ticket
+
+    def sync(self, ticket: int) -> None:
+        """
+        Return once the write of ticket is on disk.
+        """
+        with self.sync_lock:
+            with self.lock:
+                if self.synced >= ticket:
+                    return
+                # Everything written so far is synced by this fsync. The
+                # file may be sealed and closed meanwhile, not the copy.
+                target = self.written
+                descriptor = os.dup(self.file.fileno())
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+            with self.lock:
+                self.synced = max(self.synced, target)
+
+    def append(self, rows: List[Dict[str, Any]]) -> None:
+        self.sync(self.write(rows))
+
+    def seal(self) -> Optional[str]:
+        """
+        Seal the open segment, if any. Returns its new path.
+        """
+        with self.lock:
+            return self._seal()
+
+    def _seal(self) -> Optional[str]:
+        if self.file is None:
+            return None
+        os.fsync(self.file.fileno())
+        self.file.close()
+        path = self.path[:-len(OPEN)] + SEALED
+        os.replace(self.path, path)
+        self.file = self.path = None
+        self.synced = self.written
+        self.sealed.append(path)
+        return path
+
+    def take_sealed(self) -> List[str]:
+        """
+        Return the segments sealed by this Spool since the last call,
+        oldest first.
+        """
+        with self.lock:
+            sealed, self.sealed = self.sealed, []
+        return sealed
+
+    def close(self) -> None:
+        self.seal()
+
+    def read(self, path: str) -> List[Dict[str, Any]]:
+        rows = []
+        with open(path, "rb") as file:
+            for line in file:
+                # The last line of a segment left open by a crash may be
+                # cut short, its request was never answered
+                if line.endswith(b"\n"):
+                    rows.append(ingest.loads(line))
+        return rows
+
+    def remove(self, path: str) -> None:
+        os.remove(path)
+
+    def fail(self, path: str) -> None:
+        # Kept for an admin to look into, but never read again
+        os.replace(path, path + FAILED)
+
+
+def write_segment(model, spool: Spool, path: str) -> int:
+    """
+    Write the events of the segment at path which aren't in the table
+    yet, then remove it. Returns the number of events written.
+    """
+    rows = spool.read(path)
+    ids = [row["id"] for row in rows]
+    existing = set()
+    for start in range(0, len(ids), settings.DELVE_INGEST_BATCH_SIZE):
+        existing.update(
+            str(id) for id in model.objects.filter(
+                id__in=ids[start:start + settings.DELVE_INGEST_BATCH_SIZE],
+            ).values_list("id", flat=True)
+        )
+    events = []
+    for row in rows:
+        if row["id"] in existing:
+            continue
+        # Segments spooled by an older version have no created
+        if "created" in row:
+            row["created"] = parse_datetime(row["created"])
+        events.append(model(**row))
+    if events:
+        ingest.write_events(model, events)
+    spool.remove(path)
+    return len(events)
+
+
+def write_segments(model, spool: Spool, paths: Optional[List[str]] = None) -> int:
+    """
+    Write the segments at paths, by default every sealed segment of
+    spool, oldest first. Returns the number of events written.
+    """
+    log = logging.getLogger(__name__)
+    written = 0
+    for path in spool.segments() if paths is None else paths:
+        try:
+            written += write_segment(model, spool, path)
+        except FileNotFoundError:
+            # Written by another drain
+            continue
+        except (OperationalError, IntegrityError):
+            # ie. the database is locked, or another drain wrote some of
+            # the same events: the next drain picks up from here
+            log.exception(f"Unable to write spool segment {path}, retrying later")
+            break
+        except Exception:
+            log.exception(f"Unable to write spool segment {path}, setting it aside")
+            spool.fail(path)
+    return written
+
+
+def drain() -> int:
+    """
+    The django_q task writing the sealed segments of the spool. Returns
+    the number of events written.
+    """
+    log = logging.getLogger(__name__)
+    spool = get_spool()
+    if spool is None or not settings.DELVE_INGEST_SPOOL_DRAIN:
+        return 0
+    # The writer thread seals its open segment every
+    # DELVE_INGEST_QUEUE_INTERVAL seconds, one older than that was left by
+    # a process which stopped (and may not start again)
+    spool.recover(age=max(60, 10 * settings.DELVE_INGEST_QUEUE_INTERVAL))
+    written = write_segments(apps.get_model("events", "Event"), spool)
+    log.debug(f"Drained {written} events from the ingest spool")
+    return written
+
+
+def schedule_drain() -> None:
+    """
+    Schedule a drain every minute, unless one is scheduled.
+    """
+    from django_q.models import Schedule
+    Schedule.objects.get_or_create(
+        func="events.spool.drain",
+        defaults={
+            "name": "Drain the ingest spool",
+            "schedule_type": Schedule.MINUTES,
+            "minutes": 1,
+            "repeats": -1,
+        },
+    )
+
+
+def queue_drain() -> None:
+    """
+    Queue a drain, rather than waiting for the scheduled one.
+    """
+    from django_q.tasks import async_task
+    async_task("events.spool.drain")
+
+
+_spool = None
+_spool_lock = threading.Lock()
+
+
+def get_spool() -> Optional[Spool]:
+    """
+    Return the Spool of DELVE_INGEST_SPOOL, or None if it isn't set.
+    """
+    global _spool
+    if not settings.DELVE_INGEST_SPOOL:
+        return None
+    with _spool_lock:
+        if _spool is None:
+            _spool = Spool(settings.DELVE_INGEST_SPOOL, settings.DELVE_INGEST_SPOOL_SEGMENT_SIZE)
+        return _spool
+
+
+def reset_spool() -> None:
+    global _spool
+    with _spool_lock:
+        if _spool is not None:
+            _spool.close()
+            _spool = None
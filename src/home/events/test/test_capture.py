@@ -0,0 +1,76 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.capture, and that
+Query.resolve captures the output of each query separately when
+queries run concurrently.
+"""
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+
+from events.capture import capture_output
+from events.models import Query
+
+class CaptureOutputTests(SimpleTestCase):
+    def test_captures_stdout_and_stderr(self):
+        with capture_output() as output:
+            print("out")
+            print("err", file=sys.stderr)
+        self.assertEqual(output.stdout.getvalue(), "out\n")
+        self.assertEqual(output.stderr.getvalue(), "err\n")
+
+    def test_nested(self):
+        with capture_output() as outer:
+            print("outer")
+            with capture_output() as inner:
+                print("inner")
+            print("outer again")
+        self.assertEqual(outer.stdout.getvalue(), "outer\nouter again\n")
+        self.assertEqual(inner.stdout.getvalue(), "inner\n")
+
+    def test_threads_are_isolated(self):
+        barrier = threading.Barrier(8)
+        outputs = {}
+
+        def write(name):
+            with capture_output() as output:
+                for i in range(100):
+                    # Make sure the threads interleave
+                    if i == 50:
+                        barrier.wait(5)
+                    print(name)
+            outputs[name] = output.stdout.getvalue()
+
+        threads = [threading.Thread(target=write, args=(f"thread-{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        for name, output in outputs.items():
+            self.assertEqual(output, f"{name}\n" * 100)
+
+class ConcurrentResolveTests(SimpleTestCase):
+    def resolve(self, i):
+        events = [{"foo": j} for j in range(100)]
+        if i % 2:
+            # argparse prints the error to stderr
+            text = f"sort --bogus-{i}"
+        else:
+            text = f"head -n {i}"
+        return Query(text=text).resolve(request=MagicMock(user=None), events=events)
+
+    def test_stress(self):
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(self.resolve, range(400)))
+        for i, result in enumerate(results):
+            if i % 2:
+                self.assertEqual(len(result), 1)
+                self.assertIn(f"--bogus-{i}", result[0]["stderr"])
+                self.assertEqual(result[0]["stderr"].count("--bogus-"), 1, result[0]["stderr"])
+            else:
+                self.assertEqual(result, [{"foo": j} for j in range(i)][:100])
@@ -0,0 +1,121 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.checkpoints as used by
+events.models.Query.resolve.
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from events.checkpoints import QueryCheckpoints, has_side_effects
+from events.models import (
+    Event,
+    Query,
+    QueryStage,
+)
+from events.search_commands.request import make_request
+from events.search_commands.send_email import send_email
+
+@override_settings(DELVE_CHECKPOINT_TIMEOUT=300)
+class QueryCheckpointsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+        self.request = MagicMock(user=self.user, session=MagicMock(session_key="session"))
+        for i in range(10):
+            Event.objects.create(
+                index="test",
+                sourcetype="json",
+                user=self.user,
+                text=json.dumps({"foo": i}),
+            )
+
+    def resolve(self, text, request=None, **kwargs):
+        return Query(text=text).resolve(request=request or self.request, checkpoints=True, **kwargs)
+
+    def test_resumes_from_longest_prefix(self):
+        results = self.resolve("search index=test | explode extracted_fields | sort foo")
+        self.assertEqual([event["foo"] for event in results], list(range(10)))
+        with self.assertNumQueries(0):
+            results = self.resolve("search index=test | explode extracted_fields | sort -d foo")
+        self.assertEqual([event["foo"] for event in results], list(reversed(range(10))))
+
+    def test_changed_prefix_runs_again(self):
+        self.resolve("search index=test | explode extracted_fields | sort foo")
+        results = self.resolve("search index=test extracted_fields__foo__lt=5 | explode extracted_fields | sort foo")
+        self.assertEqual([event["foo"] for event in results], list(range(5)))
+
+    def test_restored_events_are_unchanged_by_later_stages(self):
+        self.resolve("search index=test | explode extracted_fields | eval bar=foo+1 | sort foo")
+        results = self.resolve("search index=test | explode extracted_fields | sort foo")
+        self.assertNotIn("bar", results[0])
+
+    def test_sessions_are_separate(self):
+        self.resolve("search index=test | explode extracted_fields | sort foo")
+        other_request = MagicMock(user=self.user, session=MagicMock(session_key="other"))
+        with self.assertNumQueries(2):
+            self.resolve("search index=test | explode extracted_fields | sort -d foo", request=other_request)
+
+    def test_no_session(self):
+        request = MagicMock(user=self.user, session=MagicMock(session_key=None))
+        self.assertIsNone(QueryCheckpoints.for_request(request, {}, {}))
+
+    @override_settings(DELVE_CHECKPOINT_TIMEOUT=0)
+    def test_disabled(self):
+        self.resolve("search index=test | explode extracted_fields | sort foo")
+        with self.assertNumQueries(2):
+            self.resolve("search index=test | explode extracted_fields | sort -d foo")
+
+    @override_settings(DELVE_CHECKPOINT_MAX_PER_SESSION=1)
+    def test_max_per_session(self):
+        self.resolve("search index=test | explode extracted_fields | sort foo")
+        # The checkpoint of sort replaces the checkpoint of explode
+        with self.assertNumQueries(2):
+            self.resolve("search index=test | explode extracted_fields | sort -d foo")
+
+    def test_side_effects(self):
+        self.assertFalse(has_side_effects(make_request, ["request", "GET", "https://example.com"]))
+        self.assertTrue(has_side_effects(make_request, ["request", "POST", "https://example.com"]))
+        self.assertTrue(has_side_effects(make_request, ["request", "GET", "https://example.com", "--save-event"]))
+        self.assertTrue(has_side_effects(send_email, ["send_email"]))
+
+    def test_nothing_is_saved_after_side_effects(self):
+        checkpoints = QueryCheckpoints(self.request, {}, {})
+        stage = QueryStage("send_email", send_email, None, ("send_email",))
+        checkpoints.save(stage, ["send_email"], [{"foo": 1}], {})
+        self.assertFalse(checkpoints.enabled)
+        restored = QueryCheckpoints(self.request, {}, {}).restore([stage], {}, lambda stage, context: list(stage.argv))
+        self.assertIsNone(restored)
+
+    def test_new_events_invalidate(self):
+        self.resolve("search index=test | explode extracted_fields | sort foo")
+        Event.objects.create(index="test", sourcetype="json", user=self.user, text=json.dumps({"foo": 10}))
+        results = self.resolve("search index=test | explode extracted_fields | sort -d foo")
+        self.assertEqual([event["foo"] for event in results], list(reversed(range(11))))
+
+    def test_relative_windows_are_bucketed(self):
+        text = "search --last-hour index=test | explode extracted_fields | sort foo"
+        with patch("events.checkpoints.time.time", return_value=3600.0):
+            self.resolve(text)
+        with patch("events.checkpoints.time.time", return_value=3659.0), self.assertNumQueries(0):
+            self.resolve(text)
+        with patch("events.checkpoints.time.time", return_value=3660.0), self.assertNumQueries(2):
+            self.resolve(text)
+
+    def test_uncacheable_stages_are_not_restored(self):
+        checkpoints = QueryCheckpoints(self.request, {}, {})
+        argv = ["request", "GET", "https://example.com"]
+        stage = QueryStage("request GET https://example.com", make_request, None, tuple(argv))
+        checkpoints.save(stage, argv, [{"foo": 1}], {})
+        self.assertFalse(checkpoints.enabled)
+        restored = QueryCheckpoints(self.request, {}, {}).restore([stage], {}, lambda stage, context: list(stage.argv))
+        self.assertIsNone(restored)
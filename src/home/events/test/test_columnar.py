@@ -0,0 +1,146 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the columnar execution of search
+commands, events.columnar, which is only available with NumPy.
+"""
+import math
+import pickle
+import datetime
+from unittest import skipUnless
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+
+from events.columnar import MISSING, ColumnBatch, numpy
+from events.models import Query
+
+START = datetime.datetime(2025, 1, 1, 23, 0, tzinfo=datetime.timezone.utc)
+
+def make_events():
+    events = []
+    for i in range(40):
+        event = {
+            "host": f"web{i % 3}",
+            "status": [200, 404, 500][i % 3 if i % 7 else 0],
+            "bytes": i * 10 if i % 5 else None,
+            "latency": i / 4,
+            "created": START + datetime.timedelta(minutes=i),
+        }
+        if i % 11 == 0:
+            del event["bytes"]
+        events.append(event)
+    events[3]["latency"] = float("nan")
+    return events
+
+@skipUnless(numpy is not None, "NumPy is not installed")
+class ColumnBatchTests(TestCase):
+    def test_round_trip(self) -> None:
+        events = [{"a": 1, "b": "x"}, {"b": "y"}, {"a": None, "c": [1]}]
+        batch = ColumnBatch.from_events(events)
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(list(batch), events)
+        self.assertEqual(batch.column("a"), [1, MISSING, None])
+        self.assertEqual(list(pickle.loads(pickle.dumps(batch))), events)
+        self.assertIsNone(ColumnBatch.from_events([{"a": 1}, "text"]))
+
+    def test_numeric(self) -> None:
+        batch = ColumnBatch.from_events([{"a": 1, "b": 1.5, "c": True, "d": "1"}, {"a": None, "b": 2}])
+        values, valid, integer = batch.numeric("a")
+        self.assertEqual(valid.tolist(), [True, False])
+        self.assertEqual(values[0], 1)
+        self.assertTrue(integer)
+        self.assertFalse(batch.numeric("b")[2])
+        self.assertIsNone(batch.numeric("c"))
+        self.assertIsNone(batch.numeric("d"))
+        self.assertIsNone(ColumnBatch.from_events([{"a": 2 ** 60}]).numeric("a"))
+
+    def test_with_column(self) -> None:
+        batch = ColumnBatch.from_events([{"a": 1}, {"a": 2, "sum": 0}])
+        self.assertEqual(
+            list(batch.with_column("sum", [3, 3])),
+            [{"sum": 3, "a": 1}, {"sum": 0, "a": 2}],
+        )
+
+
+@skipUnless(numpy is not None, "NumPy is not installed")
+class ColumnarCommandTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+
+    def resolve(self, text, events=None):
+        return Query(text=text).resolve(request=MagicMock(user=self.user), events=events or make_events())
+
+    def assertSameAsRows(self, text, events=None):
+        columnar = self.resolve(text, events)
+        with override_settings(DELVE_COLUMNAR=False):
+            rows = self.resolve(text, events)
+        self.assertNotIn("exception", columnar[0] if isinstance(columnar, list) and columnar else {}, text)
+        self.assertEqual(len(columnar), len(rows), text)
+        for expected, actual in zip(rows, columnar):
+            if isinstance(expected, dict):
+                self.assertEqual(set(actual), set(expected), text)
+                for key, value in expected.items():
+                    if isinstance(value, float) and math.isnan(value):
+                        self.assertTrue(math.isnan(actual[key]), text)
+                    elif isinstance(value, float):
+                        self.assertAlmostEqual(actual[key], value, msg=text)
+                    else:
+                        self.assertEqual(actual[key], value, text)
+            else:
+                self.assertEqual(actual, expected, text)
+        return columnar
+
+    def test_stats(self) -> None:
+        for function in ("sum", "avg", "min", "max", "stdev"):
+            for options in ("", "--by host", "--by host status", "--per-group", "--by status --per-group"):
+                for field in ("bytes", "latency", "status"):
+                    self.assertSameAsRows(f"stats {function} {field} {options}")
+
+    def test_sort(self) -> None:
+        for fields in ("bytes", "latency", "status bytes", "-d status bytes", "-d latency"):
+            self.assertSameAsRows(f"sort {fields}")
+
+    def test_filter_after_columnar_stage(self) -> None:
+        for terms in (
+            "avg__gt=150",
+            "avg__gte=150 AND NOT host=web0",
+            "bytes=100 OR bytes!=200",
+            "!avg__lt=100",
+        ):
+            self.assertSameAsRows(f"stats avg bytes --by host | sort -d avg | filter {terms}")
+
+    def test_fallback(self) -> None:
+        """Fields holding anything but numbers are processed as events."""
+        events = make_events()
+        events[5]["bytes"] = "50"
+        self.assertSameAsRows("stats max bytes --by host", events)
+        self.assertSameAsRows("sort bytes", events)
+        self.assertSameAsRows("stats max latency --by host | filter host=web1")
+
+    def test_columns_are_passed_between_stages(self) -> None:
+        from_events = ColumnBatch.from_events
+        with patch.object(ColumnBatch, "from_events", side_effect=from_events) as conversions:
+            results = self.resolve("stats avg bytes --by host | sort -d avg bytes | filter avg__gt=0 | head -n 5")
+        self.assertEqual(conversions.call_count, 1)
+        self.assertEqual(len(results), 5)
+
+    def test_timechart(self) -> None:
+        for text in (
+            "timechart --span 10m",
+            "timechart --span 10m --by host",
+            "timechart --span 1h --function avg bytes --by status",
+            "timechart --span 10m --function max bytes",
+            "timechart --span 10m --function count bytes",
+        ):
+            self.assertEqual(self.resolve(text), self.resolve_rows(text), text)
+
+    def resolve_rows(self, text):
+        with override_settings(DELVE_COLUMNAR=False):
+            return self.resolve(text)
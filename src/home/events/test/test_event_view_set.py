@@ -223,3 +223,59 @@ class EventViewsetTests(APITestCase):
             # self.assertEqual(response_json['extracted_fields']['foo'], 'bar')
         self.client.logout()
 
+
+    def test_bulk_create_events(self):
+        """Ensure the events of a JSON array posted to the bulk endpoint
+        are created, with their fields extracted, in one request.
+        """
+        url = reverse('event-bulk')
+        data = [
+            {
+                'index': 'test' if i % 2 else 'other',
+                'host': '127.0.0.1',
+                'source': 'system',
+                'sourcetype': 'json',
+                'text': f'{{"reading": {2*i}}}',
+                'ignored': True,
+            }
+            for i in range(25)
+        ]
+        self.client.login(username='testadmin', password='testadmin')
+        with self.settings(DELVE_ENABLE_EXTRACTIONS_ON_CREATE=True, DELVE_INGEST_BATCH_SIZE=10):
+            response = self.client.post(url, data, format="json")
+        self.client.logout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.json(), {"created": 25})
+        self.assertEqual(Event.objects.count(), 25)
+        self.assertEqual(Event.objects.filter(index='test').count(), 12)
+        self.assertEqual(
+            sorted(event.extracted_fields['reading'] for event in Event.objects.all()),
+            [2*i for i in range(25)],
+        )
+        self.assertEqual({event.user for event in Event.objects.all()}, {self.user})
+        # UUIDv7 ids are ordered by creation time
+        self.assertEqual(Event.objects.order_by('id').first().extracted_fields['reading'], 0)
+
+    def test_bulk_create_invalid_events(self):
+        """Ensure a bulk request with an invalid event creates nothing
+        and names the invalid event.
+        """
+        url = reverse('event-bulk')
+        self.client.login(username='testadmin', password='testadmin')
+        for data, message in [
+            ([{'text': 'ok'}, {'index': 'test'}], 'Event 1: text is required'),
+            ([{'text': 'ok'}, {'text': 'ok', 'host': 1}], 'Event 1: host must be a str'),
+            ([{'text': 'ok', 'index': 'x' * 256}], 'Event 0: index must be at most 255 characters'),
+            ('not events', 'Expected a JSON array of events'),
+        ]:
+            response = self.client.post(url, data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+            self.assertEqual(response.json()['detail'], message)
+        response = self.client.post(url, '[{"text": ', content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('Invalid JSON', response.json()['detail'])
+        self.client.logout()
+        self.assertEqual(Event.objects.count(), 0)
+        response = self.client.post(url, [{'text': 'ok'}], format="json")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(Event.objects.count(), 0)
@@ -0,0 +1,145 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the ingest pipeline, located at
+events.ingest.
+"""
+import csv
+import io
+import os
+from unittest.mock import MagicMock, patch
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from events import ingest
+from events.models import Event
+
+CALLS = []
+
+def counting(text):
+    CALLS.append(text)
+    return {"length": len(text)}
+
+def counting_batch(texts):
+    CALLS.append(list(texts))
+    return [{"length": len(text)} for text in texts]
+
+def batched(text):
+    raise AssertionError("The batch API should be used")
+batched.batch = counting_batch
+
+def worker(text):
+    return {"length": len(text), "pid": os.getpid()}
+
+def mark(event):
+    event.extracted_fields["processed"] = event.extracted_fields.get("processed", 0) + 1
+
+@override_settings(
+    DELVE_EXTRACTION_MAP={
+        "counted": "events.test.test_ingest.counting",
+        "batched": batched,
+        "parallel": "events.test.test_ingest.worker",
+        "unpicklable": lambda text: {"pid": os.getpid()},
+    },
+    DELVE_PROCESSOR_MAP={"counted": mark},
+    DELVE_ENABLE_EXTRACTIONS_ON_CREATE=True,
+    DELVE_ENABLE_PROCESSORSS_ON_CREATE=True,
+    DELVE_ENABLE_EXTRACTIONS_ON_UPDATE=True,
+    DELVE_ENABLE_PROCESSORSS_ON_UPDATE=True,
+)
+class IngestTests(APITestCase):
+    def setUp(self, *args, **kwargs):
+        CALLS.clear()
+        self.user = get_user_model().objects.create_user(
+            username='testadmin',
+            email='testadmin@test.com',
+            password='testadmin',
+        )
+        self.client.login(username='testadmin', password='testadmin')
+        super().setUp(*args, **kwargs)
+
+    def test_events_are_processed_exactly_once(self):
+        data = {'index': 'test', 'sourcetype': 'counted', 'text': 'one'}
+        response = self.client.post(reverse('event-list'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('event-list'), [data, data], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(reverse('event-bulk'), [data, data], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        Event.objects.create(user=self.user, **data)
+        self.assertEqual(len(CALLS), 6)
+        for event in Event.objects.all():
+            self.assertEqual(event.extracted_fields, {"length": 3, "processed": 1})
+
+        CALLS.clear()
+        event = Event.objects.first()
+        response = self.client.patch(reverse('event-detail', args=[event.id]), {'text': 'three'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(CALLS, ['three'])
+        event.refresh_from_db()
+        self.assertEqual(event.extracted_fields, {"length": 5, "processed": 2})
+
+    def test_functions_are_imported_once(self):
+        ingest.clear_dispatch_tables()
+        data = [{'sourcetype': 'counted', 'text': str(i)} for i in range(20)]
+        with patch("events.ingest.import_string", side_effect=ingest.import_string) as import_string:
+            self.client.post(reverse('event-bulk'), data, format='json')
+            self.client.post(reverse('event-list'), data, format='json')
+        self.assertEqual(import_string.call_count, 1)
+        self.assertEqual(len(CALLS), 40)
+
+    def test_batch_api(self):
+        data = [{'sourcetype': 'batched', 'text': 'x' * i} for i in range(1, 6)]
+        data.append({'sourcetype': 'counted', 'text': 'counted'})
+        response = self.client.post(reverse('event-bulk'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(CALLS, [['x', 'xx', 'xxx', 'xxxx', 'xxxxx'], 'counted'])
+        self.assertEqual(
+            sorted(event.extracted_fields["length"] for event in Event.objects.filter(sourcetype='batched')),
+            [1, 2, 3, 4, 5],
+        )
+
+    @override_settings(DELVE_INGEST_WORKERS=2, DELVE_INGEST_PARALLEL_THRESHOLD=10)
+    def test_parallel_extraction(self):
+        data = [{'sourcetype': 'parallel', 'text': 'x' * i} for i in range(1, 51)]
+        data += [{'sourcetype': 'unpicklable', 'text': 'x'} for i in range(20)]
+        data += [{'sourcetype': 'counted', 'text': 'x'} for i in range(5)]
+        response = self.client.post(reverse('event-bulk'), data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        events = Event.objects.filter(sourcetype='parallel')
+        self.assertEqual(
+            sorted((event.text, event.extracted_fields["length"]) for event in events),
+            sorted((row['text'], len(row['text'])) for row in data[:50]),
+        )
+        self.assertNotIn(os.getpid(), {event.extracted_fields["pid"] for event in events})
+        events = Event.objects.filter(sourcetype='unpicklable')
+        self.assertEqual({event.extracted_fields["pid"] for event in events}, {os.getpid()})
+        # Below the threshold
+        self.assertEqual(len(CALLS), 5)
+
+    def test_blank_text(self):
+        """A blank text is rejected, as by the serializer."""
+        with self.assertRaises(ValueError):
+            ingest.validate([{"text": "event"}, {"text": " "}])
+        response = self.client.post(reverse('event-bulk'), [{'text': ''}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Event.objects.count(), 0)
+
+    def test_copy_quotes_every_value(self):
+        """COPY reads an unquoted empty value in CSV as NULL."""
+        events = ingest.build_events(Event, [{"text": "event", "host": ""}], self.user)
+        connection = MagicMock()
+        connection.ops.quote_name.side_effect = lambda name: f'"{name}"'
+        raw = connection.cursor.return_value.__enter__.return_value.cursor
+        raw.copy_expert.side_effect = lambda sql, buffer: buffers.append(buffer.getvalue())
+        buffers = []
+        ingest.copy_events(connection, Event, events)
+        [row] = csv.reader(io.StringIO(buffers[0]))
+        self.assertEqual(row[ingest.COPY_COLUMNS.index("host")], "")
+        self.assertIn(',"",', buffers[0])
@@ -0,0 +1,156 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the ingest queue, located at
+events.ingest_queue.
+"""
+import os
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import TransactionTestCase, override_settings
+
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from events import ingest
+from events.ingest_queue import IngestQueue, get_queue
+from events.spool import Spool, event_to_row
+from events.models import Event
+
+
+class IngestQueueTests(APITestCase):
+    def setUp(self, *args, **kwargs):
+        self.user = get_user_model().objects.create_user(
+            username='testadmin',
+            email='testadmin@test.com',
+            password='testadmin',
+        )
+        self.client.login(username='testadmin', password='testadmin')
+        self.directory = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.directory.name, "spool")
+        super().setUp(*args, **kwargs)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def build(self, count, text="event"):
+        return ingest.build_events(Event, [{"text": f"{text} {i}"} for i in range(count)], self.user)
+
+    def test_group_commit(self):
+        queue = IngestQueue(Event, 3600, Spool(self.spool, 2 ** 20))
+        threads = [threading.Thread(target=queue.put, args=(self.build(20),)) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(Event.objects.count(), 0)
+        [name] = os.listdir(self.spool)
+        with open(os.path.join(self.spool, name)) as file:
+            self.assertEqual(len(file.readlines()), 100)
+        with patch("events.ingest.write_events", side_effect=ingest.write_events) as write_events:
+            self.assertEqual(queue.flush(), 100)
+            self.assertEqual(queue.flush(), 0)
+        self.assertEqual(write_events.call_count, 1)
+        self.assertEqual(Event.objects.count(), 100)
+        self.assertEqual(os.listdir(self.spool), [])
+        queue.stop()
+
+    def test_locked_database(self):
+        queue = IngestQueue(Event, 3600, Spool(self.spool, 2 ** 20))
+        queue.put(self.build(3))
+        with patch("events.ingest.write_events", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                queue.flush()
+        queue.put(self.build(2))
+        self.assertEqual(queue.flush(), 5)
+        self.assertEqual(Event.objects.count(), 5)
+        self.assertEqual(os.listdir(self.spool), [])
+        queue.stop()
+
+    def test_recover(self):
+        """Events left in the spool are written once on the next start."""
+        # A run which crashed before writing
+        spool = Spool(self.spool, 2 ** 20)
+        events = self.build(10)
+        spool.append([event_to_row(event) for event in events[:6]])
+        spool.seal()
+        spool.append([event_to_row(event) for event in events[6:]])
+        spool.file.write(b'{"text": "cut sh')
+        spool.file.close()
+        # Written before the crash, but still in the spool
+        ingest.write_events(Event, events[:4])
+        queue = IngestQueue(Event, 3600, Spool(self.spool, 2 ** 20))
+        queue.start()
+        self.assertEqual(queue.flush(), 0)
+        queue.stop()
+        self.assertEqual(
+            sorted(Event.objects.values_list("text", flat=True)),
+            sorted(event.text for event in events),
+        )
+        self.assertEqual(os.listdir(self.spool), [])
+
+    def test_recover_after_failure(self):
+        """Events left in the spool are kept until they are written."""
+        spool = Spool(self.spool, 2 ** 20)
+        spool.append([event_to_row(event) for event in self.build(1, "left")])
+        spool.file.close()
+        queue = IngestQueue(Event, 3600, Spool(self.spool, 2 ** 20))
+        queue.put(self.build(1, "new"))
+        with patch("events.spool.write_segment", side_effect=OperationalError("database is locked")):
+            self.assertEqual(queue.flush(), 1)
+        self.assertEqual(list(Event.objects.values_list("text", flat=True)), ["new 0"])
+        self.assertEqual(len(os.listdir(self.spool)), 1)
+        self.assertEqual(queue.flush(), 0)
+        self.assertEqual(sorted(Event.objects.values_list("text", flat=True)), ["left 0", "new 0"])
+        self.assertEqual(os.listdir(self.spool), [])
+        queue.stop()
+
+    def test_requires_spool(self):
+        with self.assertRaises(ImproperlyConfigured):
+            IngestQueue(Event, 3600, None)
+
+    def test_bulk_endpoint(self):
+        with override_settings(
+            DELVE_INGEST_QUEUE=True,
+            DELVE_INGEST_QUEUE_INTERVAL=3600,
+            DELVE_INGEST_SPOOL=self.spool,
+        ):
+            data = [{'text': f'event {i}', 'index': 'queued'} for i in range(5)]
+            response = self.client.post(reverse('event-bulk'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data, {"queued": 5})
+            self.assertEqual(Event.objects.count(), 0)
+            response = self.client.post(reverse('event-bulk'), [{'index': 'queued'}], format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            response = self.client.post(reverse('event-list'), {'text': 'single', 'index': 'queued'}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data, {"queued": 1})
+            self.assertEqual(get_queue(Event).flush(), 6)
+        self.assertEqual(Event.objects.filter(index='queued', user=self.user).count(), 6)
+
+
+class IngestQueueThreadTests(TransactionTestCase):
+    def test_writer_thread(self):
+        user = get_user_model().objects.create_user(username='testuser', password='testuser')
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        queue = IngestQueue(Event, 0.05, Spool(os.path.join(directory.name, "spool"), 2 ** 20))
+        queue.put(ingest.build_events(Event, [{"text": "first"}], user))
+        queue.put(ingest.build_events(Event, [{"text": "second"}], user))
+        deadline = time.monotonic() + 10
+        while Event.objects.count() < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(Event.objects.count(), 2)
+        queue.put(ingest.build_events(Event, [{"text": "last"}], user))
+        queue.stop()
+        self.assertFalse(queue.thread.is_alive())
+        self.assertEqual(Event.objects.count(), 3)
@@ -0,0 +1,87 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.profiling.QueryProfiler
+as used by events.models.Query.resolve.
+"""
+import json
+import tracemalloc
+from unittest.mock import MagicMock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from events.models import (
+    Event,
+    Query,
+)
+from events.profiling import QueryProfiler
+
+class QueryProfilerTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+        for i in range(10):
+            event = Event.objects.create(
+                index="test",
+                sourcetype="json",
+                user=self.user,
+                text=json.dumps({"foo": i}),
+            )
+            event.extract_fields()
+            event.save()
+
+    def test_profile_records_each_stage(self):
+        profiler = QueryProfiler()
+        results = Query(text="search index=test | explode extracted_fields | filter foo__gte=5 | head -n 3").resolve(
+            request=MagicMock(user=self.user),
+            profiler=profiler,
+        )
+        self.assertEqual(len(results), 3)
+        report = profiler.report()
+        self.assertEqual(
+            [stage["stage"].strip() for stage in report],
+            ["search index=test", "explode extracted_fields", "filter foo__gte=5", "head -n 3", "resolve"],
+        )
+        search, explode, filter, head, resolve = report
+        # The QuerySet returned by search is run by explode, so its SQL
+        # is attributed to explode.
+        self.assertEqual(search["rows_out"], None)
+        self.assertFalse(any("events_event" in query["sql"] for query in search["queries"]))
+        self.assertTrue(any("events_event" in query["sql"] for query in explode["queries"]))
+        # Streaming stops once head has three events
+        self.assertEqual(filter["rows_in"], 8)
+        self.assertEqual(filter["rows_out"], 3)
+        self.assertEqual(head["rows_in"], 3)
+        self.assertEqual(head["rows_out"], 3)
+        self.assertEqual(resolve["rows_out"], 3)
+        for stage in report:
+            self.assertGreaterEqual(stage["wall_time"], 0)
+            self.assertGreaterEqual(stage["peak_memory"], 0)
+
+    def test_pushed_down_stages_are_marked(self):
+        profiler = QueryProfiler()
+        results = Query(text="search index=test | head -n 2").resolve(
+            request=MagicMock(user=self.user),
+            profiler=profiler,
+        )
+        self.assertEqual(len(results), 2)
+        search, head, resolve = profiler.report()
+        self.assertTrue(head["pushed_down"])
+        self.assertEqual(len(resolve["queries"]), 1)
+        self.assertIn("LIMIT", resolve["queries"][0]["sql"])
+
+    def test_tracing_is_shared_by_concurrent_profilers(self):
+        """Tracing stops when the last active profiler exits."""
+        first = QueryProfiler().__enter__()
+        second = QueryProfiler().__enter__()
+        self.assertTrue(tracemalloc.is_tracing())
+        # The first request finishes while the second is still running
+        first.__exit__(None, None, None)
+        self.assertTrue(tracemalloc.is_tracing())
+        second.__exit__(None, None, None)
+        self.assertFalse(tracemalloc.is_tracing())
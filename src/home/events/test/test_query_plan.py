@@ -0,0 +1,76 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the query plan cache,
+located at events.models.compile_query_plan.
+"""
+from unittest.mock import MagicMock
+
+from django.test import TestCase, override_settings
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from events.models import (
+    Query,
+    compile_query_plan,
+)
+
+class QueryPlanTests(TestCase):
+    def setUp(self) -> None:
+        compile_query_plan.cache_clear()
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+
+    def test_plan_is_cached_by_text(self) -> None:
+        """Resolving the same text twice should reuse the compiled plan."""
+        query = Query(text="echo foo | head -n 1")
+        self.assertIs(query.get_query_plan(), Query(text="echo foo | head -n 1").get_query_plan())
+        self.assertEqual(compile_query_plan.cache_info().hits, 1)
+
+    def test_untemplated_stages_skip_jinja(self) -> None:
+        """Stages without template markers carry their argv and no template."""
+        plan = compile_query_plan("set foo=bar | echo {{ foo }}")
+        self.assertIsNone(plan[0].template)
+        self.assertEqual(plan[0].argv, ("set", "foo=bar"))
+        self.assertIsNotNone(plan[1].template)
+        self.assertIsNone(plan[1].argv)
+
+    def test_templated_stage_is_rendered_with_context_and_globals(self) -> None:
+        """Templated stages are rendered with the local context taking
+        precedence over the user's global context.
+        """
+        self.user.global_context.context = {"foo": "global", "bar": "global"}
+        self.user.global_context.save()
+        query = Query(text="echo {{ foo }} {{ bar }}")
+        results = query.resolve(
+            request=MagicMock(user=self.user),
+            context={"foo": "local"},
+        )
+        self.assertEqual(
+            [result["expression"] for result in results],
+            ["local", "global"],
+        )
+
+    def test_argv_is_not_shared_between_executions(self) -> None:
+        """Commands mutate argv, the cached argv must not be affected."""
+        query = Query(text="search index=test | head -n 1")
+        query.resolve(request=MagicMock(user=self.user))
+        self.assertEqual(query.get_query_plan()[1].argv, ("head", "-n", "1"))
+        results = query.resolve(request=MagicMock(user=self.user))
+        self.assertEqual(results, [])
+
+    def test_unknown_search_command(self) -> None:
+        with self.assertRaises(ValueError):
+            compile_query_plan("not_a_command foo")
+
+    def test_plan_cache_cleared_when_search_commands_change(self) -> None:
+        compile_query_plan("echo foo")
+        commands = {**settings.DELVE_SEARCH_COMMANDS}
+        commands.pop("echo")
+        with override_settings(DELVE_SEARCH_COMMANDS=commands):
+            with self.assertRaises(ValueError):
+                compile_query_plan("echo foo")
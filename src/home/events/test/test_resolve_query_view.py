@@ -88,6 +88,42 @@ class ResolveQueryViewTests(APITestCase):
         # This view does not save the queries by default
         self.assertEqual(Query.objects.count(), 0)
 
+    def test_profile_is_returned_alongside_results(self):
+        event_list_url = reverse('event-list')
+        query_list_url = reverse('api_query')
+        event_data = {
+            'index': 'default',
+            'host': '127.0.0.1',
+            'source': 'system',
+            'sourcetype': 'json',
+            'text': '{"foo": "bar"}',
+        }
+        self.client.login(username='testadmin', password='testadmin')
+        self.client.post(
+            event_list_url,
+            data=event_data,
+        )
+        query_response = self.client.post(
+            query_list_url,
+            data={
+                'name': 'test-001',
+                'text': 'search | rex text "(?P<key>\\w+)" | head -n 1',
+                'profile': 'true',
+            },
+        )
+        self.client.logout()
+        self.assertEqual(query_response.status_code, status.HTTP_200_OK)
+        response_json = query_response.json()
+        self.assertEqual(len(response_json['results']), 1)
+        self.assertEqual(response_json['results'][0]['key'], 'foo')
+        self.assertEqual(
+            [stage['stage'].strip() for stage in response_json['profile']],
+            ['search', 'rex text "(?P<key>\\w+)"', 'head -n 1', 'resolve'],
+        )
+        for stage in response_json['profile']:
+            for key in ('wall_time', 'cpu_time', 'rows_in', 'rows_out', 'peak_memory', 'queries'):
+                self.assertIn(key, stage)
+
     # def test_cannot_retrieve_other_users_events_through_query(self):
     #     query_url = reverse('api_query')
     #     query_data = {
@@ -0,0 +1,137 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.result_cache as used by
+events.models.Query.resolve.
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from events import result_cache
+from events.models import (
+    Event,
+    Query,
+)
+
+@override_settings(DELVE_RESULT_CACHE_TIMEOUT=300)
+class ResultCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+        self.request = MagicMock(user=self.user)
+        for i in range(10):
+            self.create_event("test", i)
+
+    def create_event(self, index, value):
+        # Fields are extracted by the pre_save signal, saving again
+        # would be an update.
+        return Event.objects.create(
+            index=index,
+            sourcetype="json",
+            user=self.user,
+            text=json.dumps({"foo": value}),
+        )
+
+    def resolve(self, text, **kwargs):
+        return Query(text=text).resolve(request=self.request, **kwargs)
+
+    def get_key(self, text, context=None, request=None):
+        request = request or self.request
+        query = Query(text=text)
+        environment_globals, context = query.get_environment(request, context)
+        return result_cache.get_key(query, request, context, environment_globals)
+
+    def test_repeated_query_is_served_from_cache(self):
+        results = self.resolve("search index=test | stats count")
+        self.assertEqual(results, 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolve("search index=test | stats count"), results)
+
+    @override_settings(DELVE_RESULT_CACHE_TIMEOUT=0)
+    def test_cache_disabled(self):
+        self.resolve("search index=test | stats count")
+        with patch("events.result_cache.get_key") as get_key:
+            self.resolve("search index=test | stats count")
+        get_key.assert_not_called()
+
+    def test_new_event_in_index_invalidates(self):
+        self.assertEqual(self.resolve("search index=test | stats count"), 10)
+        self.create_event("test", 10)
+        self.assertEqual(self.resolve("search index=test | stats count"), 11)
+
+    def test_new_event_in_other_index_does_not_invalidate(self):
+        self.resolve("search index=test | stats count")
+        self.resolve("search | stats count")
+        self.create_event("other", 10)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.resolve("search index=test | stats count"), 10)
+        # A search of every index can contain the new event
+        self.assertEqual(self.resolve("search | stats count"), 11)
+
+    def test_delete_invalidates(self):
+        self.assertEqual(self.resolve("search index=test | stats count"), 10)
+        Event.objects.filter(index="test").first().delete()
+        self.assertEqual(self.resolve("search index=test | stats count"), 9)
+
+    def test_update_invalidates(self):
+        self.assertEqual(self.resolve("search index=test | stats count"), 10)
+        event = Event.objects.filter(index="test").first()
+        event.index = "other"
+        event.save()
+        self.assertEqual(self.resolve("search index=test | stats count"), 9)
+
+    def test_get_indexes(self):
+        self.assertEqual(result_cache.get_indexes(["index=test", "host=web"]), {"test"})
+        self.assertEqual(result_cache.get_indexes(["index__in=['a', 'b']"]), {"a", "b"})
+        self.assertEqual(result_cache.get_indexes(["index__in=['a', 'b']", "index=a"]), {"a"})
+        self.assertIsNone(result_cache.get_indexes(["host=web"]))
+        self.assertIsNone(result_cache.get_indexes(["!index=test"]))
+        self.assertIsNone(result_cache.get_indexes(["index__startswith=te"]))
+
+    def test_uncacheable_commands_are_not_cached(self):
+        self.assertIsNone(self.get_key("search index=test | read_file test.log"))
+        self.assertIsNone(self.get_key("search index=test | sql_query \"select 1\""))
+        # They write to the environment, which a cached result would skip
+        self.assertIsNone(self.get_key("search index=test | set foo=bar"))
+        self.assertIsNone(self.get_key("search index=test | events_to_context"))
+
+    def test_key_depends_on_user_and_context(self):
+        text = "search index={{ index }} | stats count"
+        key = self.get_key(text, context={"index": "test"})
+        self.assertIsNotNone(key)
+        self.assertEqual(key, self.get_key(text, context={"index": "test"}))
+        self.assertNotEqual(key, self.get_key(text, context={"index": "other"}))
+        other_user = get_user_model().objects.create_user(
+            username='otheruser',
+            email='otheruser@test.com',
+            password='otheruser',
+        )
+        self.assertNotEqual(
+            key,
+            self.get_key(text, context={"index": "test"}, request=MagicMock(user=other_user)),
+        )
+
+    def test_relative_windows_are_bucketed(self):
+        with patch("events.result_cache.time.time", return_value=3600.0):
+            key = self.get_key("search --last-hour index=test")
+            absolute = self.get_key("search index=test")
+        with patch("events.result_cache.time.time", return_value=3659.0):
+            self.assertEqual(key, self.get_key("search --last-hour index=test"))
+        with patch("events.result_cache.time.time", return_value=3660.0):
+            self.assertNotEqual(key, self.get_key("search --last-hour index=test"))
+            self.assertEqual(absolute, self.get_key("search index=test"))
+
+    def test_errors_are_not_cached(self):
+        key = self.get_key("search index=test | stats count --by")
+        results = self.resolve("search index=test | stats count --by")
+        self.assertIn("exception", results[0])
+        self.assertIsNone(cache.get(key))
@@ -0,0 +1,74 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.util.ResultSet and
+events.util.resolve.
+"""
+import datetime
+from unittest.mock import MagicMock
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from events.models import Query
+from events.util import ResultSet, resolve, user_tz
+
+class ResultSetTests(SimpleTestCase):
+    def events(self):
+        return [
+            {"a": 1, "b": 2},
+            {"c": 3},
+            {"b": 4, "d": 5},
+        ]
+
+    def test_resolve_does_not_fill(self):
+        events = resolve(self.events())
+        self.assertIsInstance(events, ResultSet)
+        self.assertEqual(events, self.events())
+
+    def test_resolve_generator(self):
+        events = resolve(event for event in self.events())
+        self.assertIsInstance(events, ResultSet)
+        self.assertEqual(events, self.events())
+
+    def test_columns(self):
+        self.assertEqual(ResultSet(self.events()).columns, ["a", "b", "c", "d"])
+        self.assertEqual(ResultSet([]).columns, [])
+
+    def test_fill(self):
+        events = resolve(self.events(), fill=True)
+        self.assertEqual(
+            events,
+            [
+                {"a": 1, "b": 2, "c": None, "d": None},
+                {"a": None, "b": None, "c": 3, "d": None},
+                {"a": None, "b": 4, "c": None, "d": 5},
+            ],
+        )
+
+    def test_fill_sees_changed_events(self):
+        events = ResultSet(self.events())
+        self.assertEqual(events.columns, ["a", "b", "c", "d"])
+        events[0]["e"] = 6
+        events.fill()
+        self.assertIsNone(events[1]["e"])
+
+    def test_fill_localizes_datetimes(self):
+        created = datetime.datetime(2025, 1, 1, tzinfo=datetime.timezone.utc)
+        events = resolve([{"created": created}], fill=True)
+        self.assertEqual(events[0]["created"], created)
+        self.assertEqual(events[0]["created"].tzinfo.zone, user_tz.zone)
+
+    def test_query_output_is_filled(self):
+        events = Query(text="head -n 3").resolve(request=MagicMock(user=None), events=self.events())
+        self.assertEqual(len(events), 3)
+        for event in events:
+            self.assertEqual(set(event), {"a", "b", "c", "d"})
+
+    def test_table_uses_every_column(self):
+        table = Query(text="table").resolve(request=MagicMock(user=None), events=self.events())
+        self.assertEqual(
+            [column["title"] for column in table["columns"]],
+            ["a", "b", "c", "d"],
+        )
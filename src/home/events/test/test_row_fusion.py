@@ -0,0 +1,92 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the fusion of consecutive
+row-wise stages by events.models.Query.resolve.
+"""
+import json
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from events import models
+from events.models import Event, Query
+from events.profiling import QueryProfiler
+
+PIPELINE = (
+    "search index=test"
+    " | rex --field text \"(?P<method>GET||POST) (?P<path>\\S+) (?P<status>\\d+)\""
+    " | autocast status"
+    " | eval kind=web source_field=$path"
+    " | rename --from-field path --to-field url"
+    " | filter status__gte=400 OR method=POST"
+    " | drop_fields kind"
+    " | select host url status method source_field"
+)
+
+class RowFusionTests(TestCase):
+    def setUp(self) -> None:
+        self.user = get_user_model().objects.create_user(
+            username='testuser',
+            email='testuser@test.com',
+            password='testuser',
+        )
+        for i in range(20):
+            Event.objects.create(
+                index="test",
+                host=f"web{i % 2}",
+                sourcetype="access",
+                user=self.user,
+                text=f"{'POST' if i % 5 == 0 else 'GET'} /page/{i} {404 if i % 3 == 0 else 200}",
+            )
+
+    def resolve(self, text, **kwargs):
+        return Query(text=text).resolve(request=MagicMock(user=self.user), **kwargs)
+
+    def test_consecutive_row_wise_stages_are_fused(self) -> None:
+        """The seven row-wise stages run as one pass over the events."""
+        calls = []
+        apply_row_functions = models.apply_row_functions
+        def spy(events, functions):
+            calls.append(len(functions))
+            return apply_row_functions(events, functions)
+        with patch("events.models.apply_row_functions", spy):
+            results = self.resolve(PIPELINE)
+        self.assertEqual(calls, [1, 2, 3, 4, 5, 6, 7])
+        expected = [
+            i for i in range(20) if i % 3 == 0 or i % 5 == 0
+        ]
+        self.assertEqual(sorted(int(result["url"].split("/")[-1]) for result in results), expected)
+        for result in results:
+            self.assertEqual(set(result), {"host", "url", "status", "method", "source_field"})
+            self.assertEqual(result["url"], result["source_field"])
+            self.assertIsInstance(result["status"], int)
+
+    def test_fused_result_matches_separate_stages(self) -> None:
+        """Profiled queries run each stage separately, with the same result."""
+        fused = self.resolve(PIPELINE)
+        separate = self.resolve(PIPELINE, profiler=QueryProfiler())
+        self.assertEqual(list(fused), list(separate))
+
+    def test_chain_is_broken_by_other_commands(self) -> None:
+        """A command without a row function ends the chain, the next
+        row-wise stage starts a new one from its output.
+        """
+        calls = []
+        apply_row_functions = models.apply_row_functions
+        def spy(events, functions):
+            calls.append(len(functions))
+            return apply_row_functions(events, functions)
+        with patch("events.models.apply_row_functions", spy):
+            results = self.resolve(
+                "search index=test | eval a=1 | eval b=2 | head -n 3 | eval c=3 | rename --from-field c --to-field d"
+            )
+        self.assertEqual(calls, [1, 2, 1, 2])
+        self.assertEqual(len(results), 3)
+        self.assertEqual((results[0]["a"], results[0]["b"], results[0]["d"]), (1, 2, 3))
+
+    def test_errors_in_row_functions_are_reported(self) -> None:
+        results = self.resolve("search index=test | eval a=1 | filter ( a=1")
+        self.assertIn("Unbalanced parentheses", results[0]["exception"])
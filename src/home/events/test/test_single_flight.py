@@ -0,0 +1,100 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.single_flight.
+"""
+import time
+import threading
+from unittest.mock import MagicMock, patch
+
+from django.test import SimpleTestCase
+
+from events.models import Event, Query
+from events.single_flight import SingleFlight, get_key
+from events.search_commands.util import permission_checks
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+        self.results = {}
+
+    def leader(self):
+        self.calls.append("leader")
+        permission_checks.get().append(("view", Event))
+        self.started.set()
+        self.release.wait(5)
+        return [{"foo": "leader"}]
+
+    def follower(self):
+        self.calls.append("follower")
+        return [{"foo": "follower"}]
+
+    def do(self, name, request, func):
+        try:
+            self.results[name] = self.flight.do("key", request, func)
+        except ValueError as exception:
+            self.results[name] = exception
+
+    def run_concurrently(self, leader, requests):
+        threads = [threading.Thread(target=self.do, args=("leader", MagicMock(), leader))]
+        threads[0].start()
+        self.started.wait(5)
+        for name, request in requests.items():
+            threads.append(threading.Thread(target=self.do, args=(name, request, self.follower)))
+            threads[-1].start()
+        # Give the followers time to start waiting on the leader
+        time.sleep(0.2)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+
+    def test_followers_share_result(self):
+        with patch("events.search_commands.util.has_permission_for_model", return_value=True) as has_permission:
+            self.run_concurrently(self.leader, {i: MagicMock() for i in range(5)})
+        self.assertEqual(self.calls, ["leader"])
+        for i in range(5):
+            self.assertEqual(self.results[i], [{"foo": "leader"}])
+            # Each follower gets its own copy
+            self.assertIsNot(self.results[i], self.results["leader"])
+        self.assertEqual(has_permission.call_count, 5)
+        self.assertEqual(has_permission.call_args.args[:2], ("view", Event))
+
+    def test_follower_without_permission_runs_query(self):
+        allowed, denied = MagicMock(allowed=True), MagicMock(allowed=False)
+        with patch(
+            "events.search_commands.util.has_permission_for_model",
+            side_effect=lambda permission_string, model, request: request.allowed,
+        ):
+            self.run_concurrently(self.leader, {"allowed": allowed, "denied": denied})
+        self.assertEqual(self.results["allowed"], [{"foo": "leader"}])
+        self.assertEqual(self.results["denied"], [{"foo": "follower"}])
+        self.assertEqual(sorted(self.calls), ["follower", "leader"])
+
+    def test_failed_leader_is_not_shared(self):
+        def leader():
+            self.leader()
+            raise ValueError("Failed")
+        with patch("events.search_commands.util.has_permission_for_model", return_value=True):
+            self.run_concurrently(leader, {"follower": MagicMock()})
+        self.assertIsInstance(self.results["leader"], ValueError)
+        self.assertEqual(self.results["follower"], [{"foo": "follower"}])
+
+    def test_sequential_calls_are_not_shared(self):
+        self.assertEqual(self.flight.do("key", MagicMock(), self.follower), [{"foo": "follower"}])
+        self.assertEqual(self.flight.do("key", MagicMock(), self.follower), [{"foo": "follower"}])
+        self.assertEqual(self.calls, ["follower", "follower"])
+
+    def test_get_key(self):
+        text = "search index={{ index }} | stats count"
+        key = get_key(Query(text=text), {"index": "test"}, {})
+        self.assertIsNotNone(key)
+        self.assertEqual(key, get_key(Query(text=text), {"index": "test"}, {}))
+        self.assertNotEqual(key, get_key(Query(text=text), {"index": "other"}, {}))
+        self.assertIsNone(get_key(Query(text="search | read_file test.log"), {}, {}))
+        # Waiting on another run would skip writing to the context
+        self.assertIsNone(get_key(Query(text="search index=test | set foo=bar"), {}, {}))
+        self.assertIsNone(get_key(Query(text="search index=test | events_to_context"), {}, {}))
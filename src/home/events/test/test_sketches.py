@@ -0,0 +1,160 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.sketches and the
+mergeable aggregates of the stats command built on them.
+"""
+import pickle
+import random
+import statistics
+
+from django.test import SimpleTestCase
+
+from events.sketches import BloomFilter, CountMinSketch, HyperLogLog, SpaceSaving, TDigest
+from events.search_commands.stats._aggregate import aggregate, merge_groups
+
+class HyperLogLogTests(SimpleTestCase):
+    def test_count(self):
+        for number in (0, 10, 1000, 50000):
+            sketch = HyperLogLog(precision=12)
+            for i in range(number):
+                # Every value is added twice
+                sketch.add(f"10.0.{i // 256}.{i % 256}")
+                sketch.add(f"10.0.{i // 256}.{i % 256}")
+            self.assertAlmostEqual(sketch.count(), number, delta=number * 0.05)
+
+    def test_numbers_compare_by_value(self):
+        sketch = HyperLogLog()
+        for value in (1, 1.0, 2, 2.0, {"a": 1}, {"a": 1}):
+            sketch.add(value)
+        self.assertEqual(sketch.count(), 3)
+
+    def test_merge(self):
+        left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            (left if i % 2 else right).add(i)
+            both.add(i)
+        self.assertEqual(left.merge(right).count(), both.count())
+        with self.assertRaises(ValueError):
+            left.merge(HyperLogLog(precision=10))
+
+class TDigestTests(SimpleTestCase):
+    def test_quantiles(self):
+        values = list(range(10000))
+        random.Random(0).shuffle(values)
+        sketch = TDigest()
+        for value in values:
+            sketch.add(value)
+        for q in (0.01, 0.5, 0.95, 0.99):
+            self.assertAlmostEqual(sketch.quantile(q), q * 10000, delta=10000 * 0.01)
+        # Memory is bounded by the compression, not the number of values
+        self.assertLess(len(sketch.centroids), 200)
+        self.assertIsNone(TDigest().quantile(0.5))
+
+    def test_merge(self):
+        generator = random.Random(0)
+        values = [generator.gauss(100, 15) for _ in range(20000)]
+        sketches = [TDigest() for _ in range(4)]
+        for i, value in enumerate(values):
+            sketches[i % 4].add(value)
+        merged = sketches[0]
+        for sketch in sketches[1:]:
+            merged.merge(pickle.loads(pickle.dumps(sketch)))
+        self.assertEqual(merged.count, 20000)
+        expected = statistics.quantiles(values, n=100)
+        for percentile in (50, 95, 99):
+            self.assertAlmostEqual(merged.quantile(percentile / 100), expected[percentile - 1], delta=1)
+
+class CountMinSketchTests(SimpleTestCase):
+    def test_estimate(self):
+        sketch = CountMinSketch(epsilon=0.01, delta=0.01)
+        counts = {f"/page/{i}": i % 50 + 1 for i in range(1000)}
+        for value, count in counts.items():
+            sketch.add(value, count)
+        for value, count in counts.items():
+            estimate = sketch.estimate(value)
+            self.assertGreaterEqual(estimate, count)
+            self.assertLessEqual(estimate, count + 0.01 * sketch.total * 2)
+
+    def test_merge(self):
+        left, right = CountMinSketch(), CountMinSketch()
+        left.add("a", 3)
+        right.add("a", 2)
+        right.add("b")
+        left.merge(right)
+        self.assertEqual(left.estimate("a"), 5)
+        self.assertEqual(left.total, 6)
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(("host", i))
+        for i in range(10000):
+            self.assertIn(("host", i), bloom)
+            self.assertTrue(bloom.add(("host", i)))
+
+    def test_error_rate(self):
+        bloom = BloomFilter(capacity=10000, error_rate=0.01)
+        for i in range(10000):
+            bloom.add(i)
+        false_positives = sum(i in bloom for i in range(10000, 30000))
+        self.assertLess(false_positives / 20000, 0.02)
+
+    def test_merge(self):
+        a = BloomFilter(capacity=1000, error_rate=0.01)
+        b = BloomFilter(capacity=1000, error_rate=0.01)
+        a.add("a")
+        b.add("b")
+        merged = pickle.loads(pickle.dumps(a)).merge(b)
+        self.assertIn("a", merged)
+        self.assertIn("b", merged)
+        with self.assertRaises(ValueError):
+            a.merge(BloomFilter(capacity=10, error_rate=0.01))
+
+
+class MergeGroupsTests(SimpleTestCase):
+    def test_partitions_give_same_result(self):
+        generator = random.Random(0)
+        events = [{"host": f"h{i % 3}", "foo": generator.randint(0, 100)} for i in range(3000)]
+        for function in ("count", "sum", "min", "max", "avg", "stdev", "distinct_count", "dc"):
+            value = lambda event: event["foo"]
+            expected = aggregate(events, ["host"], function, value)
+            merged = aggregate(events[:1000], ["host"], function, value)
+            for i in range(1000, 3000, 500):
+                merge_groups(merged, aggregate(events[i:i + 500], ["host"], function, value))
+            for key, (values, state) in expected.items():
+                self.assertAlmostEqual(merged[key][1].result(), state.result(), msg=function)
+
+class SpaceSavingTests(SimpleTestCase):
+    def test_exact_within_capacity(self):
+        summary = SpaceSaving(capacity=10)
+        for value in ["a"] * 5 + ["b"] * 3 + ["c"]:
+            summary.add(value)
+        self.assertEqual(summary.most_common(2), [("a", 5, 0), ("b", 3, 0)])
+        self.assertEqual(summary.least_common(1), [("c", 1, 0)])
+        self.assertEqual(summary.total, 9)
+
+    def test_bounded(self):
+        generator = random.Random(0)
+        values = [f"/page/{int(generator.paretovariate(1))}" for _ in range(20000)]
+        summary = SpaceSaving(capacity=50)
+        for value in values:
+            summary.add(value)
+        self.assertLessEqual(len(summary.counters), 50)
+        counts = {value: values.count(value) for value in set(values)}
+        expected = sorted(counts, key=counts.get, reverse=True)[:3]
+        self.assertEqual([value for value, _, _ in summary.most_common(3)], expected)
+        for value, count, error in summary.most_common(10):
+            # Counts never underestimate, and overestimate by at most the error
+            self.assertGreaterEqual(count, counts[value])
+            self.assertLessEqual(count - error, counts[value])
+
+    def test_merge(self):
+        left, right = SpaceSaving(), SpaceSaving()
+        left.add("a", 2)
+        right.add("a")
+        right.add("b")
+        self.assertEqual(left.merge(right).most_common(2), [("a", 3, 0), ("b", 1, 0)])
+        self.assertEqual(left.total, 4)
@@ -0,0 +1,111 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test events.sorting.
+"""
+import random
+import tempfile
+import datetime
+from types import GeneratorType
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from events import sorting
+from events.sorting import fields_sort_key, sort_events, sort_key, top_events
+
+class SortKeyTests(SimpleTestCase):
+    def test_total_ordering(self):
+        values = [
+            "b",
+            {"a": 1},
+            datetime.date(2025, 1, 1),
+            float("nan"),
+            datetime.datetime(2025, 1, 1, 12, tzinfo=datetime.timezone.utc),
+            None,
+            True,
+            b"bytes",
+            -1,
+            "a",
+            [1, 2],
+            2.5,
+            datetime.datetime(2025, 1, 1, 11),
+        ]
+        self.assertEqual(
+            sorted(values, key=sort_key)[:10],
+            [
+                None,
+                -1,
+                True,
+                2.5,
+                # NaN sorts after every other number
+                values[3],
+                "a",
+                "b",
+                datetime.datetime(2025, 1, 1, 11),
+                datetime.datetime(2025, 1, 1, 12, tzinfo=datetime.timezone.utc),
+                datetime.date(2025, 1, 1),
+            ],
+        )
+        self.assertEqual(sorted(values, key=sort_key)[10:], [b"bytes", {"a": 1}, [1, 2]])
+
+    def test_fields_sort_key(self):
+        events = [{"a": 1, "b": 2}, {"a": 1, "b": 1}, {"b": 3}]
+        self.assertEqual(
+            sorted(events, key=fields_sort_key(["a", "b"])),
+            [{"b": 3}, {"a": 1, "b": 1}, {"a": 1, "b": 2}],
+        )
+
+class SortEventsTests(SimpleTestCase):
+    def events(self, number):
+        generator = random.Random(0)
+        return [{"foo": generator.randint(0, 20), "position": i} for i in range(number)]
+
+    def expected(self, events, reverse=False):
+        return sorted(events, key=lambda event: event["foo"], reverse=reverse)
+
+    def test_in_memory(self):
+        events = self.events(100)
+        result = sort_events(iter(events), key=fields_sort_key(["foo"]), buffer_size=1000)
+        self.assertIsInstance(result, list)
+        self.assertEqual(result, self.expected(events))
+
+    def test_spills_runs(self):
+        events = self.events(1000)
+        for reverse in (False, True):
+            result = sort_events(iter(events), key=fields_sort_key(["foo"]), reverse=reverse, buffer_size=64)
+            self.assertIsInstance(result, GeneratorType)
+            # The sort is stable, as with sorted()
+            self.assertEqual(list(result), self.expected(events, reverse))
+
+    def test_merges_runs_in_levels(self):
+        events = self.events(1000)
+        with patch.object(sorting, "MERGE_FAN_IN", 3), patch.object(sorting, "spill", wraps=sorting.spill) as spill:
+            result = list(sort_events(iter(events), key=fields_sort_key(["foo"]), buffer_size=10))
+        self.assertEqual(result, self.expected(events))
+        # 100 runs, plus the runs merged from them
+        self.assertGreater(spill.call_count, 100)
+
+    def test_stopping_early_closes_runs(self):
+        events = self.events(100)
+        runs = []
+        temporary_file = tempfile.TemporaryFile
+        def record():
+            runs.append(temporary_file())
+            return runs[-1]
+        with patch("events.sorting.tempfile.TemporaryFile", side_effect=record):
+            result = sort_events(iter(events), key=fields_sort_key(["foo"]), buffer_size=10)
+            self.assertEqual(next(result), self.expected(events)[0])
+            result.close()
+        self.assertEqual(len(runs), 10)
+        for run in runs:
+            self.assertTrue(run.closed)
+
+    def test_top_events(self):
+        events = self.events(100)
+        for reverse in (False, True):
+            self.assertEqual(
+                top_events(iter(events), key=fields_sort_key(["foo"]), reverse=reverse, number=5),
+                self.expected(events, reverse)[:5],
+            )
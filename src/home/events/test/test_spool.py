@@ -0,0 +1,154 @@
+# Copyright (C) 2025 All rights reserved.
+# This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
+# See the LICENSE file in the root of this repository for details.
+
+"""This test module is meant to test the ingest spool, located at
+events.spool.
+"""
+import os
+import tempfile
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from django.urls import reverse
+from django.contrib.auth import get_user_model
+from django.test import override_settings
+
+from django_q.models import Schedule
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from events import ingest, spool as spools
+from events.ingest_queue import IngestQueue, get_queue
+from events.models import Event
+from events.spool import Spool, event_to_row
+
+
+class SpoolTests(APITestCase):
+    def setUp(self, *args, **kwargs):
+        self.user = get_user_model().objects.create_user(
+            username='testadmin',
+            email='testadmin@test.com',
+            password='testadmin',
+        )
+        self.client.login(username='testadmin', password='testadmin')
+        self.directory = tempfile.TemporaryDirectory()
+        self.spool = os.path.join(self.directory.name, "spool")
+        super().setUp(*args, **kwargs)
+
+    def tearDown(self):
+        self.directory.cleanup()
+        super().tearDown()
+
+    def rows(self, count, text="event"):
+        events = ingest.build_events(Event, [{"text": f"{text} {i}"} for i in range(count)], self.user)
+        return [event_to_row(event) for event in events]
+
+    def test_segments(self):
+        spool = Spool(self.spool, 300)
+        for i in range(10):
+            spool.append(self.rows(1, str(i)))
+        spool.seal()
+        segments = spool.segments()
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(segments, sorted(segments))
+        self.assertEqual(
+            [row["text"] for path in segments for row in spool.read(path)],
+            [f"{i} 0" for i in range(10)],
+        )
+        # A new run numbers its segments after the existing ones
+        spool = Spool(self.spool, 300)
+        spool.append(self.rows(1))
+        self.assertEqual(spool.seal(), os.path.join(self.spool, f"{len(segments) + 1:020d}.jsonl"))
+
+    def test_grouped_sync(self):
+        spool = Spool(self.spool, 2 ** 20)
+        first = spool.write(self.rows(1))
+        second = spool.write(self.rows(1))
+        with patch("events.spool.os.fsync") as fsync:
+            spool.sync(second)
+            spool.sync(first)
+        self.assertEqual(fsync.call_count, 1)
+
+    def test_drain(self):
+        spool = Spool(self.spool, 2 ** 20)
+        rows = self.rows(10)
+        spool.append(rows[:6])
+        spool.seal()
+        spool.append(rows[6:])
+        spool.file.close()
+        # Left for an admin
+        with open(os.path.join(self.spool, f"{0:020d}.jsonl"), "w") as file:
+            file.write('{"text": 1}\n')
+        # Written before a crash, but still in the spool
+        Event.objects.bulk_create(Event(**row) for row in rows[:4])
+        Spool(self.spool, 2 ** 20).recover()
+        with override_settings(DELVE_INGEST_SPOOL=self.spool, DELVE_INGEST_SPOOL_DRAIN=True):
+            self.assertEqual(spools.drain(), 6)
+            self.assertEqual(spools.drain(), 0)
+        self.assertEqual(
+            sorted(Event.objects.values_list("text", flat=True)),
+            sorted(row["text"] for row in rows),
+        )
+        self.assertEqual(os.listdir(self.spool), [f"{0:020d}.jsonl.failed"])
+
+    def test_drain_recovers_stale_segments(self):
+        """A segment left open by a process which stopped is drained,
+        one a running process is appending to isn't."""
+        spool = Spool(self.spool, 2 ** 20)
+        spool.append(self.rows(3, "stale"))
+        spool.file.close()
+        os.utime(spool.path, (0, 0))
+        spool = Spool(self.spool, 2 ** 20)
+        spool.append(self.rows(2, "live"))
+        with override_settings(DELVE_INGEST_SPOOL=self.spool, DELVE_INGEST_SPOOL_DRAIN=True):
+            self.assertEqual(spools.drain(), 3)
+        self.assertEqual(os.listdir(self.spool), [os.path.basename(spool.path)])
+        spool.seal()
+        with override_settings(DELVE_INGEST_SPOOL=self.spool, DELVE_INGEST_SPOOL_DRAIN=True):
+            self.assertEqual(spools.drain(), 2)
+
+    def test_put_skips_database(self):
+        queue = IngestQueue(Event, 3600, Spool(self.spool, 2 ** 20), drain=True)
+        events = ingest.build_events(Event, [{"text": "event"}], self.user)
+        with self.assertNumQueries(0), patch("django_q.tasks.async_task") as async_task, \
+                patch("events.spool.schedule_drain") as schedule_drain:
+            queue.put(events)
+            queue.stop()
+        async_task.assert_called_with("events.spool.drain")
+        schedule_drain.assert_called_once_with()
+
+    def test_schedule_drain(self):
+        spools.schedule_drain()
+        spools.schedule_drain()
+        self.assertEqual(Schedule.objects.filter(func="events.spool.drain").count(), 1)
+
+    def test_created(self):
+        """Events keep the time they were received, not drained."""
+        spool = Spool(self.spool, 2 ** 20)
+        with patch("events.ingest.timezone.now", return_value=datetime(2025, 1, 1, tzinfo=timezone.utc)):
+            rows = self.rows(2)
+        spool.append(rows)
+        spool.seal()
+        with override_settings(DELVE_INGEST_SPOOL=self.spool, DELVE_INGEST_SPOOL_DRAIN=True):
+            self.assertEqual(spools.drain(), 2)
+        self.assertEqual(
+            list(Event.objects.values_list("created", flat=True).distinct()),
+            [datetime(2025, 1, 1, tzinfo=timezone.utc)],
+        )
+
+    def test_bulk_endpoint(self):
+        with override_settings(
+            DELVE_INGEST_SPOOL=self.spool,
+            DELVE_INGEST_SPOOL_DRAIN=True,
+            DELVE_INGEST_QUEUE_INTERVAL=3600,
+        ), patch("django_q.tasks.async_task") as async_task, patch("events.spool.schedule_drain"):
+            data = [{'text': f'event {i}', 'index': 'spooled'} for i in range(5)]
+            response = self.client.post(reverse('event-bulk'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+            self.assertEqual(response.data, {"queued": 5})
+            self.assertEqual(Event.objects.count(), 0)
+            self.assertEqual(get_queue(Event).flush(), 0)
+            async_task.assert_called_with("events.spool.drain")
+            self.assertEqual(spools.drain(), 5)
+        self.assertEqual(Event.objects.filter(index='spooled', user=self.user).count(), 5)
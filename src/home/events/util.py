@@ -2,14 +2,13 @@
 # This file is part of the Delve project, which is licensed under the GNU Affero General Public License v3.0 (AGPL-3.0).
 # See the LICENSE file in the root of this repository for details.
 
-import sys
 import ast
+import json
 import logging
 import inspect
-from io import StringIO
 from itertools import chain
 from types import GeneratorType
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping
 import django.core.exceptions
 from django.utils.timezone import get_current_timezone
 
@@ -24,6 +23,8 @@ import pytz
 from django.db.models import Model
 from django.forms.models import model_to_dict
 
+from events.capture import capture_output
+
 def deep_update(d, u, depth=-1):
     """
     Recursively merge or update dict-like objects. 
@@ -68,6 +69,18 @@ def cast(value):
     except ValueError:
         return value
 
+def hashable(value):
+    """
+    Return value, or a hashable stand-in for it if it is not hashable
+    (ie. the dicts and lists of a JSONField). Equal values give equal
+    stand-ins.
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return (type(value), json.dumps(value, sort_keys=True, default=str))
+    return value
+
 def is_results(data):
     if isinstance(data, GeneratorType) or inspect.isgeneratorfunction(data) or isinstance(data, list) or isinstance(data, QuerySet):
         return True
@@ -102,7 +115,104 @@ def localize_datetimes(obj):
             obj[key] = value.astimezone(user_tz)
     return obj
 
-def resolve(events):
+class ResultSet(list):
+    """
+    A list of events, as returned by resolve.
+
+    Events are kept as they are, without adding the keys they are missing,
+    so a stage doesn't pay for a pass over every row and key of a result
+    set with heterogeneous fields. columns is the union of the keys of
+    every event, in the order they were first seen, computed the first
+    time it is used. fill adds the missing keys and localizes datetimes,
+    which resolve does once when the result set is output.
+    """
+    _columns = None
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            self._columns = list(
+                dict.fromkeys(
+                    chain.from_iterable(event for event in self if isinstance(event, dict))
+                )
+            )
+        return self._columns
+
+    def fill(self):
+        """
+        Add the missing columns to every event, set to None, and localize
+        datetimes to the user's time zone, in place.
+        """
+        # Events may have changed since columns was computed
+        self._columns = None
+        columns = self.columns
+        for event in self:
+            if isinstance(event, dict):
+                localize_datetimes(event)
+                if len(event) != len(columns):
+                    for column in columns:
+                        event.setdefault(column, None)
+        return self
+
+def iter_events(events):
+    """
+    Lazily yield the events of a result set one at a time.
+
+    Unlike resolve, this never materializes the result set and does not
+    back-fill missing keys, so commands which operate on one event at a
+    time can be chained without holding every event in memory. QuerySets
+    are read through a server-side cursor in chunks of
+    DELVE_STREAMING_CHUNK_SIZE rows, so a consumer which stops early
+    (ie. head) also stops the scan.
+    """
+    from events.models import BaseEvent
+    log = logging.getLogger(__name__)
+    chunk_size = settings.DELVE_STREAMING_CHUNK_SIZE
+    if events is None:
+        return
+    if hasattr(events, "_iterable_class") and events._iterable_class == ValuesIterable:
+        log.debug(f"Streaming matching events, detected {type(events)}")
+        yield from events.iterator(chunk_size=chunk_size)
+    elif isinstance(events, QuerySet):
+        log.debug(f"Streaming matching events, detected {type(events)}")
+        yield from events.values().iterator(chunk_size=chunk_size)
+    elif isinstance(events, Model):
+        yield custom_model_to_dict(events)
+    elif isinstance(events, (Mapping, str, bytes)) or not isinstance(events, Iterable):
+        yield events
+    else:
+        for event in events:
+            if isinstance(event, BaseEvent):
+                event = custom_model_to_dict(event)
+            yield event
+
+def apply_row_functions(events, functions):
+    """
+    Lazily yield each event of events passed through functions in turn,
+    see search_command's row_function. An event is dropped as soon as a
+    function returns None for it.
+    """
+    if len(functions) == 1:
+        function = functions[0]
+        for event in iter_events(events):
+            event = function(event)
+            if event is not None:
+                yield event
+        return
+    for event in iter_events(events):
+        for function in functions:
+            event = function(event)
+            if event is None:
+                break
+        else:
+            yield event
+
+def resolve(events, fill=False):
+    """
+    Materialize events (ie. a QuerySet or a generator) as a ResultSet of
+    dicts. If fill is True, the result set is being output and every event
+    is given every column, see ResultSet.fill.
+    """
     from events.models import BaseEvent
     log = logging.getLogger(__name__)
     # if isinstance(events, QuerySet):
@@ -123,56 +233,35 @@ def resolve(events):
         events = list(events.values())
     while isinstance(events, GeneratorType) or inspect.isgeneratorfunction(events):
         log.debug(f"Casting matching events, detected {type(events)}({events})")
-        log.debug("swapping stdout and stderr")
-        orig_stderr = sys.stderr
-        orig_stdout = sys.stdout
-        sys.stderr = StringIO()
-        sys.stdout = StringIO()
-        try:
-            log.debug(f"Attempting to cast events to list")
-            events = list(events)
-            log.debug(f"Successfully cast events as list, {len(events)} events found")
-        except (Exception, SystemExit) as exception:
-            log.exception("An unhandled exception occurred")
+        log.debug("capturing stdout and stderr")
+        with capture_output() as output:
             try:
-                sys.stderr.seek(0)
-                sys.stdout.seek(0)
-            except:
-                log.exception("An Unhandled exception occurred.")
-            return [
-                {
-                    "stdout": sys.stdout.read(),
-                    "stderr": sys.stderr.read(),
-                    "exception": str(exception),
-                    "matching_events": events,
-                },
-            ]
-        finally:
-            log.debug("replacing original stdout and stderr")
-            sys.stderr = orig_stderr
-            sys.stdout = orig_stdout
+                log.debug(f"Attempting to cast events to list")
+                events = list(events)
+                log.debug(f"Successfully cast events as list, {len(events)} events found")
+            except (Exception, SystemExit) as exception:
+                log.exception("An unhandled exception occurred")
+                return ResultSet(
+                    [
+                        {
+                            "stdout": output.stdout.getvalue(),
+                            "stderr": output.stderr.getvalue(),
+                            "exception": str(exception),
+                            "matching_events": events,
+                        },
+                    ]
+                )
 
     if isinstance(events, list):
-        log.debug(f"Found matching_events: {events}")
+        log.debug(f"Found {len(events)} matching_events")
         # Peek at the data type of the first item
         if events and isinstance(events[0], BaseEvent):
             log.debug(f"Found list of Events, converting to dicts")
             events = [custom_model_to_dict(event) for event in events]
             log.debug(f"Successfully converted to dicts")
-        if events and isinstance(events[0], dict):
-            # keys is a set of all keys from all events in matching_events
+        if not isinstance(events, ResultSet):
+            events = ResultSet(events)
+        if fill and events and isinstance(events[0], dict):
             log.debug(f"Found list of dicts, attempting to ensure all keys are present in each event.")
-            keys = set(chain.from_iterable(events))
-            log.debug(f"Found keys: {keys}")
-            for item in events:
-                # Add None to fill any missing values
-                # log.debug(f"Found item: {item}")
-                if isinstance(item, dict):
-                    localize_datetimes(item)
-                    # log.debug(f"Adding missing keys")
-                    try:
-                        item.update({key: item.get(key, None) for key in keys})
-                    except:
-                        log.debug(f"Found item: {type(item)}({item})")
-                        raise
+            events.fill()
     return events
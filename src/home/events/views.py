@@ -115,18 +115,14 @@ def ingress(request, index, source, sourcetype):
     if request.method != "POST":
         return http_405()
     host = get_client_ip(request=request)
-    event = Event.objects.create(
+    # Extracted and processed by the pre_save signal
+    Event.objects.create(
         index=index,
         host=host,
         source=source,
         sourcetype=sourcetype,
         text=request.body.decode(),
     )
-    if settings.DELVE_ENABLE_EXTRACTIONS_ON_CREATE:
-        event.extract_fields()
-    if settings.DELVE_ENABLE_PROCESSORSS_ON_CREATE:
-        event.process()
-    event.save()
     return HttpResponse(
         "<h1>Created!</h1>",
         content_type="text/html",
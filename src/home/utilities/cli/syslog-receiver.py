@@ -78,7 +78,7 @@ def parse_argv(argv):
     )
     parser.add_argument(
         "--server-endpoint",
-        default=os.getenv("SYSLOG_RECEIVER_SERVER_ENDPOINT", "/api/events/"),
+        default=os.getenv("SYSLOG_RECEIVER_SERVER_ENDPOINT", "/api/events/bulk/"),
     )
     parser.add_argument(
         "--no-verify",
@@ -486,6 +486,33 @@ def main(argv=None):
             tcp_server.server_close()
     return 0
 
+def post_batch(session, url, batch):
+    """
+    POST batch to Delve, retrying (with a growing delay) until it is
+    accepted. A batch Delve rejects as invalid (400 Bad Request) is
+    logged and dropped, as sending it again would fail again.
+    """
+    log = logging.getLogger(__name__)
+    delay = 1
+    while True:
+        try:
+            response = session.post(
+                url,
+                json=batch,
+            )
+        except requests.RequestException as e:
+            log.error(f"Unable to send {len(batch)} events, retrying in {delay}s: {e=}")
+        else:
+            log.debug(f"Received {response=}")
+            if response.ok:
+                return
+            if response.status_code == 400:
+                log.error(f"Dropping {len(batch)} events rejected by delve: {response.text}")
+                return
+            log.error(f"Unable to send {len(batch)} events, retrying in {delay}s: {response.status_code} {response.text}")
+        sleep(delay)
+        delay = min(delay * 2, 60)
+
 def send_to_delve(event_queue, url, session, batch_size, log_level):
     # configure_logging(level=log_level, filename=LOG_DIRECTORY / f'sender-{os.getpid()}.log')
     log = logging.getLogger(__name__)
@@ -506,26 +533,15 @@ def send_to_delve(event_queue, url, session, batch_size, log_level):
             except queue.Empty:
                 log.debug("Queue was empty")
                 if len(current_batch) > 0:
-                    try:
-                        log.debug("Sending request to delve")
-                        response = session.post(
-                            url,
-                            json=current_batch,
-                        )
-                        log.debug(f"Received {response=}")
-                    except Exception as e:
-                        log.debug(f"Exception raised: {e=}")
-                        raise
+                    log.debug("Sending request to delve")
+                    post_batch(session, url, current_batch)
                     log.debug("clearing current_batch")
                     current_batch.clear()
                     break
                 sleep(0.25)
         log.debug("Batch size reached, sending to delve")
         if len(current_batch) > 0:
-            response = session.post(
-                url,
-                json=current_batch,
-            )
+            post_batch(session, url, current_batch)
             current_batch.clear()
 
 if __name__ == "__main__":
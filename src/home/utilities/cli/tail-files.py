@@ -233,7 +233,7 @@ def main(argv=None):
     starttime = time()
     log.info(f"start: {starttime}")
 
-    url = f"{server}/api/events/"
+    url = f"{server}/api/events/bulk/"
     log.debug(f"Found url: {url}")
     basic_auth = requests.auth.HTTPBasicAuth(username, password)
 
@@ -359,6 +359,32 @@ def main(argv=None):
                 log.debug(f"Found {level=}, {message=}")
                 log.log(level=level, msg=message)
 
+def post_batch(session, url, batch, logging_queue):
+    """
+    POST batch to Delve, retrying (with a growing delay) until it is
+    accepted. A batch Delve rejects as invalid (400 Bad Request) is
+    logged and dropped, as sending it again would fail again.
+    """
+    delay = 1
+    while True:
+        try:
+            response = session.post(
+                url,
+                json=batch,
+            )
+        except requests.RequestException as e:
+            logging_queue.put((logging.ERROR, f"Unable to send {len(batch)} events, retrying in {delay}s: {e=}"))
+        else:
+            logging_queue.put((logging.INFO, f"Received {response=} from delve"))
+            if response.ok:
+                return
+            if response.status_code == 400:
+                logging_queue.put((logging.ERROR, f"Dropping {len(batch)} events rejected by delve: {response.text}"))
+                return
+            logging_queue.put((logging.ERROR, f"Unable to send {len(batch)} events, retrying in {delay}s: {response.status_code} {response.text}"))
+        sleep(delay)
+        delay = min(delay * 2, 60)
+
 def send_to_delve(event_queue, logging_queue, url, session, batch_size):
     timeout = 1 # seconds
     current_batch = []
@@ -375,25 +401,12 @@ def send_to_delve(event_queue, logging_queue, url, session, batch_size):
                 logging_queue.put((logging.DEBUG, f"Event queue is empty"))
                 if len(current_batch) > 0:
                     logging_queue.put((logging.INFO, "Sending request to delve"))
-                    try:
-                        response = session.post(
-                            url,
-                            json=current_batch,
-                        )
-                        logging_queue.put((logging.DEBUG, f"Found {response.text}"))
-                    except Exception as e:
-                        logging_queue.put((logging.ERROR, f"Found exception: {e=}"))
-                        raise
-                    logging_queue.put((logging.INFO, f"Received {response=} from delve"))
+                    post_batch(session, url, current_batch, logging_queue)
                     current_batch.clear()
                 sleep(0.25)
         if len(current_batch) > 0:
             logging_queue.put((logging.INFO, "Sending request to delve"))
-            response = session.post(
-                url,
-                json=current_batch,
-            )
-            logging_queue.put((logging.INFO, f"Received {response=} from delve"))
+            post_batch(session, url, current_batch, logging_queue)
             current_batch.clear()
         
 if __name__ == "__main__":
@@ -649,7 +649,15 @@ var application = {
       event.parent().append(spinner);
       application.data = await application.resolve_query( event );
     //   console.log("application.data", application.data)
+      application.profile = undefined;
+      if ( application.data !== null && typeof application.data === "object" && "profile" in application.data && "results" in application.data ){
+          application.profile = application.data.profile;
+          application.data = application.data.results;
+      }
       await application.redrawResult( event );
+      if ( application.profile !== undefined ){
+          await application.draw_profile();
+      }
       await application.retrieve_saved_queries();
       $( "form#queryForm > div > input#id__save" ).attr('checked', true)
       spinner.remove()
@@ -664,6 +672,7 @@ var application = {
           currentContext = "{}";
       }
       var _save = $( "form#queryForm > div > div > input#id__save" ).prop( "checked" )
+      var profile = $( "form#queryForm > div > div > input#id_profile" ).prop( "checked" )
     //   console.log("name: ", name)
     //   console.log("text: ", text)
     //   console.log("_save: ", _save)
@@ -679,6 +688,8 @@ var application = {
                   name: name,
                   local_context: currentContext,
                   _save: _save,
+                  profile: profile,
+                  checkpoints: true,
               }
           ),
       };
@@ -836,6 +847,40 @@ var application = {
       )
   },
 
+  draw_profile: async function( event ){
+      var table  = $( "<table class='display compact table table-striped table-hover table-bordered table-sm'></table>" );
+      $( "#report" ).prepend( table );
+      $( "#report" ).prepend( $( "<h4>Profile</h4>" ) );
+      var header = $( "<tr></tr>" );
+      $.each(
+          ["Stage", "Wall time (s)", "CPU time (s)", "Rows in", "Rows out", "Peak memory (bytes)", "Queries", "SQL time (s)"],
+          function( index, title ){
+              header.append( $( "<th></th>" ).text( title ) );
+          }
+      )
+      table.append( $( "<thead></thead>" ).append( header ) );
+      var body = $( "<tbody></tbody>" );
+      table.append( body );
+      $.each(
+          application.profile,
+          function( index, stage ){
+              var row = $( "<tr></tr>" );
+              var sql = $( "<td></td>" ).text( stage.queries.length );
+              // Show the statements themselves when hovering the count
+              sql.attr( "title", stage.queries.map( ( query ) => query.sql ).join( "\n\n" ) );
+              row.append( $( "<td></td>" ).text( stage.stage + ( stage.pushed_down ? " (pushed down)" : "" ) ) );
+              row.append( $( "<td></td>" ).text( stage.wall_time.toFixed( 6 ) ) );
+              row.append( $( "<td></td>" ).text( stage.cpu_time.toFixed( 6 ) ) );
+              row.append( $( "<td></td>" ).text( stage.rows_in ) );
+              row.append( $( "<td></td>" ).text( stage.rows_out ) );
+              row.append( $( "<td></td>" ).text( stage.peak_memory ) );
+              row.append( sql );
+              row.append( $( "<td></td>" ).text( stage.sql_time.toFixed( 6 ) ) );
+              body.append( row );
+          }
+      )
+  },
+
   draw_generic_table: async function( event ){
       var table  = $( "<table class='display w-100 table table-striped table-hover table-bordered table-sm'></table>" )
       $( "#report" ).append( table )